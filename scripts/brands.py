@@ -0,0 +1,232 @@
+"""
+White-label brand profiles for the generated documents.
+Fragments are emitted with their brandable colours and the body font
+pointing at theme slots (generate_questionnaire.THEME_SLOTS), so a brand is
+nothing more than a different word/theme/theme1.xml and word/styles.xml.
+Each profile is compiled into those two parts once and cached under
+CACHE_DIR by a hash of the profile and the template parts; a writer for a
+brand is the house PackageWriter with the two cached parts swapped in.
+
+A profile is a JSON file in brands/ (or any path); missing keys fall back
+to the house look:
+
+    {
+        "name": "Northwind",
+        "colors": {"primary": "1B5E20", "secondary": "0D3B12", "text": "263238",
+                   "header_text": "FFFFFF", "header_fill": "2E7D32",
+                   "alt_row": "F1F8E9", "highlight": "E8F5E9", "field_bg": "FAFAFA"},
+        "fonts": {"heading": "Georgia", "body": "Segoe UI"}
+    }
+
+Usage:
+    python brands.py list
+    python brands.py compile northwind            # warm the cache, print the key
+    python brands.py show brands/northwind.json   # resolved profile
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+
+from lxml import etree
+
+import generate_questionnaire as gq
+import reference_data
+
+FORMAT = 1
+THEME_PART = "word/theme/theme1.xml"
+STYLES_PART = "word/styles.xml"
+BRAND_PARTS = (THEME_PART, STYLES_PART)
+
+# Profile colour -> theme slot (a:clrScheme child). Must agree with gq.THEME_SLOTS.
+COLOR_SLOTS = {
+    "primary": "accent1",
+    "secondary": "accent2",
+    "text": "dk2",
+    "header_text": "lt2",
+    "header_fill": "accent3",
+    "alt_row": "accent4",
+    "highlight": "accent5",
+    "field_bg": "accent6",
+}
+# w:themeColor values that resolve to each slot, for refreshing w:val fallbacks.
+_THEME_COLOR_NAMES = {"dk2": ("dark2", "text2"), "lt2": ("light2", "background2")}
+
+_A = "http://schemas.openxmlformats.org/drawingml/2006/main"
+_W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_HEX = re.compile(r"[0-9A-Fa-f]{6}")
+
+
+def house_profile():
+    """The profile matching generate_questionnaire's design tokens."""
+    return {
+        "name": "House",
+        "colors": {
+            "primary": str(gq.TEAL),
+            "secondary": str(gq.DARK_TEAL),
+            "text": str(gq.DARK_GRAY),
+            "header_text": str(gq.WHITE),
+            "header_fill": gq.TABLE_HEADER_HEX,
+            "alt_row": gq.ALT_ROW_HEX,
+            "highlight": gq.HIGHLIGHT_BOX_HEX,
+            "field_bg": gq.FIELD_BG_HEX,
+        },
+        "fonts": {"heading": gq.BODY_FONT, "body": gq.BODY_FONT},
+    }
+
+
+def available():
+    """Brand names with a profile in BRANDS_DIR, plus "house"."""
+    names = [os.path.splitext(os.path.basename(p))[0]
+             for p in glob.glob(os.path.join(reference_data.BRANDS_DIR, "*.json"))]
+    return ["house"] + sorted(names)
+
+
+def load_profile(brand=None):
+    """Resolve a brand name, path or dict into a complete, validated profile."""
+    house = house_profile()
+    if brand in (None, "", "house"):
+        return house
+    if isinstance(brand, dict):
+        raw = brand
+    else:
+        path = brand if os.path.exists(brand) else os.path.join(reference_data.BRANDS_DIR,
+                                                                f"{brand}.json")
+        if not os.path.exists(path):
+            raise ValueError(f"unknown brand {brand!r}; choose from {', '.join(available())}")
+        raw = reference_data.load(path)
+    unknown = set(raw.get("colors", {})) - set(COLOR_SLOTS)
+    if unknown:
+        raise ValueError(f"unknown brand color(s): {', '.join(sorted(unknown))}")
+    profile = {
+        "name": raw.get("name", house["name"]),
+        "colors": {**house["colors"], **raw.get("colors", {})},
+        "fonts": {**house["fonts"], **raw.get("fonts", {})},
+    }
+    for key, value in profile["colors"].items():
+        if not _HEX.fullmatch(str(value).lstrip("#")):
+            raise ValueError(f"brand color {key!r} must be RRGGBB hex, got {value!r}")
+        profile["colors"][key] = str(value).lstrip("#").upper()
+    return profile
+
+
+def check_brand(parser, brand):
+    """*brand*'s profile for a command line; an unknown or invalid brand is
+    reported through *parser*.error instead of a traceback."""
+    try:
+        return load_profile(brand)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+
+def compile_parts(profile, theme_xml, styles_xml):
+    """(theme bytes, styles bytes) for *profile* from the template's parts."""
+    theme = etree.fromstring(theme_xml)
+    scheme = theme.find(f".//{{{_A}}}clrScheme")
+    scheme.set("name", profile["name"])
+    for key, slot in COLOR_SLOTS.items():
+        node = scheme.find(f"{{{_A}}}{slot}")
+        for child in list(node):
+            node.remove(child)
+        etree.SubElement(node, f"{{{_A}}}srgbClr", val=profile["colors"][key])
+    fonts = theme.find(f".//{{{_A}}}fontScheme")
+    fonts.set("name", profile["name"])
+    fonts.find(f"{{{_A}}}majorFont/{{{_A}}}latin").set("typeface", profile["fonts"]["heading"])
+    fonts.find(f"{{{_A}}}minorFont/{{{_A}}}latin").set("typeface", profile["fonts"]["body"])
+
+    # styles.xml: the explicit fonts new_document() set become theme fonts, and
+    # every theme-coloured w:val fallback gets the brand's colour.
+    styles = etree.fromstring(styles_xml)
+    by_name = {slot: profile["colors"][key] for key, slot in COLOR_SLOTS.items()}
+    for slot, names in _THEME_COLOR_NAMES.items():
+        for name in names:
+            by_name[name] = by_name[slot]
+    w = lambda name: f"{{{_W}}}{name}"
+    for rfonts in styles.iter(w("rFonts")):
+        if rfonts.get(w("ascii")) == gq.BODY_FONT and rfonts.get(w("asciiTheme")) is None:
+            rfonts.set(w("asciiTheme"), "minorHAnsi")
+            rfonts.set(w("hAnsiTheme"), "minorHAnsi")
+    for color in styles.iter(w("color")):
+        if color.get(w("val")) == str(gq.DARK_GRAY) and color.get(w("themeColor")) is None:
+            color.set(w("themeColor"), "dark2")
+        slot = color.get(w("themeColor"))
+        if slot in by_name and color.get(w("themeShade")) is None and color.get(w("themeTint")) is None:
+            color.set(w("val"), by_name[slot])
+    return (etree.tostring(theme, xml_declaration=True, encoding="UTF-8", standalone=True),
+            etree.tostring(styles, xml_declaration=True, encoding="UTF-8", standalone=True))
+
+
+def profile_key(profile, template_parts):
+    digest = hashlib.sha256(f"brand-v{FORMAT}".encode())
+    digest.update(json.dumps(profile, sort_keys=True).encode())
+    for data in template_parts:
+        digest.update(data)
+    return digest.hexdigest()[:16]
+
+
+def brand_parts(profile, writer):
+    """{part name: bytes} for *profile*, compiled on first use and then read
+    from the cache. *writer* is the house PackageWriter (the template)."""
+    template = [writer.cached_blob(name) for name in BRAND_PARTS]
+    key = profile_key(profile, template)
+    paths = [reference_data.cache_path(f"brand-{key}-{os.path.basename(n)}") for n in BRAND_PARTS]
+    if not all(os.path.exists(p) for p in paths):
+        for path, data in zip(paths, compile_parts(profile, *template)):
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, path)
+    parts = {}
+    for name, path in zip(BRAND_PARTS, paths):
+        with open(path, "rb") as fh:
+            parts[name] = fh.read()
+    return parts, key
+
+
+_writers = {}
+
+
+def brand_writer(writer, brand=None):
+    """*writer* with the brand's theme and styles swapped in (memoized per
+    base writer and brand key)."""
+    profile = load_profile(brand)
+    parts, key = brand_parts(profile, writer)
+    hit = _writers.get((id(writer), key))
+    if hit is None or hit[0] is not writer:
+        hit = (writer, writer.derive(parts))
+        _writers[(id(writer), key)] = hit
+    return hit[1]
+
+
+# ===================================================================
+#  MAIN
+# ===================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="White-label brand profiles")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list")
+    for name in ("compile", "show"):
+        sub.add_parser(name).add_argument("brand", help="brand name or profile path")
+    args = parser.parse_args(argv)
+    profile = check_brand(parser, args.brand) if args.command != "list" else None
+
+    if args.command == "list":
+        for name in available():
+            print(name)
+    elif args.command == "show":
+        print(json.dumps(profile, indent=2))
+    else:
+        from package_writer import PackageWriter
+        writer = PackageWriter(gq.new_document())
+        _, key = brand_parts(profile, writer)
+        print(f"{args.brand}: {key}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
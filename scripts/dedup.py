@@ -0,0 +1,338 @@
+"""
+Near-duplicate detection for submitted responses (MinHash + LSH).
+Each response is reduced to a set of features: every option it selected
+("capabilities=Drafts replies to routine emails ...", "data_privacy.sensitivity=High",
+ratings included) and word 3-gram shingles of its free text. The client's
+own name and the response_id are left out, so the same questionnaire sent
+twice, or near-identical Part Bs from colleagues at one company, collide.
+
+A MinHash signature (NUM_PERM 32-bit minimums) estimates the Jaccard
+similarity of two feature sets. The signature is cut into bands; responses
+sharing any band key are candidates, and candidates are kept when their
+estimated similarity reaches the threshold. Bands and rows per band are
+chosen for the threshold, so recall and precision are balanced around it.
+Band keys (tagged with their band) are kept in one sorted array and
+binary-searched, with recent inserts in a small pending buffer that is folded in every COMPACT inserts, so a
+lookup costs O(bands * log n) however large the corpus grows.
+
+The index is saved as one .npz (signatures, ids, sorted band keys).
+Signatures do not depend on the threshold: opening an index with another
+--threshold re-bands it without rehashing any response.
+
+Usage:
+    python dedup.py responses.jsonl                               # duplicates within the file
+    python dedup.py responses.jsonl --index .cache/dedup.npz      # ... and against earlier runs
+    python dedup.py new.jsonl --index .cache/dedup.npz --threshold 0.7 --report dups.json
+    python dedup.py responses.db --index .cache/dedup.npz --dry-run
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import zlib
+
+import numpy as np
+
+NUM_PERM = 128
+THRESHOLD = 0.8
+SHINGLE = 3             # words per free-text shingle
+COMPACT = 4096          # pending inserts folded into the sorted bands at once
+BATCH = 2048            # responses hashed per numpy pass
+FORMAT = 1
+
+SKIP_KEYS = {"response_id", "open_fields", "ratings", "recommendation"}
+SKIP_PATHS = {("client_profile", "name")}
+_FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+_FNV_PRIME = np.uint64(0x100000001B3)
+
+
+# ---------------------------------------------------------------------------
+# Features and signatures
+# ---------------------------------------------------------------------------
+def shingles(text):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= SHINGLE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE]) for i in range(len(words) - SHINGLE + 1)}
+
+
+def features(record):
+    """The feature set of a response: selected options, ratings and free-text shingles."""
+    out = set()
+
+    def walk(node, path):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key not in SKIP_KEYS and path + (key,) not in SKIP_PATHS:
+                    walk(value, path + (key,))
+        elif isinstance(node, list):
+            for value in node:
+                walk(value, path)
+        elif node is not None:
+            name = ".".join(path)
+            out.add(f"{name}={node}")
+            if isinstance(node, str) and ":" in node:   # "Other: ..." write-in
+                out.update(f"t:{s}" for s in shingles(node.split(":", 1)[1]))
+
+    walk(record, ())
+    for item, score in (record.get("ratings") or {}).items():
+        out.add(f"ratings.{item}={score}")
+    for text in (record.get("open_fields") or {}).values():
+        if isinstance(text, str):
+            out.update(f"t:{s}" for s in shingles(text))
+    return out
+
+
+def permutations(num_perm=NUM_PERM, seed=1):
+    """(a, b) of the multiply-shift hashes (a*x + b) >> 32 (mod 2**64, a odd)
+    standing in for permutations; no modulo, so hashing stays cheap."""
+    rng = np.random.RandomState(seed)
+    a = rng.randint(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.randint(0, 1 << 63, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def signatures(records, perms):
+    """(n, num_perm) uint32 MinHash signatures; a response without features
+    gets an all-0xFFFFFFFF row (see has_features)."""
+    a, b = perms
+    out = np.full((len(records), len(a)), 0xFFFFFFFF, dtype=np.uint32)
+    for start in range(0, len(records), BATCH):
+        hashes, owners = [], []
+        for i, record in enumerate(records[start:start + BATCH], start):
+            feats = features(record)
+            hashes.extend(zlib.crc32(f.encode()) for f in feats)
+            owners.extend([i] * len(feats))
+        if not hashes:
+            continue
+        hv = np.array(hashes, dtype=np.uint64)
+        owners = np.array(owners)
+        # Features are grouped by owner; reduceat takes the minimum per response.
+        values = (hv[:, None] * a + b) >> np.uint64(32)
+        starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+        out[owners[starts]] = np.minimum.reduceat(values, starts, axis=0).astype(np.uint32)
+    return out
+
+
+def has_features(signature):
+    return bool((signature != 0xFFFFFFFF).any())
+
+
+def lsh_params(threshold, num_perm=NUM_PERM):
+    """(bands, rows) minimising false positives below and false negatives
+    above *threshold* (equal weights)."""
+    s = np.linspace(0.0, 1.0, 201)
+    below, above = s <= threshold, s >= threshold
+    best, best_err = (1, num_perm), None
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        p = 1.0 - (1.0 - s ** rows) ** bands     # chance a pair at similarity s collides
+        err = p[below].sum() + (1.0 - p[above]).sum()     # uniform grid: sums ~ integrals
+        if best_err is None or err < best_err:
+            best, best_err = (bands, rows), err
+    return best
+
+
+def band_keys(sigs, bands, rows):
+    """(n, bands) uint64 keys: an FNV-style fold of each band's rows, with
+    the band number in the top byte so every band shares one sorted array."""
+    sigs = np.atleast_2d(sigs)
+    sigs = sigs[:, :bands * rows].reshape(len(sigs), bands, rows)
+    keys = np.full(sigs.shape[:2], _FNV_OFFSET, dtype=np.uint64)
+    for r in range(rows):
+        keys = (keys ^ sigs[:, :, r].astype(np.uint64)) * _FNV_PRIME
+    return (keys >> np.uint64(8)) | (np.arange(bands, dtype=np.uint64) << np.uint64(56))
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+class DedupIndex:
+    """Incremental LSH index over response signatures."""
+
+    def __init__(self, threshold=THRESHOLD, num_perm=NUM_PERM, seed=1):
+        self.num_perm = num_perm
+        self.seed = seed
+        self.perms = permutations(num_perm, seed)
+        self.ids = []
+        self._pos = {}
+        self._sigs = np.empty((0, num_perm), dtype=np.uint32)
+        self.tune(threshold)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def tune(self, threshold):
+        """Re-band for *threshold*; the signatures are reused as they are."""
+        self.threshold = threshold
+        self.bands, self.rows = lsh_params(threshold, self.num_perm)
+        self._sorted = np.empty(0, dtype=np.uint64)
+        self._order = np.empty(0, dtype=np.int64)
+        self._reset_pending()
+        self._fold(band_keys(self._sigs[:len(self)], self.bands, self.rows),
+                   np.arange(len(self)))
+
+    def _reset_pending(self):
+        self._pending = np.empty((COMPACT, self.bands), dtype=np.uint64)
+        self._pending_rows = np.empty(COMPACT, dtype=np.int64)
+        self._npending = 0
+
+    def _fold(self, keys, rows):
+        """Merge (n, bands) *keys* of signature *rows* into the sorted arrays."""
+        keys = np.concatenate([self._sorted, keys.ravel()])
+        rows = np.concatenate([self._order, np.repeat(rows, self.bands)])
+        order = np.argsort(keys, kind="stable")
+        self._sorted, self._order = keys[order], rows[order]
+
+    def compact(self):
+        """Fold the pending inserts into the sorted arrays."""
+        n = self._npending
+        if n:
+            self._fold(self._pending[:n], self._pending_rows[:n])
+            self._reset_pending()
+
+    def signature(self, record):
+        return signatures([record], self.perms)[0]
+
+    def insert(self, rid, sig, keys=None):
+        """Add *sig* under *rid*; a known rid keeps its first signature."""
+        rid = str(rid)
+        if rid in self._pos:
+            return
+        n = len(self.ids)
+        if n == len(self._sigs):
+            grown = np.empty((max(2 * n, 1024), self.num_perm), dtype=np.uint32)
+            grown[:n] = self._sigs[:n]
+            self._sigs = grown
+        self._sigs[n] = sig
+        self.ids.append(rid)
+        self._pos[rid] = n
+        self._pending[self._npending] = band_keys(sig, self.bands, self.rows)[0] if keys is None else keys
+        self._pending_rows[self._npending] = n
+        self._npending += 1
+        if self._npending == COMPACT:
+            self.compact()
+
+    def candidates(self, keys):
+        """Positions sharing at least one band key in *keys* (one signature's)."""
+        lo = self._sorted.searchsorted(keys, side="left")
+        hi = self._sorted.searchsorted(keys, side="right")
+        found = [self._order[l:h] for l, h in zip(lo.tolist(), hi.tolist()) if h > l]
+        if self._npending:
+            hit = (self._pending[:self._npending] == keys).any(axis=1)
+            found.append(self._pending_rows[:self._npending][hit])
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+    def query(self, sig, threshold=None, exclude=None, keys=None):
+        """[(response_id, estimated similarity)] at or above the threshold, best first."""
+        if not has_features(sig):
+            return []
+        threshold = self.threshold if threshold is None else threshold
+        if keys is None:
+            keys = band_keys(sig, self.bands, self.rows)[0]
+        cand = self.candidates(keys)
+        if not len(cand):
+            return []
+        sims = (self._sigs[cand] == sig).mean(axis=1)
+        keep = np.flatnonzero(sims >= threshold)
+        hits = [(self.ids[cand[i]], float(sims[i])) for i in keep[np.argsort(-sims[keep], kind="stable")]]
+        return [h for h in hits if h[0] != exclude]
+
+    def add(self, record):
+        """Check *record* against the index, then insert it unless it is a
+        near-duplicate; returns the matches (empty for a new response)."""
+        return self.add_many([record]).get(str(record.get("response_id", len(self))), [])
+
+    def add_many(self, records):
+        """{response_id: matches} for the near-duplicates among *records*,
+        each checked against the index and the records before it."""
+        dups = {}
+        for start in range(0, len(records), BATCH):
+            chunk = records[start:start + BATCH]
+            sigs = signatures(chunk, self.perms)
+            all_keys = band_keys(sigs, self.bands, self.rows)
+            for record, sig, keys in zip(chunk, sigs, all_keys):
+                rid = str(record.get("response_id", len(self)))
+                matches = self.query(sig, exclude=rid, keys=keys)
+                if matches:
+                    dups[rid] = matches
+                elif has_features(sig):
+                    self.insert(rid, sig, keys)
+        return dups
+
+    def save(self, path):
+        self.compact()
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, format=FORMAT, num_perm=self.num_perm, seed=self.seed,
+                 threshold=self.threshold, ids=np.array(self.ids, dtype=str),
+                 sigs=self._sigs[:len(self)], sorted=self._sorted, order=self._order)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, threshold=None):
+        with np.load(path) as data:
+            if int(data["format"]) != FORMAT:
+                raise ValueError(f"{path}: unsupported dedup index format {int(data['format'])}")
+            index = cls.__new__(cls)
+            index.num_perm = int(data["num_perm"])
+            index.seed = int(data["seed"])
+            index.perms = permutations(index.num_perm, index.seed)
+            index.ids = data["ids"].tolist()
+            index._pos = {rid: i for i, rid in enumerate(index.ids)}
+            index._sigs = data["sigs"]
+            index.threshold = float(data["threshold"])
+            index.bands, index.rows = lsh_params(index.threshold, index.num_perm)
+            index._sorted, index._order = data["sorted"], data["order"]
+        index._reset_pending()
+        if threshold is not None and threshold != index.threshold:
+            index.tune(threshold)
+        return index
+
+
+def open_index(path=None, threshold=None):
+    """The index saved at *path*, or a new one if there is none yet."""
+    if path and os.path.exists(path):
+        return DedupIndex.load(path, threshold)
+    return DedupIndex(THRESHOLD if threshold is None else threshold)
+
+
+# ===================================================================
+#  MAIN
+# ===================================================================
+
+def main(argv=None):
+    from search_index import iter_records
+    parser = argparse.ArgumentParser(description="Find near-duplicate responses (MinHash/LSH)")
+    parser.add_argument("inputs", nargs="+", help=".jsonl files or response_store .db")
+    parser.add_argument("--index", help="persistent index (.npz); created if missing")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help=f"estimated Jaccard similarity (default: the index's, else {THRESHOLD})")
+    parser.add_argument("--report", help="write {response_id: [[match, similarity], ...]} here")
+    parser.add_argument("--dry-run", action="store_true", help="do not save the index")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    index = open_index(args.index, args.threshold)
+    before = len(index)
+    records = list(iter_records(args.inputs))
+    dups = index.add_many(records)
+    elapsed = time.perf_counter() - start
+    if args.index and not args.dry_run:
+        index.save(args.index)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as fh:
+            json.dump(dups, fh, indent=2)
+    for rid, matches in list(dups.items())[:20]:
+        best, sim = matches[0]
+        print(f"  {rid} ~ {best} ({sim:.2f})" + (f" +{len(matches) - 1} more" if len(matches) > 1 else ""))
+    print(f"{len(records)} response(s): {len(dups)} near-duplicate(s) at >= {index.threshold:g} "
+          f"({index.bands} bands x {index.rows} rows), {len(index) - before} added, "
+          f"{len(index)} indexed, {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,358 @@
+"""
+Deployment-config bundles for each Claw platform.
+Renders the file(s) each platform reads, following the config_format in
+platform-comparison.json:
+
+    OpenClaw  -> .openclaw/openclaw.json             (JSON5)
+    NanoClaw  -> .claude/skills/<skill>/SKILL.md     (+ CLAUDE.md)
+    PicoClaw  -> .picoclaw/config.json               (JSON)
+
+Templates are compiled once into literal/placeholder segments, so rendering
+a client is a join. Bundles are streamed member by member into one tar
+(optionally gzipped) or zip archive: <response_id>/<platform>/<files>.
+
+Usage:
+    python deploy_configs.py responses.jsonl -o bundles.tar.gz
+    python deploy_configs.py run-report.json -o bundles.zip     # pipeline --report output
+    python deploy_configs.py responses.jsonl -o - | tar tz      # tar.gz to stdout
+"""
+
+import argparse
+import io
+import json
+import re
+import sys
+import tarfile
+import time
+import zipfile
+
+import reference_data
+from intake_schema import get_path
+from shared_catalog import worker_table
+from tool_normalizer import Normalizer, slug
+
+# Reference files a bundle depends on (recommend() and the channel
+# normalizer included), for watch.py.
+REFERENCE_FILES = ("platform-comparison", "llm-model-comparison", "skills-catalog",
+                   "needs-mapping-matrix", "client-intake-form")
+
+# Fixed member timestamp (2026-01-01) so identical input gives identical archives.
+_MTIME = 1767225600
+
+_PLACEHOLDER = re.compile(r"\{\{\s*(\w+)(?:\|(\w+))?\s*\}\}")
+
+
+# ---------------------------------------------------------------------------
+# Template compiler
+# ---------------------------------------------------------------------------
+def _json(value):
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _comment(value):
+    return str(value).replace("\n", " ")
+
+
+def _yaml(value):
+    return _json(value)  # a JSON string is a valid YAML scalar
+
+
+FILTERS = {"json": _json, "text": str, "comment": _comment, "yaml": _yaml}
+
+
+class Template:
+    """A template compiled to [literal, (key, filter), literal, ...]."""
+
+    def __init__(self, text, default_filter="json"):
+        self.segments = []
+        pos = 0
+        for m in _PLACEHOLDER.finditer(text):
+            self.segments.append(text[pos:m.start()])
+            name = m.group(2) or default_filter
+            if name not in FILTERS:
+                raise ValueError(f"unknown template filter {name!r} in {m.group(0)}")
+            self.segments.append((m.group(1), FILTERS[name]))
+            pos = m.end()
+        self.segments.append(text[pos:])
+        self.keys = {s[0] for s in self.segments if isinstance(s, tuple)}
+
+    def render(self, context):
+        missing = self.keys - context.keys()
+        if missing:
+            raise KeyError(f"template needs {', '.join(sorted(missing))}")
+        return "".join(s if isinstance(s, str) else s[1](context[s[0]]) for s in self.segments)
+
+
+OPENCLAW_TEMPLATE = """\
+// OpenClaw configuration for {{ client|comment }} ({{ response_id|comment }})
+// Generated from the needs assessment -- review before deploying.
+{
+  agent: {
+    name: {{ agent_name }},
+    model: {{ model }},
+    provider: {{ provider }},
+  },
+  channels: {{ channels }},
+  skills: {{ skills }},
+  heartbeat: { enabled: true, quietHours: {{ quiet_hours }} },
+  security: { sandbox: {{ sandbox }}, redactPii: {{ redact_pii }}, regulations: {{ regulations }} },
+}
+"""
+
+PICOCLAW_TEMPLATE = """\
+{
+  "agent": {"name": {{ agent_name }}, "model": {{ model }}, "provider": {{ provider }}},
+  "channels": {{ channel_flags }},
+  "skills": {{ skills }},
+  "cron": {"enabled": true, "quiet_hours": {{ quiet_hours }}},
+  "sandbox": {"mode": {{ sandbox }}, "redact_pii": {{ redact_pii }}}
+}
+"""
+
+NANOCLAW_MEMORY_TEMPLATE = """\
+# {{ client|text }}
+
+Assistant for {{ client|text }} ({{ response_id|text }}).
+
+- Model: {{ model|text }} ({{ provider|text }})
+- Channels: {{ channel_list|text }}
+- Data sensitivity: {{ sensitivity|text }}; regulations: {{ regulation_list|text }}
+"""
+
+NANOCLAW_SKILL_TEMPLATE = """\
+---
+name: {{ skill|yaml }}
+description: {{ description|yaml }}
+---
+
+# {{ skill|text }}
+
+{{ description|text }}
+"""
+
+# platform key -> [(path template, compiled template, per_skill)]
+PLATFORM_FILES = {
+    "openclaw": [(".openclaw/openclaw.json", Template(OPENCLAW_TEMPLATE), False)],
+    "nanoclaw": [(".claude/CLAUDE.md", Template(NANOCLAW_MEMORY_TEMPLATE), False),
+                 (".claude/skills/{skill}/SKILL.md", Template(NANOCLAW_SKILL_TEMPLATE), True)],
+    "picoclaw": [(".picoclaw/config.json", Template(PICOCLAW_TEMPLATE), False)],
+}
+
+
+# ---------------------------------------------------------------------------
+# Client context
+# ---------------------------------------------------------------------------
+class ReferenceIndex:
+    """Lookups over the reference JSON, built once per batch."""
+
+    def __init__(self):
+        platforms = worker_table("platform-comparison")
+        if platforms is not None:
+            self.channels = dict(zip(platforms.names, platforms.lists("channels")))
+        else:
+            platforms = reference_data.load(reference_data.PLATFORMS)["platforms"]
+            self.channels = {key: p["channels"] for key, p in platforms.items()}
+        models = worker_table("llm-model-comparison")
+        if models is not None:
+            self.providers = dict(zip(models.names, models.text("provider")))
+        else:
+            self.providers = {m["name"]: m["provider"]
+                              for m in reference_data.load(reference_data.LLM_MODELS)["models"]}
+        skills = worker_table("skills-catalog")
+        if skills is not None:
+            self.skills = dict(zip(skills.names, skills.text("description")))
+        else:
+            self.skills = {s["name"]: s["description"]
+                           for s in reference_data.load(reference_data.SKILLS_CATALOG)["top_skills"]}
+        self.tools = Normalizer()
+
+
+def platform_keys(platform):
+    """"OpenClaw + NanoClaw" -> ["openclaw", "nanoclaw"]."""
+    keys = [p.strip().lower() for p in str(platform).split("+")]
+    unknown = [k for k in keys if k not in PLATFORM_FILES]
+    if unknown:
+        raise ValueError(f"no config template for platform(s): {', '.join(unknown)}")
+    return keys
+
+
+def client_context(record, recommendation, platform_key, ref):
+    client = (get_path(record, ("client_profile", "company"))
+              or get_path(record, ("client_profile", "name")) or record["response_id"])
+    # "MS Teams", "Other: whatsapp biz" ... resolve to the channels' canonical ids;
+    # strictly, since a wrong match would enable a channel the client never named.
+    wanted = {hit[0] for hits in ref.tools.resolve_many(
+        get_path(record, ("communication_preferences", "messaging_platforms")) or [], strict=True)
+        for hit in hits}
+    # No match enables no channel: picking one for the client would be a guess.
+    channels = [c for c in ref.channels[platform_key] if slug(c) in wanted]
+    sensitivity = get_path(record, ("data_privacy", "sensitivity")) or "Medium"
+    regulations = [r for r in get_path(record, ("data_privacy", "regulations")) or []
+                   if r != "None"]
+    availability = get_path(record, ("communication_preferences", "availability")) or ""
+    model = recommendation["llm_model"]
+    return {
+        "client": client,
+        "response_id": record["response_id"],
+        "agent_name": f"{client} assistant",
+        "model": model,
+        "provider": ref.providers.get(model, "unknown"),
+        "channels": channels,
+        "channel_list": ", ".join(channels) or "none",
+        "channel_flags": {c.lower(): {"enabled": True} for c in channels},
+        "skills": recommendation["skills"],
+        "sensitivity": sensitivity,
+        "sandbox": "strict" if sensitivity in ("High", "Critical") or regulations else "standard",
+        "redact_pii": sensitivity != "Low" or bool(regulations),
+        "regulations": regulations,
+        "regulation_list": ", ".join(regulations) or "none",
+        "quiet_hours": None if availability.startswith(("24/7", "Always")) else "20:00-08:00",
+    }
+
+
+def _safe(name):
+    """*name* as one archive path component: "../x" -> "_x", ".." -> "_"."""
+    return re.sub(r"[^\w.-]+", "_", str(name)).lstrip(".") or "_"
+
+
+def render_bundle(record, recommendation, ref):
+    """Yield (relative path, bytes) for every config file of one client."""
+    for key in platform_keys(recommendation["platform"]):
+        context = client_context(record, recommendation, key, ref)
+        for path, template, per_skill in PLATFORM_FILES[key]:
+            if not per_skill:
+                yield f"{key}/{path}", template.render(context).encode("utf-8")
+                continue
+            for skill in context["skills"]:
+                skill_ctx = {**context, "skill": skill,
+                             "description": ref.skills.get(skill, skill.replace("-", " ").capitalize())}
+                yield f"{key}/{path.format(skill=_safe(skill))}", template.render(skill_ctx).encode("utf-8")
+
+
+# ---------------------------------------------------------------------------
+# Archive sinks
+# ---------------------------------------------------------------------------
+class TarSink:
+    def __init__(self, fileobj, compress=True):
+        self._tar = tarfile.open(fileobj=fileobj, mode="w|gz" if compress else "w|")
+
+    def add(self, name, data):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = _MTIME
+        info.mode = 0o644
+        self._tar.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        self._tar.close()
+
+
+class ZipSink:
+    def __init__(self, fileobj):
+        self._zip = zipfile.ZipFile(fileobj, "w", zipfile.ZIP_DEFLATED)
+
+    def add(self, name, data):
+        info = zipfile.ZipInfo(name, date_time=time.gmtime(_MTIME)[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        self._zip.writestr(info, data)
+
+    def close(self):
+        self._zip.close()
+
+
+def open_sink(output):
+    """Pick the archive format from the file name; "-" streams tar.gz to stdout."""
+    if output == "-":
+        return TarSink(sys.stdout.buffer), None
+    fh = open(output, "wb")
+    if output.endswith(".zip"):
+        return ZipSink(fh), fh
+    return TarSink(fh, compress=output.endswith((".gz", ".tgz"))), fh
+
+
+# ---------------------------------------------------------------------------
+# Batch
+# ---------------------------------------------------------------------------
+def iter_clients(paths):
+    """Yield (record, recommendation or None) from .jsonl records, .json
+    records and pipeline --report files. A line or item that is not a JSON
+    object is yielded as is, for the caller to report."""
+    for path in paths:
+        with open(path, encoding="utf-8") as fh:
+            if path.endswith(".jsonl"):
+                for line in fh:
+                    if line.strip():
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            record = line.strip()  # reported as a failure downstream
+                        yield record, (record.get("recommendation")
+                                       if isinstance(record, dict) else None)
+                continue
+            data = json.load(fh)
+        if isinstance(data, dict) and "results" in data:  # pipeline report
+            for r in data["results"]:
+                yield r["record"], r["recommendation"]
+        else:
+            for record in data if isinstance(data, list) else [data]:
+                yield record, record.get("recommendation") if isinstance(record, dict) else None
+
+
+def write_bundles(clients, sink, ref=None):
+    """Stream every client's bundle into *sink*; returns (clients, files, failures)."""
+    from pipeline import recommend
+    ref = ref or ReferenceIndex()
+    done = files = 0
+    failures = []
+    for record, recommendation in clients:
+        if not isinstance(record, dict):
+            failures.append((f"client-{done + len(failures) + 1}",
+                             f"expected a JSON object, got {type(record).__name__} "
+                             f"{str(record)[:40]!r}"))
+            continue
+        rid = str(record.get("response_id", f"client-{done + len(failures) + 1}"))
+        try:
+            if recommendation is None:
+                recommendation = recommend({"source": rid, "record": record})["recommendation"]
+            bundle = list(render_bundle({**record, "response_id": rid}, recommendation, ref))
+        except Exception as exc:  # one bad client must not sink the batch
+            failures.append((rid, f"{type(exc).__name__}: {exc}"))
+            continue
+        safe = _safe(rid)
+        for path, data in bundle:
+            sink.add(f"{safe}/{path}", data)
+        done += 1
+        files += len(bundle)
+    return done, files, failures
+
+
+# ===================================================================
+#  MAIN
+# ===================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Emit per-client Claw platform configs")
+    parser.add_argument("inputs", nargs="+", help=".jsonl/.json records or a pipeline report")
+    parser.add_argument("-o", "--output", required=True,
+                        help="bundles.tar.gz, bundles.tar, bundles.zip, or - for tar.gz on stdout")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    sink, fh = open_sink(args.output)
+    try:
+        done, files, failures = write_bundles(iter_clients(args.inputs), sink)
+    finally:
+        sink.close()
+        if fh is not None:
+            fh.close()
+    log = sys.stderr if args.output == "-" else sys.stdout
+    print(f"{done} client bundle(s), {files} file(s) -> {args.output} "
+          f"in {time.perf_counter() - start:.2f}s", file=log)
+    for rid, error in failures:
+        print(f"  FAILED {rid}: {error}", file=log)
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,396 @@
+"""
+Deduplicating archive for returned questionnaires.
+Returned DOCX files are nearly identical: same styles, theme, settings and
+the same boilerplate paragraphs around each client's answers. The archive
+splits every file into
+
+    - the zip structure (local headers, central directory), kept raw;
+    - each member's payload: when zlib can reproduce the member's deflate
+      stream exactly, the *uncompressed* part is stored with the level that
+      recreates it; otherwise the compressed bytes are stored as they are;
+
+and cuts those byte streams into content-defined chunks. XML is cut after
+paragraph/row/control ends chosen by a hash of the preceding content, so
+an edit only changes the chunks around it. Each unique chunk is stored
+once under its BLAKE2 hash, deflated against a shared dictionary sampled
+from the first file or, when smaller, against the first file's chunk at
+the same position (a ticked box costs a few dozen bytes). Restores rebuild
+the original file byte for byte (checked against its SHA-256).
+
+Storage is a single SQLite file.
+
+Usage:
+    python docx_archive.py add archive.db returned/*.docx
+    python docx_archive.py extract archive.db client-42.docx -o restored.docx
+    python docx_archive.py list archive.db
+    python docx_archive.py stats archive.db
+    python docx_archive.py verify archive.db
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import re
+import sqlite3
+import struct
+import sys
+import time
+import zipfile
+import zlib
+
+DICT_SIZE = 32 * 1024          # zlib uses at most a 32 KiB dictionary
+MIN_CHUNK = 512
+MAX_CHUNK = 64 * 1024
+CUT_MASK = 0x3                 # ~1 in 4 anchors past MIN_CHUNK is a cut: ~1-2 KiB XML chunks
+BINARY_CHUNK = 64 * 1024       # fixed-size chunks for non-XML bytes
+TRY_LEVELS = (6, 9, 1, 2, 3, 4, 5, 7, 8)
+
+# Places a chunk may end in WordprocessingML parts; other XML falls back to MAX_CHUNK.
+_ANCHOR = re.compile(rb"</w:(?:p|tr|sdt|tbl|style|lsdException|abstractNum|num)>")
+
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+
+
+def xml_chunks(data):
+    """Content-defined chunks of an XML byte string."""
+    chunks = []
+    start = 0
+    last = 0
+    for m in _ANCHOR.finditer(data):
+        end = m.end()
+        size = end - start
+        if size < MIN_CHUNK:
+            last = end
+            continue
+        # The cut decision depends only on the element just closed, so the same
+        # content produces the same boundaries wherever it sits in the file.
+        if (zlib.crc32(data[last:end]) & CUT_MASK) == 0 or size >= MAX_CHUNK:
+            chunks.append(data[start:end])
+            start = end
+        last = end
+    if start < len(data):
+        chunks.append(data[start:])
+    return [c for part in chunks for c in _split_oversized(part)]
+
+
+def _split_oversized(data):
+    if len(data) <= MAX_CHUNK:
+        return [data]
+    return [data[i:i + MAX_CHUNK] for i in range(0, len(data), MAX_CHUNK)]
+
+
+def binary_chunks(data):
+    return [data[i:i + BINARY_CHUNK] for i in range(0, len(data), BINARY_CHUNK)] or [b""]
+
+
+def _deflate(data, level):
+    comp = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return comp.compress(data) + comp.flush()
+
+
+def reproducible_level(payload, raw):
+    """The zlib level that turns *raw* into exactly *payload*, or None."""
+    for level in TRY_LEVELS:
+        if _deflate(raw, level) == payload:
+            return level
+    return None
+
+
+def split_docx(data):
+    """Segments that concatenate back to *data*: [(key, transform, bytes)].
+
+    key names the zip member (or "zip:<n>" for the structure between
+    payloads); transform is "raw" (copy as is) or a zlib level (deflate the
+    stored bytes at that level on restore).
+    """
+    segments = []
+    pos = 0
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        infos = sorted(zf.infolist(), key=lambda i: i.header_offset)
+    for n, info in enumerate(infos):
+        offset = info.header_offset
+        fields = _LOCAL_HEADER.unpack_from(data, offset)
+        start = offset + _LOCAL_HEADER.size + fields[9] + fields[10]
+        end = start + info.compress_size
+        segments.append((f"zip:{n}", "raw", data[pos:start]))
+        payload = data[start:end]
+        transform = "raw"
+        if info.compress_type == zipfile.ZIP_DEFLATED:
+            try:
+                raw = zlib.decompress(payload, -15)
+            except zlib.error:
+                raw = None
+            level = reproducible_level(payload, raw) if raw is not None else None
+            if level is not None:
+                transform, payload = level, raw
+        segments.append((info.filename, transform, payload))
+        pos = end
+    segments.append((f"zip:{len(infos)}", "raw", data[pos:]))
+    return segments
+
+
+def _looks_like_xml(data):
+    return data[:1] == b"<"
+
+
+def _compress(data, zdict, level):
+    comp = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=zdict) if zdict else \
+        zlib.compressobj(level, zlib.DEFLATED, -15)
+    return comp.compress(data) + comp.flush()
+
+
+def _decompress(data, zdict):
+    d = zlib.decompressobj(-15, zdict=zdict) if zdict else zlib.decompressobj(-15)
+    return d.decompress(data) + d.flush()
+
+
+class DocxArchive:
+    """Chunk store + per-file manifests in one SQLite database.
+
+    The first file archived becomes the reference: its chunks are stored
+    against the shared dictionary, and a new chunk of a later file is
+    stored as a delta against the reference chunk at the same position
+    (zlib with that chunk as dictionary) when that is smaller. Manifests are
+    compressed against the reference manifest, so a file that shares most
+    chunks with it costs a few hundred bytes.
+    """
+
+    def __init__(self, path, level=9):
+        self.path = path
+        self.level = level
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value BLOB NOT NULL);
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY,
+                hash BLOB NOT NULL UNIQUE,
+                base INTEGER NOT NULL,      -- 0: shared dictionary, else a chunk id
+                size INTEGER NOT NULL,
+                data BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                name TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                added REAL NOT NULL,
+                manifest BLOB NOT NULL
+            );
+        """)
+        self._load_state()
+
+    def _load_state(self):
+        """(Re)read the in-memory view of the archive from the database."""
+        meta = dict(self._conn.execute("SELECT key, value FROM meta"))
+        self._dictionary = meta.get("dictionary")
+        self._reference = meta.get("reference")      # manifest JSON bytes of the first file
+        self._ref_ids = ({key: ids for key, _, ids in json.loads(self._reference)}
+                         if self._reference else {})
+        self._ids = dict(self._conn.execute("SELECT hash, id FROM chunks"))
+        self._raw = {}   # chunk id -> bytes, for delta bases
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """Commit on success; on failure roll back and drop the in-memory
+        dictionary, reference and chunk ids that pointed at rolled-back rows."""
+        try:
+            with self._conn:
+                yield
+        except BaseException:
+            self._load_state()
+            raise
+
+    # -- writing ------------------------------------------------------------
+    def add(self, name, data):
+        """Archive one file's bytes; returns the number of new bytes stored."""
+        with self._transaction():
+            return self._add(name, data)
+
+    def add_files(self, paths, name=os.path.basename):
+        """Archive several files in one transaction; all or none are stored."""
+        stored = 0
+        with self._transaction():
+            for path in paths:
+                with open(path, "rb") as fh:
+                    stored += self._add(name(path), fh.read())
+        return stored
+
+    def _add(self, name, data):
+        segments = split_docx(data)
+        if self._dictionary is None:
+            self._train_dictionary(segments)
+        manifest, stored = [], 0
+        for key, transform, payload in segments:
+            pieces = xml_chunks(payload) if _looks_like_xml(payload) else binary_chunks(payload)
+            bases = self._ref_ids.get(key) or []
+            ids = []
+            for j, piece in enumerate(pieces):
+                h = hashlib.blake2b(piece, digest_size=16).digest()
+                chunk_id = self._ids.get(h)
+                if chunk_id is None:
+                    base = bases[min(j, len(bases) - 1)] if bases else 0
+                    chunk_id, size = self._put_chunk(h, piece, base)
+                    stored += size
+                ids.append(chunk_id)
+            manifest.append([key, transform, ids])
+
+        text = json.dumps(manifest, separators=(",", ":")).encode()
+        if self._reference is None:
+            self._reference = text
+            self._ref_ids = {key: ids for key, _, ids in manifest}
+            self._conn.execute("INSERT INTO meta VALUES ('reference', ?)", (text,))
+        packed = _compress(text, self._reference, 9)
+        self._conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                           (name, len(data), hashlib.sha256(data).hexdigest(), time.time(), packed))
+        return stored + len(packed)
+
+    def _put_chunk(self, h, piece, base):
+        data = _compress(piece, self._dictionary, self.level)
+        if base:
+            delta = _compress(piece, self._base_bytes(base), self.level)
+            if len(delta) < len(data):
+                data = delta
+            else:
+                base = 0
+        cur = self._conn.execute("INSERT INTO chunks (hash, base, size, data) VALUES (?, ?, ?, ?)",
+                                 (h, base, len(piece), data))
+        self._ids[h] = cur.lastrowid
+        return cur.lastrowid, len(data)
+
+    def _base_bytes(self, chunk_id):
+        raw = self._raw.get(chunk_id)
+        if raw is None:
+            raw = self._raw[chunk_id] = self._get_chunks([chunk_id])[chunk_id]
+        return raw
+
+    def _train_dictionary(self, segments):
+        """Evenly spaced slices of the first file's document.xml (or its largest
+        XML part): the body is what differs between returned files."""
+        xml = {key: p for key, _, p in segments if _looks_like_xml(p)}
+        source = xml.get("word/document.xml") or max(xml.values(), key=len, default=b"")
+        step = max(len(source) // 16, 1)
+        width = DICT_SIZE // 16
+        self._dictionary = b"".join(source[i:i + width] for i in range(0, len(source), step))[:DICT_SIZE]
+        self._conn.execute("INSERT INTO meta VALUES ('dictionary', ?)", (self._dictionary,))
+
+    # -- reading ------------------------------------------------------------
+    def extract(self, name):
+        """The original bytes of *name*, verified against its SHA-256."""
+        row = self._conn.execute("SELECT manifest, sha256 FROM files WHERE name = ?",
+                                 (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        manifest = json.loads(_decompress(row[0], self._reference))
+        chunks = self._get_chunks({i for _, _, ids in manifest for i in ids})
+        out = []
+        for _, transform, ids in manifest:
+            data = b"".join(chunks[i] for i in ids)
+            out.append(data if transform == "raw" else _deflate(data, transform))
+        data = b"".join(out)
+        if hashlib.sha256(data).hexdigest() != row[1]:
+            raise ValueError(f"{name}: restored bytes do not match the archived checksum")
+        return data
+
+    def _get_chunks(self, ids):
+        ids = list(ids)
+        out, deltas = {}, []
+        for i in range(0, len(ids), 500):
+            batch = ids[i:i + 500]
+            rows = self._conn.execute(
+                f"SELECT id, base, data FROM chunks WHERE id IN ({','.join('?' * len(batch))})",
+                batch)
+            for chunk_id, base, data in rows:
+                if base:
+                    deltas.append((chunk_id, base, data))
+                else:
+                    out[chunk_id] = _decompress(data, self._dictionary)
+        for chunk_id, base, data in deltas:
+            out[chunk_id] = _decompress(data, out.get(base) or self._base_bytes(base))
+        if len(out) < len(set(ids)):
+            raise ValueError(f"archive is missing {len(set(ids)) - len(out)} chunk(s)")
+        return out
+
+    def names(self):
+        return [r[0] for r in self._conn.execute("SELECT name FROM files ORDER BY name")]
+
+    def stats(self):
+        files, original, manifests = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(manifest)), 0) FROM files"
+        ).fetchone()
+        chunks, deltas, chunk_raw, chunk_stored = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(base > 0), 0), COALESCE(SUM(size), 0), "
+            "COALESCE(SUM(LENGTH(data)), 0) FROM chunks").fetchone()
+        stored = (chunk_stored + manifests + len(self._dictionary or b"")
+                  + len(self._reference or b""))
+        return {
+            "files": files,
+            "original_bytes": original,
+            "unique_chunks": chunks,
+            "delta_chunks": deltas,
+            "unique_chunk_bytes": chunk_raw,
+            "chunk_bytes": chunk_stored,
+            "manifest_bytes": manifests,
+            "stored_bytes": stored,
+            "ratio": round(original / stored, 1) if stored else None,
+        }
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ===================================================================
+#  MAIN
+# ===================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Deduplicating DOCX archive")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("add", help="archive files (stored under their base name)")
+    p.add_argument("archive")
+    p.add_argument("files", nargs="+")
+    p = sub.add_parser("extract", help="restore one file")
+    p.add_argument("archive")
+    p.add_argument("name")
+    p.add_argument("-o", "--output")
+    for name in ("list", "stats", "verify"):
+        sub.add_parser(name).add_argument("archive")
+    args = parser.parse_args(argv)
+
+    with DocxArchive(args.archive) as archive:
+        if args.command == "add":
+            start = time.perf_counter()
+            stored = archive.add_files(args.files)
+            total = sum(os.path.getsize(f) for f in args.files)
+            print(f"Added {len(args.files)} file(s), {total:,} bytes -> {stored:,} new bytes "
+                  f"in {time.perf_counter() - start:.2f}s")
+        elif args.command == "extract":
+            data = archive.extract(args.name)
+            with open(args.output or args.name, "wb") as fh:
+                fh.write(data)
+            print(f"Restored {args.name} ({len(data):,} bytes)")
+        elif args.command == "list":
+            for name in archive.names():
+                print(name)
+        elif args.command == "stats":
+            print(json.dumps(archive.stats(), indent=2))
+        else:
+            start = time.perf_counter()
+            names = archive.names()
+            for name in names:
+                archive.extract(name)
+            print(f"{len(names)} file(s) restored and verified "
+                  f"in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Read answers back out of a returned questionnaire.
+Works on documents generated with --content-controls: every answer slot is
+a content control tagged with a stable field id, so extraction is a single
+streaming pass over word/document.xml that only looks at tagged nodes.
+
+Usage:
+    python extract_answers.py returned.docx [more.docx ...]   # prints JSON records
+"""
+
+import json
+import os
+import sys
+import zipfile
+
+from lxml import etree
+
+from intake_schema import MULTI_CHOICE, field_options, option_index
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+W14 = "{http://schemas.microsoft.com/office/word/2010/wordml}"
+
+# Tags whose values are collected into lists / dicts instead of single values.
+LIST_FIELDS = {"capabilities", "integrations"}
+RATING_FIELD = "ratings"
+DETAIL_SUFFIX = ".detail"
+
+
+def iter_controls(source):
+    """Yield (tag, alias, kind, value) for every content control in a DOCX.
+
+    kind is "checkbox" (value: bool), "dropdown" (value: str or None) or
+    "text" (value: str or None; None while the placeholder is showing).
+    """
+    with zipfile.ZipFile(source) as zf, zf.open("word/document.xml") as fh:
+        for _, sdt in etree.iterparse(fh, events=("end",), tag=W + "sdt"):
+            pr = sdt.find(W + "sdtPr")
+            tag = pr.find(W + "tag") if pr is not None else None
+            if tag is None:
+                sdt.clear()
+                continue
+            alias = pr.find(W + "alias")
+            alias = alias.get(W + "val") if alias is not None else None
+            content = sdt.find(W + "sdtContent")
+            text = "".join(content.itertext()) if content is not None else ""
+            placeholder = pr.find(W + "showingPlcHdr") is not None
+            box = pr.find(W14 + "checkbox")
+            if box is not None:
+                checked = box.find(W14 + "checked")
+                value = checked is not None and checked.get(W14 + "val") in ("1", "true")
+                yield tag.get(W + "val"), alias, "checkbox", value
+            elif pr.find(W + "dropDownList") is not None or pr.find(W + "comboBox") is not None:
+                yield tag.get(W + "val"), alias, "dropdown", None if placeholder else text.strip()
+            else:
+                yield tag.get(W + "val"), alias, "text", None if placeholder else text.strip()
+            sdt.clear()
+
+
+def _set_path(record, path, value):
+    node = record
+    keys = path.split(".")
+    for key in keys[:-1]:
+        node = node.setdefault(key, {})
+    node[keys[-1]] = value
+
+
+def extract(source):
+    """Return a response record (see intake_schema) for one DOCX."""
+    checked = {}   # field -> [option, ...] in document order
+    details = {}   # (field, option) -> write-in text
+    texts = {}
+    ratings = {}
+    for tag, alias, kind, value in iter_controls(source):
+        if kind == "checkbox":
+            if value:
+                checked.setdefault(tag, []).append(alias)
+        elif kind == "dropdown":
+            if tag == RATING_FIELD and value and value.isdigit():
+                ratings[alias] = int(value)
+        elif value:
+            if tag.endswith(DETAIL_SUFFIX):
+                details[(tag[:-len(DETAIL_SUFFIX)], alias)] = value
+            else:
+                texts[tag] = value
+
+    record = {}
+    for path, value in texts.items():
+        _set_path(record, path, value)
+    for field, options in checked.items():
+        options = [f"{o}: {details[(field, o)]}" if (field, o) in details else o
+                   for o in dict.fromkeys(options)]  # A4 and B3 share tags
+        _set_path(record, field, _field_value(field, options))
+    if ratings:
+        record[RATING_FIELD] = ratings
+    return record
+
+
+def _field_value(field, options):
+    """Checklists and the form's "multiple" fields are lists; every other
+    field gets one value, in the form's own spelling when it has one (the
+    first ticked box wins)."""
+    path = tuple(field.split("."))
+    if field in LIST_FIELDS or path in MULTI_CHOICE:
+        return options
+    try:
+        choices = field_options(path)
+    except KeyError:
+        return options[0]
+    i = option_index(choices, options[0])
+    return choices[i] if i >= 0 else options[0]
+
+
+def main(argv=None):
+    paths = sys.argv[1:] if argv is None else argv
+    if not paths:
+        print(__doc__.strip())
+        return 2
+    for path in paths:
+        record = extract(path)
+        record.setdefault("response_id", os.path.splitext(os.path.basename(path))[0])
+        print(json.dumps(record, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,9 +8,16 @@ from docx import Document
 from docx.shared import Pt, Cm, RGBColor, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.table import WD_TABLE_ALIGNMENT
-from docx.oxml.ns import nsdecls
-from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+from docx.oxml import OxmlElement, parse_xml
+import argparse
+import copy
 import os
+import re
+
+from lxml import etree
+
+from package_writer import PackageWriter
 
 # ---------------------------------------------------------------------------
 # Design tokens
@@ -26,6 +33,22 @@ TABLE_HEADER_HEX = "006699"
 ALT_ROW_HEX = "F2F2F2"
 HIGHLIGHT_BOX_HEX = "E8F4F8"
 FIELD_BG_HEX = "F7F7F7"
+BODY_FONT = "Calibri"
+
+# Theme slots the brandable tokens are emitted as (see theme_refs), keyed by
+# (where the colour appears, hex). A brand then only swaps the theme and
+# styles parts (brands.py); w:val keeps the house colour as the fallback.
+THEME_SLOTS = {
+    ("color", str(TEAL)): "accent1",
+    ("color", str(DARK_TEAL)): "accent2",
+    ("color", str(DARK_GRAY)): "dark2",
+    ("color", str(WHITE)): "light2",
+    ("fill", TABLE_HEADER_HEX): "accent3",
+    ("border", TABLE_HEADER_HEX): "accent3",
+    ("fill", ALT_ROW_HEX): "accent4",
+    ("fill", HIGHLIGHT_BOX_HEX): "accent5",
+    ("fill", FIELD_BG_HEX): "accent6",
+}
 
 CHECKBOX = "\u2610"
 OUTPUT = r"C:\Users\Software Engineering\Desktop\AI_Agent_Client_Needs_Assessment.docx"
@@ -59,6 +82,107 @@ def set_cell_borders(cell, color="006699", size="4"):
     tcPr.append(borders)
 
 
+_BORDER_TAGS = tuple(qn(f"w:{side}") for side in ("top", "left", "bottom", "right"))
+_HEADING_STYLES = ("Heading", "Title")
+
+
+def theme_refs(elements):
+    """Point the brandable colours and the body font of *elements* (in place)
+    at theme slots, so the theme part decides how they render."""
+    w_val, w_color, w_fill = qn("w:val"), qn("w:color"), qn("w:fill")
+    for root in elements:
+        for el in root.iter(w_color, qn("w:shd"), *_BORDER_TAGS):
+            if el.tag == w_color:
+                slot, attr = THEME_SLOTS.get(("color", el.get(w_val))), "w:themeColor"
+            elif el.tag == qn("w:shd"):
+                slot, attr = THEME_SLOTS.get(("fill", el.get(w_fill))), "w:themeFill"
+            else:
+                slot, attr = THEME_SLOTS.get(("border", el.get(w_color))), "w:themeColor"
+            if slot:
+                el.set(qn(attr), slot)
+        for p in root.iter(qn("w:p")):
+            style = p.find(f"{qn('w:pPr')}/{qn('w:pStyle')}")
+            major = style is not None and style.get(w_val).startswith(_HEADING_STYLES)
+            font = "majorHAnsi" if major else "minorHAnsi"
+            for rfonts in p.iter(qn("w:rFonts")):
+                if rfonts.get(qn("w:ascii")) == BODY_FONT:
+                    rfonts.set(qn("w:asciiTheme"), font)
+                    rfonts.set(qn("w:hAnsiTheme"), font)
+    return elements
+
+
+# ---------------------------------------------------------------------------
+# Content controls
+# ---------------------------------------------------------------------------
+# When enabled, every answer slot is emitted as a Word content control (SDT)
+# whose tag is a stable field id matching client-intake-form.json key paths
+# (e.g. "client_profile.industry"); the alias holds the option or item text.
+CONTENT_CONTROLS = False
+
+_BLANK = re.compile(r"_{3,}")
+
+
+def use_content_controls(enabled=True):
+    global CONTENT_CONTROLS
+    CONTENT_CONTROLS = enabled
+
+
+def option_label(text):
+    """Option text without its write-in blank ("Other: ____" -> "Other")."""
+    text = re.sub(r"\s*\([^()]*_{3,}[^()]*\)", "", text)
+    return re.sub(r"[:\s]*_{3,}.*$", "", text).strip()
+
+
+def _val(tag, value):
+    el = OxmlElement(tag)
+    el.set(qn(tag.split(":")[0] + ":val"), value)
+    return el
+
+
+def wrap_in_control(run, tag, alias, control, placeholder=False):
+    """Move *run* inside a run-level content control."""
+    sdt = OxmlElement("w:sdt")
+    pr = OxmlElement("w:sdtPr")
+    pr.append(_val("w:alias", alias))
+    pr.append(_val("w:tag", tag))
+    if placeholder:
+        pr.append(OxmlElement("w:showingPlcHdr"))
+    pr.append(control)
+    content = OxmlElement("w:sdtContent")
+    sdt.append(pr)
+    sdt.append(content)
+    run._r.addprevious(sdt)
+    content.append(run._r)
+    return sdt
+
+
+def checkbox_control():
+    box = OxmlElement("w14:checkbox")
+    box.append(_val("w14:checked", "0"))
+    for name, glyph in (("w14:checkedState", "2612"), ("w14:uncheckedState", "2610")):
+        state = _val(name, glyph)
+        state.set(qn("w14:font"), "MS Gothic")
+        box.append(state)
+    return box
+
+
+def text_control(multiline=False):
+    control = OxmlElement("w:text")
+    if multiline:
+        control.set(qn("w:multiLine"), "1")
+    return control
+
+
+def rating_control():
+    control = OxmlElement("w:dropDownList")
+    for n in "12345":
+        item = OxmlElement("w:listItem")
+        item.set(qn("w:displayText"), n)
+        item.set(qn("w:value"), n)
+        control.append(item)
+    return control
+
+
 # ---------------------------------------------------------------------------
 # Paragraph helpers
 # ---------------------------------------------------------------------------
@@ -101,12 +225,15 @@ def body_multi(doc, segments, space_after=Pt(6)):
     return p
 
 
-def checkbox(doc, text, indent_cm=0.5):
+def checkbox(doc, text, indent_cm=0.5, field=None):
     p = doc.add_paragraph()
     if indent_cm:
         p.paragraph_format.left_indent = Cm(indent_cm)
     p.paragraph_format.space_after = Pt(2)
     p.paragraph_format.space_before = Pt(1)
+    if CONTENT_CONTROLS and field:
+        _checkbox_controls(p, text, field)
+        return p
     run = p.add_run(f"{CHECKBOX}  {text}")
     run.font.size = Pt(11)
     run.font.name = "Calibri"
@@ -114,7 +241,30 @@ def checkbox(doc, text, indent_cm=0.5):
     return p
 
 
-def answer_line(doc, label="", width=65):
+def _gray_run(p, text, color=DARK_GRAY):
+    run = p.add_run(text)
+    run.font.size = Pt(11)
+    run.font.name = "Calibri"
+    run.font.color.rgb = color
+    return run
+
+
+def _checkbox_controls(p, text, field):
+    """Checkbox control for *text*; a write-in blank becomes a text control."""
+    option = option_label(text)
+    wrap_in_control(_gray_run(p, CHECKBOX), field, option, checkbox_control())
+    blank = _BLANK.search(text)
+    if blank is None:
+        _gray_run(p, f"  {text}")
+        return
+    _gray_run(p, f"  {text[:blank.start()]}")
+    wrap_in_control(_gray_run(p, blank.group(), LIGHT_LINE), f"{field}.detail", option,
+                    text_control(), placeholder=True)
+    if text[blank.end():]:
+        _gray_run(p, text[blank.end():])
+
+
+def answer_line(doc, label="", width=65, field=None):
     p = doc.add_paragraph()
     p.paragraph_format.space_after = Pt(4)
     if label:
@@ -126,10 +276,12 @@ def answer_line(doc, label="", width=65):
     r2 = p.add_run("_" * width)
     r2.font.size = Pt(11)
     r2.font.color.rgb = LIGHT_LINE
+    if CONTENT_CONTROLS and field:
+        wrap_in_control(r2, field, label or field, text_control(), placeholder=True)
     return p
 
 
-def open_field(doc, lines=4):
+def open_field(doc, lines=4, field=None):
     """A light-gray box with blank lines for free-text answers."""
     tbl = doc.add_table(rows=1, cols=1)
     tbl.style = "Table Grid"
@@ -138,6 +290,11 @@ def open_field(doc, lines=4):
     shade_cell(cell, FIELD_BG_HEX)
     set_cell_borders(cell, color="CCCCCC", size="4")
     cell.text = ""
+    if CONTENT_CONTROLS and field:
+        hint = _gray_run(cell.paragraphs[0], "Type your answer here", MED_GRAY)
+        hint.italic = True
+        wrap_in_control(hint, field, field.rsplit(".", 1)[-1], text_control(multiline=True),
+                        placeholder=True)
     for _ in range(lines):
         cp = cell.add_paragraph("")
         cp.paragraph_format.space_after = Pt(2)
@@ -148,11 +305,15 @@ def open_field(doc, lines=4):
     return tbl
 
 
-def rating_item(doc, text, indent_cm=0.5):
+def rating_item(doc, text, indent_cm=0.5, field=None):
     p = doc.add_paragraph()
     if indent_cm:
         p.paragraph_format.left_indent = Cm(indent_cm)
     p.paragraph_format.space_after = Pt(2)
+    if CONTENT_CONTROLS and field:
+        wrap_in_control(_gray_run(p, "___"), field, text, rating_control(), placeholder=True)
+        _gray_run(p, f"  {text}")
+        return p
     r = p.add_run(f"___  {text}")
     r.font.size = Pt(11)
     r.font.name = "Calibri"
@@ -393,10 +554,10 @@ def build_a1(doc):
     heading(doc, "A1. About You", 1)
 
     body(doc, "1. Full Name:", bold=True)
-    answer_line(doc)
+    answer_line(doc, field="client_profile.name")
 
     body(doc, "2. What do you do for work?", bold=True)
-    answer_line(doc)
+    answer_line(doc, field="client_profile.occupation")
 
     body(doc, "3. How would you describe your typical day? (Check all that apply)", bold=True)
     for item in [
@@ -410,12 +571,12 @@ def build_a1(doc):
         "I travel frequently and need things organized",
         "I manage a property or rental business",
     ]:
-        checkbox(doc, item)
-    checkbox(doc, "Other: ___________________________")
+        checkbox(doc, item, field="private.typical_day")
+    checkbox(doc, "Other: ___________________________", field="private.typical_day")
 
     spacer(doc, 1)
     body(doc, "4. What frustrates you most in your daily routine?", bold=True)
-    open_field(doc, lines=4)
+    open_field(doc, lines=4, field="open_fields.a1_frustrations")
 
     spacer(doc, 1)
     body(doc, "5. How many hours per week do you spend on repetitive tasks you wish someone else could handle?", bold=True)
@@ -425,46 +586,52 @@ def build_a1(doc):
         "5\u201310 hours",
         "More than 10 hours",
     ]:
-        checkbox(doc, item)
+        checkbox(doc, item, field="private.repetitive_hours")
+
+
+A2_MESSAGING_APPS = ["WhatsApp", "Telegram", "iMessage", "Signal", "Discord", "SMS"]
+A2_EMAIL_PROVIDERS = ["Gmail", "Outlook / Hotmail", "Yahoo", "ProtonMail", "Work email"]
+A2_CALENDARS = ["Google Calendar", "Apple Calendar", "Outlook Calendar", "None"]
+A2_TOOLS = [
+    "Google Drive / Docs",
+    "Dropbox",
+    "Notion",
+    "Evernote",
+    "Trello",
+    "Todoist",
+    "Spotify",
+    "Smart home devices (Alexa, Google Home, Philips Hue)",
+    "Accounting software (QuickBooks, FreshBooks, etc.)",
+    "Social media management tools",
+    "None of these",
+]
 
 
 def build_a2(doc):
     heading(doc, "A2. Your Digital Life", 1)
 
     body(doc, "1. Which messaging apps do you use daily? (Check all that apply)", bold=True)
-    for item in ["WhatsApp", "Telegram", "iMessage", "Signal", "Discord", "SMS"]:
-        checkbox(doc, item)
-    checkbox(doc, "Other: ___________________________")
+    for item in A2_MESSAGING_APPS:
+        checkbox(doc, item, field="communication_preferences.messaging_platforms")
+    checkbox(doc, "Other: ___________________________", field="communication_preferences.messaging_platforms")
 
     spacer(doc, 1)
     body(doc, "2. Which email provider(s) do you use?", bold=True)
-    for item in ["Gmail", "Outlook / Hotmail", "Yahoo", "ProtonMail", "Work email"]:
-        checkbox(doc, item)
-    checkbox(doc, "Other: ___________________________")
+    for item in A2_EMAIL_PROVIDERS:
+        checkbox(doc, item, field="private.email_providers")
+    checkbox(doc, "Other: ___________________________", field="private.email_providers")
 
     spacer(doc, 1)
     body(doc, "3. Which calendar do you use?", bold=True)
-    for item in ["Google Calendar", "Apple Calendar", "Outlook Calendar", "None"]:
-        checkbox(doc, item)
-    checkbox(doc, "Other: ___________________________")
+    for item in A2_CALENDARS:
+        checkbox(doc, item, field="private.calendar")
+    checkbox(doc, "Other: ___________________________", field="private.calendar")
 
     spacer(doc, 1)
     body(doc, "4. Do you use any of these tools?", bold=True)
-    for item in [
-        "Google Drive / Docs",
-        "Dropbox",
-        "Notion",
-        "Evernote",
-        "Trello",
-        "Todoist",
-        "Spotify",
-        "Smart home devices (Alexa, Google Home, Philips Hue)",
-        "Accounting software (QuickBooks, FreshBooks, etc.)",
-        "Social media management tools",
-        "None of these",
-    ]:
-        checkbox(doc, item)
-    checkbox(doc, "Other: ___________________________")
+    for item in A2_TOOLS:
+        checkbox(doc, item, field="private.tools")
+    checkbox(doc, "Other: ___________________________", field="private.tools")
 
     spacer(doc, 1)
     body(doc, "5. Where do you prefer to interact with your AI assistant?", bold=True)
@@ -476,7 +643,7 @@ def build_a2(doc):
         "Voice commands",
         "I don't know yet",
     ]:
-        checkbox(doc, item)
+        checkbox(doc, item, field="communication_preferences.preferred_channel")
 
     spacer(doc, 1)
     body(doc, "6. Where should your AI assistant run?", bold=True)
@@ -489,68 +656,62 @@ def build_a2(doc):
         "I don\u2019t have hardware \u2014 I\u2019d like you to handle this (Managed Service)",
         "I\u2019m not sure \u2014 let\u2019s discuss",
     ]:
-        checkbox(doc, item)
+        checkbox(doc, item, field="private.hosting")
 
 
-def build_a3(doc):
-    heading(doc, "A3. What Would You Love Your AI Assistant To Do?", 1)
-
-    p = doc.add_paragraph()
-    p.paragraph_format.space_after = Pt(8)
-    r = p.add_run(
-        "Imagine you had a personal assistant available 24/7. "
-        "What would you ask them to do?"
-    )
-    r.font.size = Pt(11)
-    r.font.name = "Calibri"
-    r.font.color.rgb = DARK_GRAY
-    r.italic = True
-
-    body(doc, "Rate each item from 1 (not interested) to 5 (I need this!):", bold=True)
-
-    spacer(doc, 1)
-    body(doc, "Daily Life", bold=True, color=TEAL)
-    for item in [
+A3_WISHLIST = [
+    ("Daily Life", [
         "Read and summarize my emails every morning",
         "Manage my calendar \u2014 schedule, remind, reschedule",
         "Give me a daily briefing (weather, news, to-dos)",
         "Help me plan trips and travel itineraries",
         "Track my expenses and send me weekly summaries",
         "Remind me of important dates and follow-ups",
-    ]:
-        rating_item(doc, item)
-
-    spacer(doc, 1)
-    body(doc, "Communication", bold=True, color=TEAL)
-    for item in [
+    ]),
+    ("Communication", [
         "Auto-reply to routine messages when I'm busy",
         "Draft professional emails based on my notes",
         "Translate messages in real-time",
         "Send scheduled messages to contacts",
         "Manage group chats or community channels",
-    ]:
-        rating_item(doc, item)
-
-    spacer(doc, 1)
-    body(doc, "Work & Productivity", bold=True, color=TEAL)
-    for item in [
+    ]),
+    ("Work & Productivity", [
         "Research topics and give me summaries",
         "Write or edit documents, reports, or proposals",
         "Create presentations",
         "Monitor news or social media for specific topics",
         "Manage my files and organize documents",
-    ]:
-        rating_item(doc, item)
-
-    spacer(doc, 1)
-    body(doc, "Smart Home & Lifestyle", bold=True, color=TEAL)
-    for item in [
+    ]),
+    ("Smart Home & Lifestyle", [
         "Control my smart lights, thermostat, etc.",
         "Morning/evening routines automation",
         "Meal planning and recipe suggestions",
         "Fitness/health tracking reminders",
-    ]:
-        rating_item(doc, item)
+    ]),
+]
+
+
+def build_a3(doc):
+    heading(doc, "A3. What Would You Love Your AI Assistant To Do?", 1)
+
+    p = doc.add_paragraph()
+    p.paragraph_format.space_after = Pt(8)
+    r = p.add_run(
+        "Imagine you had a personal assistant available 24/7. "
+        "What would you ask them to do?"
+    )
+    r.font.size = Pt(11)
+    r.font.name = "Calibri"
+    r.font.color.rgb = DARK_GRAY
+    r.italic = True
+
+    body(doc, "Rate each item from 1 (not interested) to 5 (I need this!):", bold=True)
+
+    for category, items in A3_WISHLIST:
+        spacer(doc, 1)
+        body(doc, category, bold=True, color=TEAL)
+        for item in items:
+            rating_item(doc, item, field="ratings")
 
 
 # ---------------------------------------------------------------------------
@@ -621,15 +782,21 @@ CAPS_INTRO = (
 )
 
 
-def _build_capabilities_section(doc, section_heading):
-    """Shared helper: emit a capabilities checklist with all 40 items."""
-    heading(doc, section_heading, 1)
+def _build_capabilities_checklist(doc):
     body(doc, CAPS_INTRO, italic=True)
     for category, items in CAPABILITIES:
         spacer(doc, 1)
         heading(doc, category, 2)
         for item in items:
-            checkbox(doc, item)
+            checkbox(doc, item, field="capabilities")
+
+
+def _build_capabilities_section(doc, section_heading):
+    """Shared helper: emit a capabilities checklist with all 40 items.
+    The checklist itself is built once per process and spliced in.
+    """
+    heading(doc, section_heading, 1)
+    splice(doc, section_fragment("capabilities"))
 
 
 def build_a4_caps(doc):
@@ -640,85 +807,65 @@ def build_b3_caps(doc):
     _build_capabilities_section(doc, "B3. Choose What Your AI Assistant Should Do")
 
 
-def build_a5_integration(doc):
-    heading(doc, "A5. Integration & Automation", 1)
-
-    p = doc.add_paragraph()
-    p.paragraph_format.space_after = Pt(8)
-    r = p.add_run(
-        "Which of your existing tools and services would you like your AI assistant "
-        "to connect with and automate?"
-    )
-    r.font.size = Pt(11)
-    r.font.name = "Calibri"
-    r.font.color.rgb = DARK_GRAY
-    r.italic = True
-
-    # Email & Communication
-    spacer(doc, 1)
-    body(doc, "Email & Communication", bold=True, color=TEAL)
-    for item in [
+A5_INTEGRATIONS = [
+    ("Email & Communication", [
         "Read and manage my Gmail / Outlook inbox",
         "Send emails on my behalf (with my approval)",
         "Auto-sort emails into categories (urgent, newsletters, receipts)",
         "Forward important emails to my WhatsApp / Telegram",
-    ]:
-        checkbox(doc, item)
-
-    # Calendar & Scheduling
-    spacer(doc, 1)
-    body(doc, "Calendar & Scheduling", bold=True, color=TEAL)
-    for item in [
+    ]),
+    ("Calendar & Scheduling", [
         "Automatically add events from emails to my calendar",
         "Send me reminders before meetings",
         "Find free time slots and propose meetings",
         "Sync across multiple calendars",
-    ]:
-        checkbox(doc, item)
-
-    # Files & Documents
-    spacer(doc, 1)
-    body(doc, "Files & Documents", bold=True, color=TEAL)
-    for item in [
+    ]),
+    ("Files & Documents", [
         "Organize files in my Google Drive / Dropbox",
         "Convert documents between formats",
         "Extract key information from PDFs and documents",
         "Backup important files automatically",
-    ]:
-        checkbox(doc, item)
-
-    # Finance & Shopping
-    spacer(doc, 1)
-    body(doc, "Finance & Shopping", bold=True, color=TEAL)
-    for item in [
+    ]),
+    ("Finance & Shopping", [
         "Track my subscriptions and alert me before renewals",
         "Categorize my expenses from receipts / bank notifications",
         "Compare prices when I want to buy something",
         "Send me budget summaries",
-    ]:
-        checkbox(doc, item)
-
-    # Social Media
-    spacer(doc, 1)
-    body(doc, "Social Media", bold=True, color=TEAL)
-    for item in [
+    ]),
+    ("Social Media", [
         "Post to my social media accounts on schedule",
         "Monitor mentions and comments",
         "Generate content ideas based on trending topics",
         "Track my followers and engagement",
-    ]:
-        checkbox(doc, item)
-
-    # Smart Home
-    spacer(doc, 1)
-    body(doc, "Smart Home", bold=True, color=TEAL)
-    for item in [
+    ]),
+    ("Smart Home", [
         "Control lights, heating, and appliances",
         "Set up morning / evening automation routines",
         "Security alerts from cameras / sensors",
         "Voice-activated commands via messaging app",
-    ]:
-        checkbox(doc, item)
+    ]),
+]
+
+
+def build_a5_integration(doc):
+    heading(doc, "A5. Integration & Automation", 1)
+
+    p = doc.add_paragraph()
+    p.paragraph_format.space_after = Pt(8)
+    r = p.add_run(
+        "Which of your existing tools and services would you like your AI assistant "
+        "to connect with and automate?"
+    )
+    r.font.size = Pt(11)
+    r.font.name = "Calibri"
+    r.font.color.rgb = DARK_GRAY
+    r.italic = True
+
+    for category, items in A5_INTEGRATIONS:
+        spacer(doc, 1)
+        body(doc, category, bold=True, color=TEAL)
+        for item in items:
+            checkbox(doc, item, field="integrations")
 
     # Custom
     spacer(doc, 1)
@@ -733,7 +880,7 @@ def build_a5_integration(doc):
     r2.font.name = "Calibri"
     r2.font.color.rgb = DARK_GRAY
     r2.italic = True
-    open_field(doc, lines=6)
+    open_field(doc, lines=6, field="open_fields.a5_custom_automations")
 
 
 def build_a6_privacy(doc):
@@ -746,24 +893,40 @@ def build_a6_privacy(doc):
         "Limited \u2014 Only what I explicitly share with it",
         "Minimal \u2014 I'll give it tasks manually each time",
     ]:
-        checkbox(doc, item)
+        checkbox(doc, item, field="data_privacy.data_access")
 
     spacer(doc, 1)
     body(doc, "2. Should the assistant be available 24/7 or only during certain hours?", bold=True)
-    checkbox(doc, "Always on")
-    checkbox(doc, "Only during work hours")
-    checkbox(doc, "Custom schedule: ___________________________")
+    checkbox(doc, "Always on", field="communication_preferences.availability")
+    checkbox(doc, "Only during work hours", field="communication_preferences.availability")
+    checkbox(doc, "Custom schedule: ___________________________", field="communication_preferences.availability")
 
     spacer(doc, 1)
     body(doc, "3. Will anyone else use this assistant besides you?", bold=True)
-    checkbox(doc, "Just me")
-    checkbox(doc, "My partner / family (how many? ___)")
-    checkbox(doc, "My small team (how many? ___)")
+    checkbox(doc, "Just me", field="communication_preferences.user_count")
+    checkbox(doc, "My partner / family (how many? ___)", field="communication_preferences.user_count")
+    checkbox(doc, "My small team (how many? ___)", field="communication_preferences.user_count")
 
     spacer(doc, 1)
     body(doc, "4. Any specific personality you'd like your assistant to have?", bold=True)
     body(doc, "(e.g., formal, casual, funny, minimalist, warm, direct)", italic=True, color=MED_GRAY)
-    answer_line(doc)
+    answer_line(doc, field="private.personality")
+
+    spacer(doc, 1)
+    _sensitivity_question(doc, 5)
+
+
+SENSITIVITY_LEVELS = ["Low", "Medium", "High", "Critical"]
+
+
+def _sensitivity_question(doc, number):
+    """Shared A6/B5 question feeding data_privacy.sensitivity."""
+    body(doc, f"{number}. How sensitive is the information your assistant will see?", bold=True)
+    body(doc, "(Low: nothing personal \u2022 Medium: names and contact details \u2022 "
+              "High: financial or confidential data \u2022 Critical: health, legal or regulated records)",
+         italic=True, color=MED_GRAY)
+    for item in SENSITIVITY_LEVELS:
+        checkbox(doc, item, field="data_privacy.sensitivity")
 
 
 # ===================================================================
@@ -801,10 +964,10 @@ def build_b1(doc):
     heading(doc, "B1. Company Profile", 1)
 
     body(doc, "1. Company Name:", bold=True)
-    answer_line(doc)
+    answer_line(doc, field="client_profile.company")
 
     body(doc, "2. Your Name & Role:", bold=True)
-    answer_line(doc)
+    answer_line(doc, field="client_profile.name")
 
     body(doc, "3. Industry:", bold=True)
     for item in [
@@ -812,13 +975,13 @@ def build_b1(doc):
         "Legal", "Marketing / Creative", "Technology / SaaS", "Education",
         "Hospitality / Tourism", "Manufacturing", "Consulting", "Logistics",
     ]:
-        checkbox(doc, item)
-    checkbox(doc, "Other: ___________________________")
+        checkbox(doc, item, field="client_profile.industry")
+    checkbox(doc, "Other: ___________________________", field="client_profile.industry")
 
     spacer(doc, 1)
     body(doc, "4. Number of Employees:", bold=True)
     for item in ["2\u201310", "11\u201350", "51\u2013200", "200\u20131,000", "1,000+"]:
-        checkbox(doc, item)
+        checkbox(doc, item, field="client_profile.company_size")
 
     spacer(doc, 1)
     body(doc, "5. How many departments would use the AI assistant?", bold=True)
@@ -828,7 +991,7 @@ def build_b1(doc):
         "Company-wide",
         "Not sure yet",
     ]:
-        checkbox(doc, item)
+        checkbox(doc, item, field="enterprise.departments")
 
     spacer(doc, 1)
     body(doc, "6. Annual revenue range (helps us size the solution):", bold=True)
@@ -840,7 +1003,23 @@ def build_b1(doc):
         "\u20ac10M+",
         "Prefer not to say",
     ]:
-        checkbox(doc, item)
+        checkbox(doc, item, field="enterprise.annual_revenue")
+
+
+B2_PAIN_POINTS = [
+    "Answering repetitive customer questions",
+    "Manual data entry and report creation",
+    "Scheduling and coordination between teams",
+    "Email overload and slow response times",
+    "Lead follow-up falling through the cracks",
+    "Document review and approval processes",
+    "Onboarding new employees",
+    "Invoice processing and expense management",
+    "Social media and marketing content",
+    "IT support and troubleshooting",
+    "Compliance and regulatory tasks",
+    "Inventory and supply chain tracking",
+]
 
 
 def build_b2(doc):
@@ -857,100 +1036,74 @@ def build_b2(doc):
     r.font.color.rgb = DARK_GRAY
     r.italic = True
 
-    for item in [
-        "Answering repetitive customer questions",
-        "Manual data entry and report creation",
-        "Scheduling and coordination between teams",
-        "Email overload and slow response times",
-        "Lead follow-up falling through the cracks",
-        "Document review and approval processes",
-        "Onboarding new employees",
-        "Invoice processing and expense management",
-        "Social media and marketing content",
-        "IT support and troubleshooting",
-        "Compliance and regulatory tasks",
-        "Inventory and supply chain tracking",
-    ]:
-        rating_item(doc, item)
+    for item in B2_PAIN_POINTS:
+        rating_item(doc, item, field="ratings")
 
     spacer(doc, 1)
     body(doc, "Other pain points you'd like to mention:", bold=True)
-    open_field(doc, lines=4)
-
-
-def build_b4(doc):
-    heading(doc, "B4. Integration & Automation Priorities", 1)
+    open_field(doc, lines=4, field="open_fields.b2_other_pain_points")
 
-    p = doc.add_paragraph()
-    p.paragraph_format.space_after = Pt(8)
-    r = p.add_run(
-        "Which workflows would you like the AI assistant to automate? "
-        "Rate each from 1 (low priority) to 5 (high priority):"
-    )
-    r.font.size = Pt(11)
-    r.font.name = "Calibri"
-    r.font.color.rgb = DARK_GRAY
-    r.italic = True
 
-    # Customer-Facing
-    body(doc, "Customer-Facing", bold=True, color=TEAL)
-    for item in [
+B4_WORKFLOWS = [
+    ("Customer-Facing", [
         "Answer customer questions via chat / email automatically",
         "Qualify leads and route to the right sales rep",
         "Send follow-up emails after meetings or inquiries",
         "Handle appointment booking for clients",
         "Process returns, refunds, or complaint tickets",
         "Collect customer feedback automatically",
-    ]:
-        rating_item(doc, item)
-
-    # Internal Operations
-    spacer(doc, 1)
-    body(doc, "Internal Operations", bold=True, color=TEAL)
-    for item in [
+    ]),
+    ("Internal Operations", [
         "Generate weekly / monthly reports from your data",
         "Summarize meeting notes and distribute action items",
         "Automate invoice creation and send payment reminders",
         "Route internal requests to the right department",
         "Monitor key performance indicators and alert when something is off",
         "Automate employee onboarding checklists",
-    ]:
-        rating_item(doc, item)
-
-    # Marketing & Sales
-    spacer(doc, 1)
-    body(doc, "Marketing & Sales", bold=True, color=TEAL)
-    for item in [
+    ]),
+    ("Marketing & Sales", [
         "Create and schedule social media posts",
         "Write email newsletters and campaigns",
         "Track campaign performance and generate reports",
         "Monitor competitor activity and industry news",
         "Generate product descriptions and marketing copy",
-    ]:
-        rating_item(doc, item)
-
-    # Data & Documents
-    spacer(doc, 1)
-    body(doc, "Data & Documents", bold=True, color=TEAL)
-    for item in [
+    ]),
+    ("Data & Documents", [
         "Extract data from documents (invoices, contracts, forms)",
         "Keep databases and spreadsheets synchronized",
         "Generate formatted reports from raw data",
         "Ensure compliance documents are up to date",
         "Archive and organize company documents",
-    ]:
-        rating_item(doc, item)
-
-    # IT & Development
-    spacer(doc, 1)
-    body(doc, "IT & Development (if applicable)", bold=True, color=TEAL)
-    for item in [
+    ]),
+    ("IT & Development (if applicable)", [
         "Monitor servers and alert on issues",
         "Automate deployment and testing pipelines",
         "Manage code reviews and pull requests",
         "Track bugs and prioritize them",
-    ]:
-        rating_item(doc, item)
+    ]),
+]
+
+
+def build_b4(doc):
+    heading(doc, "B4. Integration & Automation Priorities", 1)
+
+    p = doc.add_paragraph()
+    p.paragraph_format.space_after = Pt(8)
+    r = p.add_run(
+        "Which workflows would you like the AI assistant to automate? "
+        "Rate each from 1 (low priority) to 5 (high priority):"
+    )
+    r.font.size = Pt(11)
+    r.font.name = "Calibri"
+    r.font.color.rgb = DARK_GRAY
+    r.italic = True
+
+    for i, (category, items) in enumerate(B4_WORKFLOWS):
+        if i:
+            spacer(doc, 1)
+        body(doc, category, bold=True, color=TEAL)
+        for item in items:
+            rating_item(doc, item, field="ratings")
 
     # Custom
     spacer(doc, 1)
@@ -964,7 +1117,7 @@ def build_b4(doc):
     r2.font.name = "Calibri"
     r2.font.color.rgb = DARK_GRAY
     r2.italic = True
-    open_field(doc, lines=8)
+    open_field(doc, lines=8, field="open_fields.b4_custom_workflows")
 
 
 def build_b5(doc):
@@ -979,13 +1132,13 @@ def build_b5(doc):
         "Legal / confidential documents",
         "Trade secrets / intellectual property",
     ]:
-        checkbox(doc, item)
+        checkbox(doc, item, field="data_privacy.data_types")
 
     spacer(doc, 1)
     body(doc, "2. Compliance requirements:", bold=True)
     for item in ["GDPR", "HIPAA", "SOC 2", "PCI-DSS", "ISO 27001", "None / Not sure"]:
-        checkbox(doc, item)
-    checkbox(doc, "Industry-specific: ___________________________")
+        checkbox(doc, item, field="data_privacy.regulations")
+    checkbox(doc, "Industry-specific: ___________________________", field="data_privacy.regulations")
 
     spacer(doc, 1)
     body(doc, "3. Data hosting preference:", bold=True)
@@ -995,7 +1148,7 @@ def build_b5(doc):
         "Private cloud (any region)",
         "No preference",
     ]:
-        checkbox(doc, item)
+        checkbox(doc, item, field="data_privacy.storage_preference")
 
     spacer(doc, 1)
     body(doc, "4. Available infrastructure:", bold=True)
@@ -1007,7 +1160,7 @@ def build_b5(doc):
         "We don\u2019t have infrastructure \u2014 we\u2019d like you to handle hosting (Managed Service)",
         "Not sure \u2014 let\u2019s discuss during the proposal",
     ]:
-        checkbox(doc, item)
+        checkbox(doc, item, field="enterprise.infrastructure")
 
     spacer(doc, 1)
     body(doc, "5. Who should approve AI actions before they are executed?", bold=True)
@@ -1017,7 +1170,10 @@ def build_b5(doc):
         "Approval for all actions",
         "Depends on the action (we'll define rules together)",
     ]:
-        checkbox(doc, item)
+        checkbox(doc, item, field="enterprise.approval")
+
+    spacer(doc, 1)
+    _sensitivity_question(doc, 6)
 
 
 def build_b6(doc):
@@ -1025,12 +1181,12 @@ def build_b6(doc):
 
     body(doc, "1. How many people will interact with the AI assistant daily?", bold=True)
     for item in ["1\u20135", "5\u201320", "20\u2013100", "100+"]:
-        checkbox(doc, item)
+        checkbox(doc, item, field="performance_scale.daily_users")
 
     spacer(doc, 1)
     body(doc, "2. Expected daily tasks for the AI assistant:", bold=True)
     for item in ["Less than 20", "20\u2013100", "100\u2013500", "500+"]:
-        checkbox(doc, item)
+        checkbox(doc, item, field="performance_scale.daily_requests")
 
     spacer(doc, 1)
     body(doc, "3. How fast does it need to respond?", bold=True)
@@ -1039,7 +1195,7 @@ def build_b6(doc):
         "Quick (under 30 seconds)",
         "Background processing is fine",
     ]:
-        checkbox(doc, item)
+        checkbox(doc, item, field="performance_scale.response_time")
 
     spacer(doc, 1)
     body(doc, "4. Growth plans in the next 12 months?", bold=True)
@@ -1049,13 +1205,19 @@ def build_b6(doc):
         "5x growth",
         "Planning rapid expansion",
     ]:
-        checkbox(doc, item)
+        checkbox(doc, item, field="performance_scale.growth_12m")
 
 
 # ===================================================================
 #  SECTION C: PRICING
 # ===================================================================
 
+def _investment(prices, name):
+    """"€1,000 (one-time)", "From €5,000 (one-time)" for the Section C tables."""
+    price = prices.price(name)
+    return f"{price[:1].upper()}{price[1:]} ({prices.line(name)['period']})"
+
+
 def build_section_c(doc):
     # Section header
     divider = doc.add_table(rows=1, cols=1)
@@ -1083,13 +1245,16 @@ def build_section_c(doc):
             c.width = Inches(6.5)
     spacer(doc, 1)
 
+    from price_list import money, price_list
+    prices = price_list()
+
     # --- Private Clients ---
     heading(doc, "For Private Clients", 1)
 
     add_table(doc,
               ["", "Private Solution"],
               [
-                  ["Investment", "\u20ac1,000 (one-time)"],
+                  ["Investment", _investment(prices, "Private")],
                   ["What's included", "Full AI assistant setup, configuration, and personalization"],
                   ["Hosting", "Runs on your own hardware (PC, server, Raspberry Pi) \u2014 or we set up cloud hosting for you"],
                   ["Channels", "All your messaging apps + email"],
@@ -1117,7 +1282,7 @@ def build_section_c(doc):
     add_table(doc,
               ["", "Enterprise Solution"],
               [
-                  ["Investment", "From \u20ac5,000 (one-time)"],
+                  ["Investment", _investment(prices, "Enterprise")],
                   ["What's included", "Full deployment, integrations, custom workflows, team onboarding"],
                   ["Hosting", "Your own servers, your cloud, or we provide infrastructure"],
                   ["Users", "Unlimited"],
@@ -1133,7 +1298,8 @@ def build_section_c(doc):
 
     spacer(doc, 1)
     body(doc,
-         "Note: Enterprise pricing starts at \u20ac5,000 and varies based on the number "
+         f"Note: Enterprise pricing starts at {money(prices.line('Enterprise')['amount'])} "
+         "and varies based on the number "
          "of integrations, custom workflows, and compliance requirements. "
          "API subscription costs are managed directly by your organization.")
 
@@ -1145,7 +1311,7 @@ def build_section_c(doc):
     add_table(doc,
               ["", "Managed"],
               [
-                  ["Price", "\u20ac300/month"],
+                  ["Price", prices.price("Managed Service")],
                   ["Installation", "Included (no separate setup fee)"],
                   ["Hosting", "We provide and manage all infrastructure \u2014 or we manage it on your hardware"],
                   ["Updates & optimization", "Continuous, automatic"],
@@ -1158,13 +1324,14 @@ def build_section_c(doc):
     spacer(doc, 2)
 
     # --- Ongoing Assistance ---
-    heading(doc, "Ongoing Assistance (after 6 months)", 1)
+    ongoing = prices.index["Ongoing Assistance"]
+    heading(doc, f"Ongoing Assistance (after {prices.start_month[ongoing]} months)", 1)
 
     add_table(doc,
               ["", "Assistance"],
               [
-                  ["Price", "\u20ac500/month"],
-                  ["Available", "After the first 6 months of operation"],
+                  ["Price", prices.price("Ongoing Assistance")],
+                  ["Available", prices.packages[ongoing]["availability"]],
                   ["Priority support", "Dedicated response within hours"],
                   ["Monthly optimization", "Performance review and improvement call"],
                   ["New integrations", "Connect new tools and services on request"],
@@ -1216,27 +1383,31 @@ def build_section_c(doc):
 
     spacer(doc, 1)
 
-    # --- Total Cost Example 1: Private ---
+    # --- Total Cost Examples, priced from service-packages.json ---
+    from price_list import section_c_examples
+    examples = section_c_examples(prices)
+    private, managed = examples["private"], examples["managed"]
+    setup = private["one_time"]
     highlight_box(
         doc,
         "Example: Private client, moderate usage",
-        "\u2022 Setup: \u20ac1,000 (one-time)\n"
-        "\u2022 AI provider: ~\u20ac25/month\n"
-        "\u2022 First year total: \u20ac1,000 + (\u20ac25 \u00d7 12) = \u20ac1,300\n"
-        "\u2022 That\u2019s about \u20ac108/month for a 24/7 personal assistant",
+        f"\u2022 Setup: {money(setup)} (one-time)\n"
+        f"\u2022 AI provider: ~{money(private['api_monthly'])}/month\n"
+        f"\u2022 First year total: {money(setup)} + ({money(private['api_monthly'])} \u00d7 12)"
+        f" = {money(private['total'])}\n"
+        f"\u2022 That\u2019s about {money(private['average_monthly'])}/month for a 24/7 personal assistant",
         bg_hex=HIGHLIGHT_BOX_HEX,
     )
 
     spacer(doc, 1)
 
-    # --- Total Cost Example 2: Enterprise ---
     highlight_box(
         doc,
         "Example: Enterprise with Managed Service",
-        "\u2022 Managed service: \u20ac300/month (installation included)\n"
-        "\u2022 AI provider: ~\u20ac60/month\n"
-        "\u2022 Total: \u20ac360/month\n"
-        "\u2022 For a team of 20, that\u2019s just \u20ac18 per person per month",
+        f"\u2022 Managed service: {money(prices.line('Managed Service')['amount'])}/month (installation included)\n"
+        f"\u2022 AI provider: ~{money(managed['api_monthly'])}/month\n"
+        f"\u2022 Total: {money(managed['first_month'])}/month\n"
+        f"\u2022 For a team of 20, that\u2019s just {money(managed['first_month'] / 20)} per person per month",
         bg_hex=HIGHLIGHT_BOX_HEX,
     )
 
@@ -1284,29 +1455,36 @@ def build_section_d(doc):
             c.width = Inches(6.5)
     spacer(doc, 1)
 
+    from price_list import price_list
+    prices = price_list()
+    managed = prices.index["Managed Service"]
+    ongoing = prices.index["Ongoing Assistance"]
+
     heading(doc, "Your Choice", 1)
 
     body(doc, "1. Which solution interests you?", bold=True)
     for item in [
-        "Private (\u20ac1,000)",
-        "Enterprise (from \u20ac5,000)",
-        "Managed Service (\u20ac300/month \u2014 installation included)",
+        f"Private ({prices.price('Private')})",
+        f"Enterprise ({prices.price('Enterprise')})",
+        f"Managed Service ({prices.price('Managed Service')}"
+        + (" \u2014 installation included)" if prices.waives_setup[managed] else ")"),
         "Not sure yet \u2014 let\u2019s discuss",
     ]:
-        checkbox(doc, item)
+        checkbox(doc, item, field="proposal.package")
 
     spacer(doc, 1)
-    body(doc, "2. Are you interested in Ongoing Assistance (\u20ac500/month, available after 6 months)?", bold=True)
+    body(doc, f"2. Are you interested in Ongoing Assistance ({prices.price('Ongoing Assistance')}, "
+              f"available after {prices.start_month[ongoing]} months)?", bold=True)
     for item in ["Yes", "No", "Tell me more"]:
-        checkbox(doc, item)
+        checkbox(doc, item, field="proposal.ongoing_assistance")
 
     spacer(doc, 1)
     body(doc, "3. Preferred start date:", bold=True)
-    answer_line(doc)
+    answer_line(doc, field="proposal.start_date")
 
     spacer(doc, 1)
     body(doc, "4. Anything else you'd like us to know?", bold=True)
-    open_field(doc, lines=6)
+    open_field(doc, lines=6, field="open_fields.d_anything_else")
 
     spacer(doc, 1)
     body(doc, "5. How did you hear about us?", bold=True)
@@ -1317,8 +1495,8 @@ def build_section_d(doc):
         "LinkedIn",
         "Event or conference",
     ]:
-        checkbox(doc, item)
-    checkbox(doc, "Other: ___________________________")
+        checkbox(doc, item, field="proposal.referral_source")
+    checkbox(doc, "Other: ___________________________", field="proposal.referral_source")
 
     spacer(doc, 1)
     body(doc, "6. Authorization", bold=True)
@@ -1327,8 +1505,8 @@ def build_section_d(doc):
          "this questionnaire to design and build a tailored AI assistant solution on your behalf.")
 
     spacer(doc, 1)
-    answer_line(doc, "Signature")
-    answer_line(doc, "Date")
+    answer_line(doc, "Signature", field="proposal.signature")
+    answer_line(doc, "Date", field="proposal.signed_date")
 
     spacer(doc, 2)
 
@@ -1368,11 +1546,152 @@ def build_section_d(doc):
             c.width = Inches(6.5)
 
 
+# ===================================================================
+#  FRAGMENTS & VARIANTS
+# ===================================================================
+
+# Section key -> builders that emit it. Order here is document order.
+SECTIONS = {
+    "cover": (build_cover,),
+    "welcome": (build_welcome,),
+    "part_a": (build_part_a_header,),
+    "a1": (build_a1,),
+    "a2": (build_a2,),
+    "a3": (build_a3,),
+    "a4": (build_a4_caps,),
+    "a5": (build_a5_integration,),
+    "a6": (build_a6_privacy,),
+    "part_b": (build_part_b_header,),
+    "b1": (build_b1,),
+    "b2": (build_b2,),
+    "b3": (build_b3_caps,),
+    "b4": (build_b4,),
+    "b5": (build_b5,),
+    "b6": (build_b6,),
+    "c": (build_section_c,),
+    "d": (build_section_d,),
+}
+
+# Reference files (reference_data.ALL_FILES names) a section's content is
+# built from, for watch.py. Sections not listed are fixed text.
+SECTION_DATA = {
+    "c": ("service-packages",),
+    "d": ("service-packages",),
+}
+
+# Relative build time of the slow sections, for scheduling prebuild_fragments().
+SECTION_COST = {"c": 8, "a4": 2, "a2": 2, "b4": 2, "d": 2}
+
+# Part headers sit on the same page as the first section that follows them.
+PART_HEADERS = {"part_a": "a", "part_b": "b"}
+
+PART_A = ["a1", "a2", "a3", "a4", "a5", "a6"]
+PART_B = ["b1", "b2", "b3", "b4", "b5", "b6"]
+
+VARIANTS = {
+    "private": ["cover", "welcome", *PART_A, "c", "d"],
+    "enterprise": ["cover", "welcome", *PART_B, "c", "d"],
+    "full": ["cover", "welcome", *PART_A, *PART_B, "c", "d"],
+}
+
+# Fragments that are not sections of their own but are shared between them.
+_SHARED_BUILDERS = {
+    "capabilities": (_build_capabilities_checklist,),
+    "page_break": (page_break,),
+}
+
+_FRAGMENTS = {}
+_scratch = None
+
+
+def section_fragment(key):
+    """Return the body XML elements of one section, built once per process."""
+    global _scratch
+    frag = _FRAGMENTS.get((CONTENT_CONTROLS, key))
+    if frag is None:
+        builders = SECTIONS.get(key) or _SHARED_BUILDERS.get(key)
+        if builders is None:
+            raise KeyError(f"unknown section: {key}")
+        if _scratch is None:
+            _scratch = new_document()
+        # Build at the end of the scratch body, then lift the new elements
+        # out again so the scratch stays empty (nested fragments included).
+        body_el = _scratch.element.body
+        start = len(body_el) - 1
+        for build in builders:
+            build(_scratch)
+        frag = [el for el in body_el[start:] if el.tag != qn("w:sectPr")]
+        for el in frag:
+            body_el.remove(el)
+        _FRAGMENTS[(CONTENT_CONTROLS, key)] = theme_refs(frag)
+    return frag
+
+
+def _render_sections(task):
+    """Worker task: the fragments of *keys*, as serialized XML."""
+    keys, content_controls = task
+    use_content_controls(content_controls)
+    return {key: [etree.tostring(el) for el in section_fragment(key)] for key in keys}
+
+
+def prebuild_fragments(keys, workers=None):
+    """Build the fragments of *keys* in worker processes, one section per
+    task, and install them in this process's fragment cache; splicing them
+    (page breaks, part headers, order) then proceeds exactly as for fragments
+    built here. Fragments already cached are not rebuilt."""
+    from concurrent.futures import ProcessPoolExecutor
+    todo = [k for k in dict.fromkeys(keys) if (CONTENT_CONTROLS, k) not in _FRAGMENTS]
+    if not todo:
+        return
+    # Largest first, so the long sections do not start last.
+    todo.sort(key=lambda k: SECTION_COST.get(k, 1), reverse=True)
+    workers = min(workers or os.cpu_count() or 1, len(todo))
+    with ProcessPoolExecutor(workers) as pool:
+        for built in pool.map(_render_sections, [([k], CONTENT_CONTROLS) for k in todo]):
+            for key, parts in built.items():
+                _FRAGMENTS[(CONTENT_CONTROLS, key)] = [parse_xml(x) for x in parts]
+
+
+def invalidate_fragments(keys):
+    """Forget the built fragments of *keys* so the next use rebuilds them."""
+    keys = set(keys)
+    for cached in [k for k in _FRAGMENTS if k[1] in keys]:
+        del _FRAGMENTS[cached]
+
+
+def splice(doc, elements):
+    """Append copies of *elements* to the end of the document body."""
+    splice_into(doc.element.body, elements)
+
+
+def splice_into(body_el, elements):
+    sect_pr = body_el.find(qn("w:sectPr"))
+    for el in elements:
+        el = copy.deepcopy(el)
+        if sect_pr is None:
+            body_el.append(el)
+        else:
+            sect_pr.addprevious(el)
+
+
+def resolve_sections(keys):
+    """Validate a section list, sort it, and add the Part A/B headers it needs."""
+    unknown = [k for k in keys if k not in SECTIONS]
+    if unknown:
+        raise ValueError(f"unknown section(s): {', '.join(unknown)}")
+    wanted = set(keys)
+    for header, prefix in PART_HEADERS.items():
+        if any(k.startswith(prefix) and k[1:].isdigit() for k in wanted):
+            wanted.add(header)
+    return [k for k in SECTIONS if k in wanted]
+
+
 # ===================================================================
 #  MAIN
 # ===================================================================
 
-def main():
+def new_document():
+    """Blank document with the house styles and margins applied."""
     doc = Document()
 
     # Default font
@@ -1392,56 +1711,109 @@ def main():
         section.left_margin = Cm(2.0)
         section.right_margin = Cm(2.0)
 
-    # === COVER ===
-    build_cover(doc)
-    page_break(doc)
-
-    # === WELCOME ===
-    build_welcome(doc)
-    page_break(doc)
-
-    # === PART A: PRIVATE CLIENT ===
-    build_part_a_header(doc)
-    build_a1(doc)
-    page_break(doc)
-    build_a2(doc)
-    page_break(doc)
-    build_a3(doc)
-    page_break(doc)
-    build_a4_caps(doc)
-    page_break(doc)
-    build_a5_integration(doc)
-    page_break(doc)
-    build_a6_privacy(doc)
-    page_break(doc)
-
-    # === PART B: ENTERPRISE CLIENT ===
-    build_part_b_header(doc)
-    build_b1(doc)
-    page_break(doc)
-    build_b2(doc)
-    page_break(doc)
-    build_b3_caps(doc)
-    page_break(doc)
-    build_b4(doc)
-    page_break(doc)
-    build_b5(doc)
-    page_break(doc)
-    build_b6(doc)
-    page_break(doc)
-
-    # === SECTION C: PRICING ===
-    build_section_c(doc)
-    page_break(doc)
-
-    # === SECTION D: AUTHORIZATION ===
-    build_section_d(doc)
+    return doc
+
+
+def build_document(doc, sections=None):
+    """Emit the given sections (default: the full questionnaire) into *doc*."""
+    assemble_body(doc.element.body, sections or VARIANTS["full"])
+
+
+def assemble_body(body_el, sections):
+    """Splice the fragments of *sections* into a w:body element, page by page."""
+    keys = resolve_sections(sections)
+    for i, key in enumerate(keys):
+        splice_into(body_el, section_fragment(key))
+        if i < len(keys) - 1 and key not in PART_HEADERS:
+            splice_into(body_el, section_fragment("page_break"))
+
+
+def build_variants(variants):
+    """Build several variants in one pass over the shared fragments.
+
+    variants -- {name: [section keys]}; returns {name: Document}.
+    Every fragment any variant needs is built once, then each document is
+    just a splice of copies.
+    """
+    resolved = {name: resolve_sections(keys) for name, keys in variants.items()}
+    for keys in resolved.values():
+        for key in keys:
+            section_fragment(key)
+    docs = {}
+    for name, keys in resolved.items():
+        doc = new_document()
+        build_document(doc, keys)
+        docs[name] = doc
+    return docs
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-o", "--output", default=OUTPUT,
+                        help="where to write the DOCX (default: %(default)s)")
+    parser.add_argument("--compress-level", type=int, default=6, choices=range(10),
+                        metavar="0-9", help="zlib level for the package parts (default: 6)")
+    parser.add_argument("--store", action="store_true",
+                        help="write the package uncompressed (fastest, largest)")
+    parser.add_argument("--content-controls", action="store_true",
+                        help="emit Word content controls tagged with stable field ids")
+    parser.add_argument("--variant", action="append", choices=sorted(VARIANTS),
+                        help="variant to emit; repeat for several (default: full)")
+    parser.add_argument("--brand", default="house",
+                        help="white-label brand: a name in brands/ or a profile path "
+                             "(default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="build the sections in this many processes (default: 1)")
+    parser.add_argument("--sections",
+                        help="custom variant as a comma-separated section list, "
+                             f"e.g. cover,a1,a4,c (keys: {','.join(SECTIONS)})")
+    args = parser.parse_args(argv)
+    if args.sections is not None:
+        args.sections = [k.strip() for k in args.sections.split(",") if k.strip()]
+        try:
+            resolve_sections(args.sections)
+        except ValueError as exc:
+            parser.error(f"--sections: {exc}")
+        if not args.sections:
+            parser.error("--sections: no section keys given")
+    from brands import check_brand
+    check_brand(parser, args.brand)
+    return args
+
+
+def variant_output(output, name, count):
+    if count == 1:
+        return output
+    stem, ext = os.path.splitext(output)
+    return f"{stem}_{name}{ext or '.docx'}"
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    variants = {name: VARIANTS[name] for name in args.variant or []}
+    if args.sections:
+        variants["custom"] = args.sections
+    if not variants:
+        variants["full"] = VARIANTS["full"]
+
+    use_content_controls(args.content_controls)
+    from brands import brand_writer
+    writer = brand_writer(
+        PackageWriter(new_document(), compresslevel=args.compress_level, store=args.store),
+        args.brand)
+    if args.workers > 1:
+        prebuild_fragments([k for keys in variants.values() for k in resolve_sections(keys)],
+                           args.workers)
+    docs = build_variants(variants)
 
     # Save
-    doc.save(OUTPUT)
-    size = os.path.getsize(OUTPUT)
-    print(f"Document saved to: {OUTPUT}")
-    print(f"File size: {size:,} bytes")
+    for name, doc in docs.items():
+        path = variant_output(args.output, name, len(docs))
+        writer.write(doc, path)
+        size = os.path.getsize(path)
+        print(f"Document saved to: {path}")
+        print(f"File size: {size:,} bytes")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,377 @@
+"""
+Warm questionnaire generator daemon.
+Keeps python-docx/lxml imported, the house styles applied, every section
+fragment built and the package writer's invariant parts compressed, then
+serves render jobs over a local Unix socket. Jobs go through a bounded
+queue to a fixed set of worker threads (or worker processes).
+
+Protocol: one JSON object per line, one JSON reply per line.
+
+    {"op": "render", "variant": "private", "output": "/tmp/q.docx"}
+    {"op": "render", "sections": ["cover", "a1", "c"], "output": "..."}
+    {"op": "render", "variant": "full", "brand": "northwind", "output": "..."}
+    {"op": "metrics"}
+    {"op": "ping"}
+
+Outputs are written only inside the daemon's --output-dir (default: the
+directory it was started in); a relative "output" is taken from there.
+The daemon will not start over a socket another daemon still answers on.
+
+Usage:
+    python generator_daemon.py serve --socket /tmp/claw-gen.sock --workers 4
+    python generator_daemon.py serve --output-dir /srv/questionnaires
+    python generator_daemon.py render --variant private -o out.docx
+    python generator_daemon.py metrics
+"""
+
+import argparse
+import collections
+import copy
+import json
+import os
+import queue
+import socket
+import socketserver
+import stat
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from docx.opc.oxml import serialize_part_xml
+from docx.oxml.ns import qn
+
+import brands
+import generate_questionnaire as gq
+from package_writer import PackageWriter
+
+DEFAULT_SOCKET = "/tmp/claw-generator.sock"
+
+
+# ---------------------------------------------------------------------------
+# Renderer (one per process)
+# ---------------------------------------------------------------------------
+class Renderer:
+    """Everything a render needs, built once: template, writer, fragments."""
+
+    def __init__(self, compresslevel=6, store=False):
+        template = gq.new_document()
+        self.writer = PackageWriter(template, compresslevel=compresslevel, store=store)
+        self._root = template.element          # w:document with an empty body
+        self._core = _core_blob(template)
+        for key in list(gq.SECTIONS) + list(gq._SHARED_BUILDERS):
+            gq.section_fragment(key)
+
+    def document_xml(self, sections):
+        root = copy.deepcopy(self._root)
+        gq.assemble_body(root.find(qn("w:body")), sections)
+        return serialize_part_xml(root)
+
+    def render(self, job):
+        sections = _job_sections(job)
+        output = job["output"]
+        # Brands only swap the cached theme/styles parts; fragments are shared.
+        writer = brands.brand_writer(self.writer, job.get("brand"))
+        size = writer.write_blobs({
+            "word/document.xml": self.document_xml(sections),
+            "docProps/core.xml": self._core,
+        }, output)
+        return {"output": output, "bytes": size}
+
+
+def _core_blob(doc):
+    doc.core_properties  # make sure the core-properties part exists
+    for part in doc.part.package.iter_parts():
+        if part.partname.membername == "docProps/core.xml":
+            return part.blob
+    raise LookupError("template has no core properties part")
+
+
+def _job_sections(job):
+    if job.get("sections"):
+        return list(job["sections"])
+    variant = job.get("variant", "full")
+    if variant not in gq.VARIANTS:
+        raise ValueError(f"unknown variant {variant!r}; choose from {', '.join(gq.VARIANTS)}")
+    return gq.VARIANTS[variant]
+
+
+_process_renderer = None
+
+
+def _warm_process(compresslevel, store):
+    global _process_renderer
+    _process_renderer = Renderer(compresslevel, store)
+
+
+def _render_in_process(job):
+    return _process_renderer.render(job)
+
+
+# ---------------------------------------------------------------------------
+# Job queue + metrics
+# ---------------------------------------------------------------------------
+class Metrics:
+    def __init__(self, window=2048):
+        self._lock = threading.Lock()
+        self._latencies = collections.deque(maxlen=window)
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.started = time.time()
+
+    def record(self, seconds, ok):
+        """Count one finished job. Only successful renders go into the
+        latency window: a failure is usually a quick validation error."""
+        with self._lock:
+            if ok:
+                self._latencies.append(seconds)
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def percentiles(self, points=(50, 95, 99)):
+        with self._lock:
+            data = sorted(self._latencies)
+        if not data:
+            return {f"p{p}": None for p in points}
+        return {f"p{p}": round(data[min(len(data) - 1, int(len(data) * p / 100))] * 1000, 2)
+                for p in points}
+
+
+class GeneratorService:
+    """Bounded job queue drained by worker threads (optionally into processes)."""
+
+    def __init__(self, workers=2, queue_size=64, mode="thread", compresslevel=6, store=False,
+                 output_dir="."):
+        if mode not in ("thread", "process"):
+            raise ValueError("mode must be 'thread' or 'process'")
+        self.mode = mode
+        self.output_dir = os.path.realpath(output_dir)
+        self.workers = workers
+        self.metrics = Metrics()
+        self._jobs = queue.Queue(maxsize=queue_size)
+        self._renderer = None
+        self._pool = None
+        if mode == "thread":
+            self._renderer = Renderer(compresslevel, store)
+        else:
+            self._pool = ProcessPoolExecutor(
+                max_workers=workers, initializer=_warm_process, initargs=(compresslevel, store))
+            # Start (and warm) every worker process now, not on the first jobs.
+            for f in [self._pool.submit(os.getpid) for _ in range(workers)]:
+                f.result()
+        self._threads = [threading.Thread(target=self._work, daemon=True, name=f"render-{i}")
+                         for i in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, job):
+        """Queue a render job; returns a Future, or raises queue.Full when saturated."""
+        _job_sections(job)  # validate before taking a queue slot
+        job = {**job, "output": self.output_path(job.get("output"))}
+        future = Future()
+        try:
+            self._jobs.put_nowait((time.perf_counter(), job, future))
+        except queue.Full:
+            self.metrics.reject()
+            raise
+        return future
+
+    def output_path(self, output):
+        """*output* resolved inside output_dir; ValueError if it points elsewhere."""
+        if not output:
+            raise ValueError("render job needs an 'output' path")
+        path = os.path.realpath(os.path.join(self.output_dir, output))
+        if os.path.commonpath([path, self.output_dir]) != self.output_dir or path == self.output_dir:
+            raise ValueError(f"output must be a file inside {self.output_dir}")
+        return path
+
+    def _work(self):
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                return
+            queued_at, job, future = item
+            try:
+                if self._pool is not None:
+                    result = self._pool.submit(_render_in_process, job).result()
+                else:
+                    result = self._renderer.render(job)
+            except Exception as exc:  # reported to the client, daemon keeps going
+                self.metrics.record(time.perf_counter() - queued_at, ok=False)
+                future.set_exception(exc)
+            else:
+                elapsed = time.perf_counter() - queued_at
+                self.metrics.record(elapsed, ok=True)
+                result["ms"] = round(elapsed * 1000, 2)
+                future.set_result(result)
+
+    def snapshot(self):
+        m = self.metrics
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "queue_depth": self._jobs.qsize(),
+            "queue_max": self._jobs.maxsize,
+            "completed": m.completed,
+            "failed": m.failed,
+            "rejected": m.rejected,
+            "latency_ms": m.percentiles(),
+            "uptime_s": round(time.time() - m.started, 1),
+        }
+
+    def close(self):
+        for _ in self._threads:
+            self._jobs.put(None)
+        for t in self._threads:
+            t.join()
+        if self._pool is not None:
+            self._pool.shutdown()
+
+
+# ---------------------------------------------------------------------------
+# Socket server
+# ---------------------------------------------------------------------------
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        service = self.server.service
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                reply = self._dispatch(service, json.loads(line))
+            except queue.Full:
+                reply = {"ok": False, "error": "queue full, try again later"}
+            except Exception as exc:
+                reply = {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+            self.wfile.write(json.dumps(reply).encode() + b"\n")
+            self.wfile.flush()
+
+    @staticmethod
+    def _dispatch(service, request):
+        op = request.get("op")
+        if op == "render":
+            return {"ok": True, **service.submit(request).result()}
+        if op == "metrics":
+            return {"ok": True, **service.snapshot()}
+        if op == "ping":
+            return {"ok": True}
+        raise ValueError(f"unknown op {op!r}")
+
+
+class GeneratorServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, path, service):
+        _remove_stale_socket(path)
+        self.service = service
+        super().__init__(path, _Handler)
+
+
+def _remove_stale_socket(path):
+    """Unlink a socket file left behind by a daemon that died; refuse when a
+    daemon still answers on it or the path is not a socket at all."""
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise OSError(f"{path} exists and is not a socket")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            pass
+        else:
+            raise OSError(f"a generator daemon is already listening on {path}")
+    os.unlink(path)
+
+
+def request(payload, path=DEFAULT_SOCKET, timeout=60):
+    """Send one request to a running daemon and return its reply."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(json.dumps(payload).encode() + b"\n")
+        buf = b""
+        while not buf.endswith(b"\n"):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            buf += chunk
+    return json.loads(buf)
+
+
+# ===================================================================
+#  MAIN
+# ===================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm questionnaire generator daemon")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="run the daemon")
+    serve.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    serve.add_argument("--queue", type=int, default=64, help="max queued jobs")
+    serve.add_argument("--mode", choices=("thread", "process"), default="thread")
+    serve.add_argument("--compress-level", type=int, default=6, choices=range(10), metavar="0-9")
+    serve.add_argument("--store", action="store_true")
+    serve.add_argument("--output-dir", default=".",
+                       help="only write documents inside this directory (default: current)")
+
+    render = sub.add_parser("render", help="ask a running daemon for a document")
+    render.add_argument("--variant", choices=sorted(gq.VARIANTS), default="full")
+    render.add_argument("--sections")
+    render.add_argument("--brand", help="white-label brand (default: house)")
+    render.add_argument("-o", "--output", required=True)
+
+    sub.add_parser("metrics", help="print a running daemon's metrics")
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        if not os.path.isdir(args.output_dir):
+            parser.error(f"--output-dir {args.output_dir} is not a directory")
+        service = GeneratorService(args.workers, args.queue, args.mode,
+                                   args.compress_level, args.store, args.output_dir)
+        try:
+            server = GeneratorServer(args.socket, service)
+        except OSError as exc:
+            service.close()
+            print(f"Cannot serve: {exc}", file=sys.stderr)
+            return 1
+        with server:
+            print(f"Generator listening on {args.socket} "
+                  f"({args.workers} {args.mode} workers, queue {args.queue}, "
+                  f"output in {service.output_dir})")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                service.close()
+                os.unlink(args.socket)
+        return 0
+
+    if args.command == "render":
+        payload = {"op": "render", "variant": args.variant,
+                   "output": os.path.abspath(args.output)}
+        if args.brand:
+            payload["brand"] = args.brand
+        if args.sections:
+            payload["sections"] = [k.strip() for k in args.sections.split(",") if k.strip()]
+    else:
+        payload = {"op": "metrics"}
+    reply = request(payload, args.socket)
+    print(json.dumps(reply, indent=2))
+    return 0 if reply.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
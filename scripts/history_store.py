@@ -0,0 +1,419 @@
+"""
+Versioned history of the benchmark reference data.
+llm-model-comparison.json, platform-comparison.json and skills-catalog.json
+each hold one snapshot; this store keeps all of them, so an old proposal can
+be re-quoted at the prices it was made with.
+
+Each dataset is stored column-wise: a snapshot is a date, and every entity
+(model, platform, skill) x field (dotted path, "latency.p95_ms") is a series
+holding only the snapshots where its value changed. The series are laid end
+to end in a few flat arrays (CSR style), opened with mmap:
+
+    dates.npy     snapshot dates (proleptic ordinals), ascending
+    offsets.npy   range of each series in the change arrays
+    snap.npy      snapshot index of each change
+    code.npy      -1 int, -2 float (value in num.npy), -3 absent, else a
+    num.npy       string-table index (meta.json "values", JSON-encoded)
+    meta.json     entities, fields, series -> (entity, field), snapshot sources
+
+"As of date X" is one binary search over dates for the snapshot, then one
+vectorized searchsorted over series_id * n_snapshots + snapshot keys for the
+last change of every series; a diff between two dates is two of those.
+No snapshot is ever re-read.
+
+Usage:
+    python history_store.py record                       # snapshot the current files
+    python history_store.py record llm-models --date 2026-03-01
+    python history_store.py import-git                   # every committed version
+    python history_store.py as-of llm-models 2026-03-01 --field input_price_per_1m
+    python history_store.py diff llm-models 2026-02-24 2026-10-19 --field "*price*"
+    python history_store.py show
+"""
+
+import argparse
+import datetime
+import fnmatch
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+
+import reference_data
+
+FORMAT = 1
+INT, FLOAT, ABSENT = -1, -2, -3
+DOCUMENT = ""               # entity holding the file's own top-level fields
+
+# dataset -> (reference file, collection key, entity name key or None for a dict)
+DATASETS = {
+    "llm-models": ("llm-model-comparison", "models", "name"),
+    "platforms": ("platform-comparison", "platforms", None),
+    "skills": ("skills-catalog", "top_skills", "name"),
+}
+_ARRAYS = ("dates", "offsets", "snap", "code", "num")
+
+
+def to_ordinal(date):
+    if isinstance(date, int):
+        return date
+    return datetime.date.fromisoformat(str(date)[:10]).toordinal()
+
+
+def from_ordinal(ordinal):
+    return datetime.date.fromordinal(int(ordinal)).isoformat()
+
+
+def _flatten(node, prefix, out):
+    for key, value in node.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict) and value:
+            _flatten(value, f"{path}.", out)
+        else:
+            out[path] = value
+
+
+def flatten(dataset, doc):
+    """{(entity, field): value} for one version of a dataset's file."""
+    _, collection, name_key = DATASETS[dataset]
+    items = doc.get(collection) or {}
+    if name_key is not None:
+        items = {item[name_key]: {k: v for k, v in item.items() if k != name_key}
+                 for item in items}
+    flat = {}
+    meta = {}
+    _flatten({k: v for k, v in doc.items() if k not in (collection, "last_updated")}, "", meta)
+    flat.update(((DOCUMENT, f), v) for f, v in meta.items())
+    for entity, fields in items.items():
+        values = {}
+        _flatten(fields, "", values)
+        flat.update(((entity, f), v) for f, v in values.items())
+    return flat
+
+
+def _unflatten(fields):
+    out = {}
+    for path, value in fields.items():
+        node = out
+        *parents, leaf = path.split(".")
+        for p in parents:
+            node = node.setdefault(p, {})
+        node[leaf] = value
+    return out
+
+
+class History:
+    """One dataset's history (read side; HistoryStore.record() writes it)."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as fh:
+            meta = json.load(fh)
+        if meta["format"] != FORMAT:
+            raise ValueError(f"{path}: unsupported history format {meta['format']}")
+        self.dataset = meta["dataset"]
+        self.entities = meta["entities"]
+        self.fields = meta["fields"]
+        self.series = meta["series"]             # [entity index, field index]
+        self.values = meta["values"]
+        self.snapshots = meta["snapshots"]       # [{"date", "sha256", "source"}]
+        for name in _ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+        n = len(self.snapshots)
+        owner = np.repeat(np.arange(len(self.series), dtype=np.int64), np.diff(self.offsets))
+        self._keys = owner * n + self.snap       # ascending: by series, then snapshot
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def snapshot_at(self, date):
+        """Index of the last snapshot on or before *date*, or -1."""
+        return int(np.searchsorted(self.dates, to_ordinal(date), side="right")) - 1
+
+    def _positions(self, s):
+        """Change index in effect at snapshot *s* for every series (-1: none yet)."""
+        starts = self.offsets[:-1]
+        q = np.arange(len(self.series), dtype=np.int64) * len(self) + s
+        pos = np.searchsorted(self._keys, q, side="right") - 1
+        return np.where((pos >= starts) & (s >= 0), pos, -1)
+
+    def _decode(self, pos):
+        if pos < 0:
+            return None, False
+        code = int(self.code[pos])
+        if code == ABSENT:
+            return None, False
+        if code == INT:
+            return int(self.num[pos]), True
+        if code == FLOAT:
+            return float(self.num[pos]), True
+        return json.loads(self.values[code]), True
+
+    def _select(self, fields):
+        """Boolean mask of the series whose field matches one of *fields* (globs)."""
+        if not fields:
+            return np.ones(len(self.series), dtype=bool)
+        if isinstance(fields, str):
+            fields = [fields]
+        wanted = [i for i, f in enumerate(self.fields) if any(fnmatch.fnmatch(f, g) for g in fields)]
+        return np.isin(np.array([f for _, f in self.series], dtype=np.int64), wanted)
+
+    def as_of(self, date, fields=None):
+        """{entity: {field: value}} in effect on *date*."""
+        return self._values_at(self.snapshot_at(date), fields)
+
+    def _values_at(self, s, fields=None):
+        pos = self._positions(s)
+        out = {}
+        for i in np.flatnonzero(self._select(fields) & (pos >= 0)):
+            value, present = self._decode(pos[i])
+            if present:
+                e, f = self.series[i]
+                out.setdefault(self.entities[e], {})[self.fields[f]] = value
+        return out
+
+    def diff(self, date_a, date_b, fields=None):
+        """[{entity, field, old, new, change, pct}] for every value that differs."""
+        pa = self._positions(self.snapshot_at(date_a))
+        pb = self._positions(self.snapshot_at(date_b))
+        rows = []
+        for i in np.flatnonzero(self._select(fields) & (pa != pb)):
+            (old, had), (new, has) = self._decode(pa[i]), self._decode(pb[i])
+            if (old, had) == (new, has):
+                continue                         # changed and changed back
+            e, f = self.series[i]
+            row = {"entity": self.entities[e], "field": self.fields[f],
+                   "old": old if had else None, "new": new if has else None}
+            if had and has and _number(old) and _number(new):
+                row["change"] = round(new - old, 6)
+                row["pct"] = round(100.0 * (new - old) / old, 2) if old else None
+            rows.append(row)
+        return rows
+
+    def document(self, date):
+        """The dataset's file as it was on *date* (for ModelTable and friends)."""
+        s = self.snapshot_at(date)
+        if s < 0:
+            raise ValueError(f"{self.dataset}: no snapshot on or before {date}")
+        _, collection, name_key = DATASETS[self.dataset]
+        values = self._values_at(s)
+        doc = _unflatten(values.pop(DOCUMENT, {}))
+        doc["last_updated"] = self.snapshots[s]["date"]
+        items = {e: _unflatten(v) for e, v in values.items()}
+        if name_key is None:
+            doc[collection] = items
+        else:
+            doc[collection] = [{name_key: e, **v} for e, v in items.items()]
+        return doc
+
+
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def encode(dataset, versions):
+    """Arrays and meta for *versions*, a date-ordered list of
+    (date ordinal, sha256, source, {(entity, field): value})."""
+    entities, fields, keys = {}, {}, []
+    for *_, flat in versions:
+        for (e, f) in flat:
+            entities.setdefault(e, len(entities))
+            fields.setdefault(f, len(fields))
+            keys.append((e, f))
+    series = list(dict.fromkeys(keys))
+    values, snap, code, num, offsets = {}, [], [], [], [0]
+    for e, f in series:
+        previous = ("absent",)
+        for s, (*_, flat) in enumerate(versions):
+            value = flat.get((e, f), ABSENT)
+            token = ("absent",) if value is ABSENT else (type(value).__name__, json.dumps(value, sort_keys=True))
+            if token == previous:
+                continue
+            previous = token
+            snap.append(s)
+            if value is ABSENT:
+                code.append(ABSENT)
+                num.append(0.0)
+            elif _number(value):
+                code.append(INT if isinstance(value, int) else FLOAT)
+                num.append(float(value))
+            else:
+                code.append(values.setdefault(token[1], len(values)))
+                num.append(0.0)
+        offsets.append(len(snap))
+    meta = {
+        "format": FORMAT,
+        "dataset": dataset,
+        "entities": list(entities),
+        "fields": list(fields),
+        "series": [[entities[e], fields[f]] for e, f in series],
+        "values": list(values),
+        "snapshots": [{"date": from_ordinal(d), "sha256": sha, "source": source}
+                      for d, sha, source, _ in versions],
+    }
+    arrays = {
+        "dates": np.array([d for d, *_ in versions], dtype=np.int32),
+        "offsets": np.array(offsets, dtype=np.int64),
+        "snap": np.array(snap, dtype=np.int64),
+        "code": np.array(code, dtype=np.int32),
+        "num": np.array(num, dtype=np.float64),
+    }
+    return meta, arrays
+
+
+class HistoryStore:
+    """All datasets' histories under one directory (default HISTORY_DIR)."""
+
+    def __init__(self, path=None):
+        self.path = path or reference_data.HISTORY_DIR
+        self._open = {}
+
+    def dataset_path(self, dataset):
+        return os.path.join(self.path, dataset)
+
+    def get(self, dataset):
+        """The History of *dataset*, or None if nothing was recorded yet."""
+        if dataset not in DATASETS:
+            raise ValueError(f"unknown dataset {dataset!r}; choose from {', '.join(DATASETS)}")
+        path = self.dataset_path(dataset)
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            return None
+        stamp = os.stat(os.path.join(path, "meta.json")).st_mtime_ns
+        hit = self._open.get(dataset)
+        if hit is None or hit[0] != stamp:
+            hit = (stamp, History(path))
+            self._open[dataset] = hit
+        return hit[1]
+
+    def record(self, dataset, doc=None, date=None, source="file"):
+        """Add a version of *dataset* (default: the file on disk) dated *date*
+        (default: its last_updated). Returns False if that exact version is
+        already the one in effect on that date."""
+        if doc is None:
+            doc = reference_data.load(reference_data.ALL_FILES[DATASETS[dataset][0]])
+        date = to_ordinal(date or doc.get("last_updated") or datetime.date.today().isoformat())
+        sha = hashlib.sha256(json.dumps(doc, sort_keys=True).encode()).hexdigest()[:16]
+        history = self.get(dataset)
+        versions = []
+        if history is not None:
+            s = history.snapshot_at(date)
+            if s >= 0 and history.snapshots[s]["sha256"] == sha:
+                return False
+            versions = [(int(history.dates[i]), snap["sha256"], snap["source"],
+                         self._flat_at(history, i)) for i, snap in enumerate(history.snapshots)]
+        versions.append((date, sha, source, flatten(dataset, doc)))
+        versions.sort(key=lambda v: v[0])        # stable: same-day versions keep their order
+        self._write(dataset, *encode(dataset, versions))
+        return True
+
+    @staticmethod
+    def _flat_at(history, s):
+        return {(e, f): v for e, fields in history._values_at(s).items() for f, v in fields.items()}
+
+    def _write(self, dataset, meta, arrays):
+        path = self.dataset_path(dataset)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), array)
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as fh:
+            json.dump(meta, fh, ensure_ascii=False)
+        old = f"{path}.{os.getpid()}.old"
+        if os.path.exists(path):
+            os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+        self._open.pop(dataset, None)
+
+    def import_git(self, dataset, repo=None):
+        """Record every committed version of the dataset's file, dated by commit."""
+        repo = repo or reference_data.REPO_ROOT
+        path = os.path.relpath(reference_data.ALL_FILES[DATASETS[dataset][0]], repo)
+        log = subprocess.run(["git", "-C", repo, "log", "--reverse", "--format=%H %cs", "--", path],
+                             capture_output=True, text=True, check=True).stdout.split("\n")
+        added = 0
+        for line in filter(None, log):
+            sha, date = line.split()
+            text = subprocess.run(["git", "-C", repo, "show", f"{sha}:{path}"],
+                                  capture_output=True, text=True, check=True).stdout
+            added += self.record(dataset, json.loads(text), date, f"git:{sha[:12]}")
+        return added
+
+
+def document_as_of(dataset, date, store=None):
+    """The dataset's file as it stood on *date*, from the history store."""
+    history = (store or HistoryStore()).get(dataset)
+    if history is None:
+        raise ValueError(f"no history recorded for {dataset}; run history_store.py record")
+    return history.document(date)
+
+
+# ===================================================================
+#  MAIN
+# ===================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Versioned history of the benchmark data")
+    parser.add_argument("--store", help=f"history directory (default: {reference_data.HISTORY_DIR})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("record", help="snapshot the current file(s)")
+    p.add_argument("datasets", nargs="*", help=f"default: all of {', '.join(DATASETS)}")
+    p.add_argument("--date", help="snapshot date (default: the file's last_updated)")
+    p = sub.add_parser("import-git", help="record every committed version")
+    p.add_argument("datasets", nargs="*", help=f"default: all of {', '.join(DATASETS)}")
+    p = sub.add_parser("as-of")
+    p.add_argument("dataset", choices=list(DATASETS))
+    p.add_argument("date")
+    p.add_argument("--field", action="append", help="field glob, repeatable (default: all)")
+    p = sub.add_parser("diff")
+    p.add_argument("dataset", choices=list(DATASETS))
+    p.add_argument("date_a")
+    p.add_argument("date_b")
+    p.add_argument("--field", action="append", help="field glob, repeatable (default: all)")
+    sub.add_parser("show")
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.store)
+    if args.command in ("record", "import-git"):
+        unknown = set(args.datasets) - set(DATASETS)
+        if unknown:
+            parser.error(f"unknown dataset(s): {', '.join(sorted(unknown))}")
+        for dataset in args.datasets or DATASETS:
+            if args.command == "record":
+                added = int(store.record(dataset, date=args.date))
+            else:
+                added = store.import_git(dataset)
+            print(f"{dataset}: {added} new snapshot(s), {len(store.get(dataset))} total")
+        return 0
+    if args.command == "show":
+        for dataset in DATASETS:
+            history = store.get(dataset)
+            if history is None:
+                print(f"{dataset}: no history")
+                continue
+            print(f"{dataset}: {len(history)} snapshot(s), {len(history.entities)} entities, "
+                  f"{len(history.series)} series, {len(history.snap)} stored changes")
+            for snap in history.snapshots:
+                print(f"  {snap['date']}  {snap['sha256']}  {snap['source']}")
+        return 0
+
+    history = store.get(args.dataset)
+    if history is None:
+        parser.error(f"no history recorded for {args.dataset}; run 'record' first")
+    if args.command == "as-of":
+        print(json.dumps(history.as_of(args.date, args.field), indent=2, ensure_ascii=False))
+    else:
+        rows = history.diff(args.date_a, args.date_b, args.field)
+        for r in rows:
+            change = f"  ({r['change']:+g}, {r['pct']:+.1f}%)" if r.get("pct") is not None else ""
+            print(f"{r['entity'] or '(file)'}  {r['field']}: {r['old']!r} -> {r['new']!r}{change}")
+        print(f"{len(rows)} change(s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
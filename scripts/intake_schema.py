@@ -0,0 +1,174 @@
+"""
+The intake questionnaire as data.
+Defines the response record shared by the ingestion and analytics tools,
+keyed by the structure of questionnaire/client-intake-form.json:
+
+    {
+        "response_id": "r-000001",
+        "client_profile": {"name": ..., "industry": ..., "company_size": ...,
+                           "monthly_budget": ..., "primary_devices": [...]},
+        "communication_preferences": {"messaging_platforms": [...], ...},
+        "data_privacy": {"sensitivity": ..., "regulations": [...], ...},
+        "performance_scale": {"response_time": ..., ...},
+        "use_cases": {"personal_productivity": [...], ...},
+        "capabilities": [...],   # ticked A4/B3 items (text)
+        "integrations": [...],   # ticked A5 items (text)
+        "ratings": {...},        # A3/B2/B4 item text -> 1-5
+        "open_fields": {...},    # field id -> free text
+        "private": {...},        # Part A-only answers (typical_day, hosting, ...)
+        "enterprise": {...},     # Part B-only answers (departments, approval, ...)
+        "proposal": {...},       # Section D (package, signature, ...)
+        "platform": ...,         # chosen platform, once known
+    }
+
+Every key is optional; missing answers are simply absent. Every content
+control tag of the generated DOCX is a key path of the form; fields marked
+"multiple" there hold a list of choices.
+"""
+
+import re
+
+import reference_data
+from generate_questionnaire import (
+    A3_WISHLIST, A5_INTEGRATIONS, B2_PAIN_POINTS, B4_WORKFLOWS, CAPABILITIES,
+)
+
+CAPABILITY_ITEMS = [item for _, items in CAPABILITIES for item in items]
+INTEGRATION_ITEMS = [item for _, items in A5_INTEGRATIONS for item in items]
+RATING_ITEMS = (
+    [item for _, items in A3_WISHLIST for item in items]
+    + list(B2_PAIN_POINTS)
+    + [item for _, items in B4_WORKFLOWS for item in items]
+)
+
+# Fields that hold a list of choices rather than a single one.
+MULTI_CHOICE = frozenset(
+    (section, name)
+    for section, fields in reference_data.load(reference_data.INTAKE_FORM)["sections"].items()
+    for name, spec in fields.items()
+    if isinstance(spec, dict) and spec.get("multiple")
+)
+
+# Short names for the fields the store and analytics segment on.
+SEGMENT_FIELDS = {
+    "industry": ("client_profile", "industry"),
+    "company_size": ("client_profile", "company_size"),
+    "budget": ("client_profile", "monthly_budget"),
+    "sensitivity": ("data_privacy", "sensitivity"),
+    "platform": ("platform",),
+}
+
+
+def load_form():
+    return reference_data.load(reference_data.INTAKE_FORM)
+
+
+def option_fields():
+    """Yield (path, options) for every closed-choice field in the form."""
+    for section, fields in load_form()["sections"].items():
+        if not isinstance(fields, dict):
+            continue
+        for name, spec in fields.items():
+            if isinstance(spec, dict) and "options" in spec:
+                yield (section, name), spec["options"]
+
+
+def field_options(path):
+    for p, options in option_fields():
+        if p == tuple(path):
+            return options
+    raise KeyError(".".join(path))
+
+
+def get_path(response, path, default=None):
+    node = response
+    for key in path:
+        if not isinstance(node, dict) or key not in node:
+            return default
+        node = node[key]
+    return node
+
+
+def normalize_option(text):
+    """Fold the small spelling differences between the DOCX and the JSON form
+    ("E-commerce / Retail" vs "E-commerce/Retail", "2–10" vs "2-10")."""
+    text = text.replace("\u2013", "-").replace("\u2014", "-").lower()
+    return re.sub(r"\s*([/,-])\s*", r"\1", text).strip()
+
+
+def option_index(options, value):
+    """Position of *value* in *options*, tolerant of spelling and of a
+    parenthetical qualifier ("Private (€1,000)" is "Private"); -1 if absent."""
+    if value is None:
+        return -1
+    wanted = normalize_option(value)
+    normalized = [normalize_option(option) for option in options]
+    for i, option in enumerate(normalized):
+        if option == wanted:
+            return i
+    for i, option in enumerate(normalized):
+        if wanted.startswith(option + " ("):
+            return i
+    return -1
+
+
+def validate(response):
+    """Check a response record against the form; returns (errors, warnings).
+
+    Errors are structural: wrong value types, checklist items that are not in
+    the questionnaire, ratings outside 1-5. Closed-choice answers that are not
+    among client-intake-form.json's options (write-ins such as "Other: ..."
+    excepted) are warnings, since several DOCX questions word their options
+    differently from the JSON form.
+    """
+    if not isinstance(response, dict):
+        return [f"response must be an object, got {type(response).__name__}"], []
+    errors, warnings = [], []
+    for path, options in option_fields():
+        value = get_path(response, path)
+        if value is None:
+            continue
+        name = ".".join(path)
+        if path in MULTI_CHOICE:
+            if not isinstance(value, list):
+                errors.append(f"{name}: expected a list, got {type(value).__name__}")
+                continue
+            values = value
+        elif isinstance(value, str):
+            values = [value]
+        else:
+            errors.append(f"{name}: expected one option, got {type(value).__name__}")
+            continue
+        for v in values:
+            if option_index(options, v) < 0 and not _is_write_in(v):
+                warnings.append(f"{name}: {v!r} is not an option of the intake form")
+    for key, known in (("capabilities", CAPABILITY_ITEMS), ("integrations", INTEGRATION_ITEMS)):
+        items = response.get(key) or []
+        if not isinstance(items, list):
+            errors.append(f"{key}: expected a list, got {type(items).__name__}")
+            continue
+        known = _known(key, known)
+        unknown = [i for i in items if i not in known and not _is_write_in(i)]
+        if unknown:
+            errors.append(f"{key}: {len(unknown)} unknown item(s), e.g. {unknown[0]!r}")
+    ratings = response.get("ratings") or {}
+    if not isinstance(ratings, dict):
+        errors.append(f"ratings: expected an object, got {type(ratings).__name__}")
+        ratings = {}
+    for item, score in ratings.items():
+        if not isinstance(score, int) or isinstance(score, bool) or not 1 <= score <= 5:
+            errors.append(f"ratings: {item!r} has {score!r}, expected 1-5")
+    return errors, warnings
+
+
+_KNOWN = {}
+
+
+def _known(key, items):
+    if key not in _KNOWN:
+        _KNOWN[key] = frozenset(items)
+    return _KNOWN[key]
+
+
+def _is_write_in(value):
+    return isinstance(value, str) and ":" in value
@@ -0,0 +1,275 @@
+"""
+Latency / throughput benchmark for the models in llm-model-comparison.json.
+Drives a local mock provider that streams tokens with a per-model profile
+(time to first token, prefill and decode speed, server-side concurrency,
+jitter and occasional tail spikes) under concurrent load, and measures
+time-to-first-token and end-to-end latency percentiles and throughput.
+
+With --write, results are stored on each model as a "latency" object
+(p50/p95/p99 in ms, measured tokens/s, how it was measured), which
+model_router uses to drop models that cannot meet a client's
+response_time answer. These are mock figures ("source": "mock") and the
+committed reference file carries none; --write is for trying the SLA
+filter locally.
+
+The mock runs on a compressed clock (--time-scale) so a full run takes
+seconds; reported numbers are in simulated real time. Point --profiles at
+a JSON file of {model: {profile fields}} to override the defaults.
+
+Usage:
+    python latency_bench.py                          # print the table
+    python latency_bench.py --concurrency 32 --requests 400 --write
+    python latency_bench.py --models "Claude Haiku 4.5,GPT-4.1" --output-tokens 800
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+import reference_data
+
+# Typical hosted-API behaviour; ttft_ms excludes prefill, decode is tokens/s per stream.
+MOCK_PROFILES = {
+    "Claude Opus 4.6":   {"ttft_ms": 1800, "prefill_tps": 6000, "decode_tps": 45, "slots": 8},
+    "Claude Sonnet 4.6": {"ttft_ms": 900, "prefill_tps": 9000, "decode_tps": 75, "slots": 16},
+    "Claude Haiku 4.5":  {"ttft_ms": 450, "prefill_tps": 15000, "decode_tps": 140, "slots": 32},
+    "GPT-5.2":           {"ttft_ms": 1500, "prefill_tps": 8000, "decode_tps": 60, "slots": 12},
+    "GPT-4.1":           {"ttft_ms": 700, "prefill_tps": 10000, "decode_tps": 90, "slots": 16},
+    "DeepSeek R1":       {"ttft_ms": 3500, "prefill_tps": 5000, "decode_tps": 35, "slots": 8},
+    "DeepSeek V3.2":     {"ttft_ms": 1200, "prefill_tps": 6000, "decode_tps": 40, "slots": 8},
+    "Gemini 2.5 Pro":    {"ttft_ms": 1400, "prefill_tps": 12000, "decode_tps": 85, "slots": 16},
+    "Grok 4.1 Fast":     {"ttft_ms": 500, "prefill_tps": 12000, "decode_tps": 120, "slots": 24},
+}
+DEFAULT_PROFILE = {"ttft_ms": 1000, "prefill_tps": 8000, "decode_tps": 60, "slots": 8}
+JITTER = 0.3          # lognormal sigma applied to ttft and decode speed
+SPIKE_RATE = 0.02     # share of requests hit by a tail spike
+SPIKE_FACTOR = 3.0
+
+
+class MockProvider:
+    """Streams fake tokens for one model on a compressed clock.
+
+    Requests beyond `slots` wait for a free slot, the way a rate-limited
+    endpoint queues them, so latency grows with concurrency.
+    """
+
+    def __init__(self, model, profile=None, time_scale=100.0, seed=0):
+        self.model = model
+        self.profile = {**DEFAULT_PROFILE, **(profile or MOCK_PROFILES.get(model, {}))}
+        self.time_scale = time_scale
+        self._random = random.Random(seed)
+        self._slots = None
+
+    async def stream(self, prompt_tokens, output_tokens):
+        """Yield (token index, simulated seconds since the call) per token."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.profile["slots"])
+        p = self.profile
+        rnd = self._random
+        start = time.perf_counter()
+        spike = SPIKE_FACTOR if rnd.random() < SPIKE_RATE else 1.0
+        ttft = (p["ttft_ms"] / 1000 * rnd.lognormvariate(0, JITTER) * spike
+                + prompt_tokens / p["prefill_tps"])
+        per_token = 1 / (p["decode_tps"] * rnd.lognormvariate(0, JITTER / 2))
+        async with self._slots:
+            # Sleep to absolute deadlines so timer overshoot does not accumulate.
+            t0 = time.perf_counter()
+            await _sleep_until(t0 + ttft / self.time_scale)
+            yield 0, (time.perf_counter() - start) * self.time_scale
+            # Tokens arrive in chunks of 16, like SSE frames, to keep the event loop light.
+            for i in range(16, output_tokens + 16, 16):
+                n = min(i, output_tokens)
+                await _sleep_until(t0 + (ttft + per_token * (n - 1)) / self.time_scale)
+                yield n - 1, (time.perf_counter() - start) * self.time_scale
+
+
+async def _sleep_until(deadline):
+    delay = deadline - time.perf_counter()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+async def run_load(provider, requests, concurrency, prompt_tokens, output_tokens):
+    """Closed-loop load: `concurrency` clients issue `requests` calls in total."""
+    ttft = np.empty(requests)
+    total = np.empty(requests)
+    counter = iter(range(requests))
+
+    async def client():
+        for i in counter:
+            first = None
+            async for _, elapsed in provider.stream(prompt_tokens, output_tokens):
+                if first is None:
+                    first = elapsed
+            ttft[i] = first
+            total[i] = elapsed
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    wall = (time.perf_counter() - start) * provider.time_scale
+    return ttft, total, wall
+
+
+def summarize(model, ttft, total, wall, concurrency, prompt_tokens, output_tokens):
+    p = np.percentile
+    decode = total - ttft
+    return {
+        "ttft_p50_ms": int(p(ttft, 50) * 1000),
+        "p50_ms": int(p(total, 50) * 1000),
+        "p95_ms": int(p(total, 95) * 1000),
+        "p99_ms": int(p(total, 99) * 1000),
+        "tokens_per_s": int(np.median((output_tokens - 1) / np.maximum(decode, 1e-9))),
+        "requests_per_s": round(len(total) / wall, 2),
+        "concurrency": concurrency,
+        "prompt_tokens": prompt_tokens,
+        "output_tokens": output_tokens,
+        "source": "mock",
+        "measured": datetime.date.today().isoformat(),
+    }
+
+
+def benchmark(models, requests=200, concurrency=8, prompt_tokens=1500, output_tokens=150,
+              time_scale=100.0, profiles=None, seed=0):
+    """{model: latency fields} for each model name."""
+    results = {}
+    for i, model in enumerate(models):
+        provider = MockProvider(model, (profiles or {}).get(model), time_scale, seed + i)
+        ttft, total, wall = asyncio.run(
+            run_load(provider, requests, concurrency, prompt_tokens, output_tokens))
+        results[model] = summarize(model, ttft, total, wall, concurrency,
+                                   prompt_tokens, output_tokens)
+    return results
+
+
+def _with_latency(model, fields):
+    """*model* with "latency" set to *fields*, placed after its quality_tier
+    (or context_window)."""
+    anchor = "quality_tier" if "quality_tier" in model else "context_window"
+    new = {}
+    for key, value in model.items():
+        if key != "latency":
+            new[key] = value
+        if key == anchor:
+            new["latency"] = fields
+    return new
+
+
+def _set_latency(lines, name, fields):
+    """Edit the text *lines* of llm-model-comparison.json in place: put a
+    one-line "latency" entry in model *name*'s object, replacing any old one.
+    Every other line is left exactly as written."""
+    start = next((i for i, line in enumerate(lines)
+                  if line.strip().rstrip(",") == f'"name": {json.dumps(name, ensure_ascii=False)}'),
+                 None)
+    if start is None:
+        raise ValueError(f"model {name!r} not found")
+    indent = lines[start][:len(lines[start]) - len(lines[start].lstrip())]
+    end = start   # the object's closing brace, one level out
+    while not (lines[end].lstrip().startswith("}") and not lines[end].startswith(indent)):
+        end += 1
+    i = start
+    while i < end:
+        if lines[i].startswith(indent + '"latency":'):
+            stop = i
+            if not lines[i].rstrip().rstrip(",").endswith("}"):   # spread over several lines
+                while not lines[stop].startswith(indent + "}"):
+                    stop += 1
+            del lines[i:stop + 1]
+            end -= stop + 1 - i
+            if i == end and lines[i - 1].rstrip().endswith(","):   # it was the last key
+                lines[i - 1] = lines[i - 1].rstrip()[:-1] + "\n"
+        else:
+            i += 1
+    keys = [(i, line.lstrip()) for i, line in enumerate(lines[start:end], start)
+            if line.startswith(indent + '"')]
+    anchor = next((i for i, key in keys if key.startswith('"quality_tier":')), None)
+    if anchor is None:
+        anchor = next(i for i, key in keys if key.startswith('"context_window":'))
+    text = f'{indent}"latency": {json.dumps(fields, ensure_ascii=False)}'
+    if lines[anchor].rstrip().endswith(","):
+        text += ","
+    else:
+        lines[anchor] = lines[anchor].rstrip() + ",\n"
+    lines.insert(anchor + 1, text + "\n")
+
+
+def write_results(results, path=reference_data.LLM_MODELS):
+    """Store results as each model's "latency" object, after its
+    quality_tier (or context_window). Only the latency lines change; the
+    rest of the hand-formatted file is kept byte for byte."""
+    with open(path, encoding="utf-8") as fh:
+        text = fh.read()
+    data = json.loads(text)
+    by_name = {m["name"]: i for i, m in enumerate(data["models"])}
+    lines = text.splitlines(keepends=True)
+    for model, fields in results.items():
+        data["models"][by_name[model]] = _with_latency(data["models"][by_name[model]], fields)
+        _set_latency(lines, model, fields)
+    text = "".join(lines)
+    try:
+        placed = json.loads(text) == data
+    except ValueError:
+        placed = False
+    if not placed:
+        raise ValueError(f"could not place the latency fields in {path}; file left unchanged")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(text)
+    os.replace(tmp, path)
+
+
+# ===================================================================
+#  MAIN
+# ===================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mock-provider latency benchmark")
+    parser.add_argument("--models", help="comma-separated model names (default: all)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per model")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--prompt-tokens", type=int, default=1500)
+    parser.add_argument("--output-tokens", type=int, default=150,
+                        help="reply length; 150 is a typical chat/message answer")
+    parser.add_argument("--time-scale", type=float, default=100.0,
+                        help="run the mock clock this many times faster than real time")
+    parser.add_argument("--profiles", help="JSON file overriding MOCK_PROFILES")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--write", action="store_true",
+                        help="store the results in llm-model-comparison.json")
+    args = parser.parse_args(argv)
+
+    known = [m["name"] for m in reference_data.load(reference_data.LLM_MODELS)["models"]]
+    models = [m.strip() for m in args.models.split(",")] if args.models else known
+    unknown = [m for m in models if m not in known]
+    if unknown:
+        parser.error(f"unknown model(s): {', '.join(unknown)}")
+    profiles = None
+    if args.profiles:
+        with open(args.profiles, encoding="utf-8") as fh:
+            profiles = json.load(fh)
+
+    results = benchmark(models, args.requests, args.concurrency, args.prompt_tokens,
+                        args.output_tokens, args.time_scale, profiles, args.seed)
+    print(f"{'Model':<20}{'TTFT p50':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'tok/s':>8}{'req/s':>8}")
+    for model, r in results.items():
+        print(f"{model:<20}{r['ttft_p50_ms']:>8}ms{r['p50_ms']:>7}ms{r['p95_ms']:>7}ms"
+              f"{r['p99_ms']:>7}ms{r['tokens_per_s']:>8}{r['requests_per_s']:>8}")
+    if args.write:
+        write_results(results)
+        from history_store import HistoryStore
+        HistoryStore().record("llm-models", date=datetime.date.today().isoformat(),
+                              source="latency_bench")
+        print(f"Wrote latency fields for {len(results)} model(s) to {reference_data.LLM_MODELS} "
+              "(snapshot kept in the history store)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,465 @@
+"""
+Outcome-driven refresh of needs-mapping-matrix.json.
+needs-mapping-matrix.json is hand-curated. This learner keeps sparse
+association counts from what was actually deployed for past clients --
+need -> platform, need -> llm_model, need -> skill and ticked
+capability -> skill -- in a small SQLite file, and exports refreshed
+mappings in the same schema so need_matcher.py, pipeline.py and
+deploy_configs.py read them unchanged.
+
+Recording an outcome only touches the counters of that one client
+(an UPSERT per pair); re-recording a response_id first takes its
+previous outcome back out, so nothing is ever recomputed over history.
+
+An outcome is a client record plus what was deployed, read from the same
+inputs deploy_configs.py takes (.jsonl/.json records or a pipeline
+--report). Only records with an explicit "deployment" block
+{platform, llm_model, skills, needs} are counted; fields the block
+leaves out are taken from the recommendation. Records that only carry
+the pipeline's recommendation are skipped: counting them would teach the
+matrix its own proposals. --from-recommendations counts them anyway.
+Platform, model, skill and need names are matched to the reference data
+("nanoclaw" -> "NanoClaw", "Email-Manager" -> "email-manager") before
+they are counted.
+
+Export blends the curated mapping (--base, the repository's
+needs-mapping-matrix.json by default), worth --prior outcomes, with the
+observed counts: platform and llm_model are the most-weighted choice,
+skills are every skill whose weighted share reaches --min-share. Each
+mapping gains a "weights" block and the file a "capability_skills" map;
+both are extra keys that existing readers ignore. The export is written
+next to the curated file, never over it: blending a learned export again
+would count every outcome twice, so export refuses to write onto its
+base and to take a learned export as base.
+
+Usage:
+    python mapping_learner.py record outcomes.db deployed.jsonl
+    python mapping_learner.py record outcomes.db run.json --from-recommendations
+    python mapping_learner.py export outcomes.db -o needs-mapping-learned.json
+    python mapping_learner.py export outcomes.db --base curated.json -o learned.json
+    python mapping_learner.py show outcomes.db "Email management"
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from collections import defaultdict
+
+import reference_data
+
+PRIOR = 3.0        # the curated mapping counts as this many outcomes
+MIN_SHARE = 0.3    # keep a skill once it is in this share of weighted outcomes
+CAP_MIN = 2        # capabilities need this many outcomes before they are exported
+CAP_TOP = 5        # skills listed per capability
+
+# Counter kinds and the total each is a share of. Platform and model go to
+# an outcome's primary need only; skills go to the need they are curated
+# for, and skills no matched need explains go to the primary one.
+TOTAL_OF = {
+    "need.platform": "total.primary",
+    "need.llm_model": "total.primary",
+    "need.skill": "total.needs",
+    "capability.skill": "total.capabilities",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outcomes (
+    response_id TEXT PRIMARY KEY,
+    outcome TEXT NOT NULL,
+    recorded REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS counts (
+    kind TEXT NOT NULL,
+    src TEXT NOT NULL,
+    dst TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (kind, src, dst)
+) WITHOUT ROWID;
+"""
+
+
+def _list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return [v for v in value if v]
+
+
+def _name_key(name):
+    return re.sub(r"[^a-z0-9]+", "", str(name).lower())
+
+
+_canonical = {}
+
+
+def canonical_names():
+    """{kind: {folded name: reference spelling}} for "platform", "llm_model",
+    "skill" and "need", from the mapping matrix and the benchmark files."""
+    docs = [reference_data.load(path) for path in (reference_data.NEEDS_MAPPING,
+                                                   reference_data.LLM_MODELS,
+                                                   reference_data.SKILLS_CATALOG)]
+    if _canonical.get("docs") != [id(d) for d in docs]:
+        matrix, models, catalog = docs
+        mappings = matrix["mappings"]
+        names = {
+            "platform": [p.strip() for m in mappings for p in m["platform"].split("+")]
+                        + [p for m in models["models"] for p in m["agent_compatibility"]],
+            "llm_model": [m["llm_model"] for m in mappings] + [m["name"] for m in models["models"]],
+            "skill": [k for m in mappings for k in m["skills"]] + [k["name"] for k in catalog["top_skills"]],
+            "need": [m["need"] for m in mappings],
+        }
+        _canonical["docs"] = [id(d) for d in docs]
+        _canonical["names"] = {kind: {_name_key(n): n for n in reversed(spellings)}
+                               for kind, spellings in names.items()}
+    return _canonical["names"]
+
+
+def canonical(kind, name):
+    """*name* as the reference data spells it; unknown names pass through,
+    skills slugged like the catalog's."""
+    if not name:
+        return name
+    known = canonical_names()[kind]
+    if kind == "platform":   # "openclaw + nanoclaw" -> "OpenClaw + NanoClaw"
+        parts = [p.strip() for p in str(name).split("+")]
+        return " + ".join(known.get(_name_key(p), p) for p in parts)
+    name = str(name).strip()
+    if kind == "skill":
+        return known.get(_name_key(name), re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-"))
+    return known.get(_name_key(name), name)
+
+
+def outcome_from(record, recommendation=None, mappings=None, from_recommendation=False):
+    """{response_id, needs, need_skills, capabilities, platform, llm_model,
+    skills} or None when the record says nothing about what was deployed:
+    it has no "deployment" block (unless *from_recommendation*, which takes
+    the recommendation as deployed) or the block names nothing.
+
+    needs keep the recommendation's order, primary first; need_skills
+    fixes which need each deployed skill is credited to, so that the
+    outcome can be taken back out exactly even after the matrix changes.
+    """
+    if not isinstance(record, dict):
+        raise ValueError(f"expected a JSON object, got {type(record).__name__}")
+    deployed = record.get("deployment")
+    if deployed is not None and not isinstance(deployed, dict):
+        raise ValueError("deployment: expected an object")
+    if not deployed and not from_recommendation:
+        return None
+    deployed = deployed or {}
+    rec = recommendation or {}
+    needs = list(dict.fromkeys(canonical("need", n) for n in _list(
+        deployed.get("needs") or [n["need"] if isinstance(n, dict) else n
+                                  for n in rec.get("needs") or ()])))
+    skills = sorted({canonical("skill", s) for s in _list(deployed.get("skills") or rec.get("skills"))})
+    response_id = str(record.get("response_id") or "")
+    if not response_id:
+        raise ValueError("outcome has no response_id")
+    platform = canonical("platform", deployed.get("platform") or record.get("platform")
+                         or rec.get("platform"))
+    llm_model = canonical("llm_model", deployed.get("llm_model") or rec.get("llm_model"))
+    if not needs or not (platform or llm_model or skills):
+        return None
+    if mappings is None:
+        mappings = {m["need"]: m for m in reference_data.load(reference_data.NEEDS_MAPPING)["mappings"]}
+    need_skills, explained = {}, set()
+    for need in needs:
+        curated = set(mappings[need]["skills"]) if need in mappings else set()
+        need_skills[need] = [s for s in skills if s in curated]
+        explained.update(need_skills[need])
+    need_skills[needs[0]] = sorted(set(need_skills[needs[0]]) | (set(skills) - explained))
+    return {
+        "response_id": response_id,
+        "needs": needs,
+        "need_skills": need_skills,
+        "capabilities": sorted(set(_list(record.get("capabilities")))),
+        "platform": platform,
+        "llm_model": llm_model,
+        "skills": skills,
+    }
+
+
+def _pairs(outcome):
+    """Every (kind, src, dst) counter one outcome contributes to."""
+    primary = outcome["needs"][0]
+    yield "total.primary", primary, ""
+    if outcome.get("platform"):
+        yield "need.platform", primary, outcome["platform"]
+    if outcome.get("llm_model"):
+        yield "need.llm_model", primary, outcome["llm_model"]
+    for need in outcome["needs"]:
+        yield "total.needs", need, ""
+        for skill in outcome["need_skills"].get(need, ()):
+            yield "need.skill", need, skill
+    for cap in outcome.get("capabilities") or ():
+        yield "total.capabilities", cap, ""
+        for skill in outcome.get("skills") or ():
+            yield "capability.skill", cap, skill
+
+
+class MappingLearner:
+    """Sparse deployment-outcome counts in SQLite.
+
+    with MappingLearner("outcomes.db") as learner:
+        learner.record(outcome_from(record, recommendation))
+        matrix = learner.export()
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM outcomes").fetchone()[0]
+
+    # -- writes -----------------------------------------------------------
+    def _bump(self, outcome, delta):
+        keys = list(_pairs(outcome))
+        self._conn.executemany(
+            "INSERT INTO counts (kind, src, dst, n) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (kind, src, dst) DO UPDATE SET n = n + excluded.n",
+            [(*key, delta) for key in keys])
+        if delta < 0:  # keep the table sparse
+            self._conn.executemany(
+                "DELETE FROM counts WHERE kind = ? AND src = ? AND dst = ? AND n <= 0", keys)
+
+    def _record(self, outcome):
+        rid = outcome["response_id"]
+        row = self._conn.execute(
+            "SELECT outcome FROM outcomes WHERE response_id = ?", (rid,)).fetchone()
+        if row is not None:
+            previous = json.loads(row[0])
+            if previous == outcome:
+                return False
+            self._bump(previous, -1)
+        self._bump(outcome, 1)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO outcomes (response_id, outcome, recorded) VALUES (?, ?, ?)",
+            (rid, json.dumps(outcome, ensure_ascii=False, separators=(",", ":")), time.time()))
+        return True
+
+    def record(self, outcome):
+        """Count one deployment; returns False if it was already recorded as is."""
+        return self.record_many([outcome]) == 1
+
+    def record_many(self, outcomes):
+        """Count deployments in one transaction; returns how many changed."""
+        changed = 0
+        with self._conn:
+            for outcome in outcomes:
+                changed += self._record(outcome)
+        return changed
+
+    def forget(self, response_id):
+        """Take one recorded deployment back out of the counts."""
+        with self._conn:
+            row = self._conn.execute(
+                "SELECT outcome FROM outcomes WHERE response_id = ?", (response_id,)).fetchone()
+            if row is None:
+                return False
+            self._bump(json.loads(row[0]), -1)
+            self._conn.execute("DELETE FROM outcomes WHERE response_id = ?", (response_id,))
+        return True
+
+    # -- reads ------------------------------------------------------------
+    def counts(self, kind, src=None):
+        """{src: {dst: n}} for one kind, or {dst: n} for a single src."""
+        if src is not None:
+            return dict(self._conn.execute(
+                "SELECT dst, n FROM counts WHERE kind = ? AND src = ?", (kind, src)).fetchall())
+        table = defaultdict(dict)
+        for s, dst, n in self._conn.execute(
+                "SELECT src, dst, n FROM counts WHERE kind = ?", (kind,)):
+            table[s][dst] = n
+        return dict(table)
+
+    def totals(self, kind):
+        """{need or capability: outcomes counted}, kind as in TOTAL_OF."""
+        return {src: table.get("", 0) for src, table in self.counts(kind).items()}
+
+    def suggest_skills(self, capabilities, top=CAP_TOP):
+        """[(skill, score)] deployed alongside these capabilities; the score
+        is the mean share of each capability's outcomes that used the skill."""
+        scores = defaultdict(float)
+        capabilities = _list(capabilities)
+        for cap in capabilities:
+            total = self.counts("total.capabilities", cap).get("", 0)
+            if not total:
+                continue
+            for skill, n in self.counts("capability.skill", cap).items():
+                scores[skill] += n / total / len(capabilities)
+        return sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[:top]
+
+    def export(self, base=None, prior=PRIOR, min_share=MIN_SHARE):
+        """The mapping matrix refreshed by every recorded outcome."""
+        base = base or reference_data.load(reference_data.NEEDS_MAPPING)
+        primary = self.totals("total.primary")
+        seen = self.totals("total.needs")
+        platforms = self.counts("need.platform")
+        models = self.counts("need.llm_model")
+        skills = self.counts("need.skill")
+        mappings = []
+        for m in base["mappings"]:
+            need = m["need"]
+            n, lead = seen.get(need, 0), primary.get(need, 0)
+            p_weights = _blend(m["platform"], platforms.get(need, {}), prior, prior + lead)
+            m_weights = _blend(m["llm_model"], models.get(need, {}), prior, prior + lead)
+            s_weights = _blend(m["skills"], skills.get(need, {}), prior, prior + n)
+            order = {s: i for i, s in enumerate(m["skills"])}
+            kept = sorted((s for s, w in s_weights.items() if w >= min_share),
+                          key=lambda s: (-s_weights[s], order.get(s, len(order)), s))
+            mappings.append({
+                **m,
+                "platform": _best(p_weights, m["platform"]),
+                "llm_model": _best(m_weights, m["llm_model"]),
+                "skills": kept or m["skills"],
+                "weights": {"outcomes": n, "primary": lead, "platform": p_weights,
+                            "llm_model": m_weights, "skills": s_weights},
+            })
+        unmapped = sorted(set(seen) - {m["need"] for m in base["mappings"]})
+        caps = self.totals("total.capabilities")
+        cap_skills = {}
+        for cap, table in sorted(self.counts("capability.skill").items()):
+            if caps.get(cap, 0) >= CAP_MIN:
+                ranked = sorted(table.items(), key=lambda kv: (-kv[1], kv[0]))[:CAP_TOP]
+                cap_skills[cap] = {s: round(k / caps[cap], 3) for s, k in ranked}
+        return {
+            **base,
+            "mappings": mappings,
+            "capability_skills": cap_skills,
+            "learned": {"outcomes": len(self), "prior": prior, "min_share": min_share,
+                        "unmapped_needs": unmapped, "exported": time.strftime("%Y-%m-%d")},
+        }
+
+
+def _blend(curated, observed, prior, total):
+    """{choice: weighted share} of the curated choice(s) plus observed counts."""
+    weights = defaultdict(float)
+    for choice in _list(curated):
+        weights[choice] += prior
+    for choice, n in observed.items():
+        weights[choice] += n
+    return {c: round(w / total, 3) for c, w in sorted(weights.items(), key=lambda kv: -kv[1])}
+
+
+def _best(weights, curated):
+    """Most-weighted choice; ties keep the curated one."""
+    top = max(weights.values())
+    return curated if weights.get(curated) == top else next(c for c, w in weights.items() if w == top)
+
+
+# ===================================================================
+#  MAIN
+# ===================================================================
+
+def main(argv=None):
+    from deploy_configs import iter_clients
+
+    parser = argparse.ArgumentParser(description="Learn need mappings from deployment outcomes")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="count deployment outcomes")
+    rec.add_argument("db")
+    rec.add_argument("inputs", nargs="+", help=".jsonl/.json records or a pipeline report")
+    rec.add_argument("--from-recommendations", action="store_true",
+                     help="count records without a deployment block as if the "
+                          "recommendation had been deployed")
+    forget = sub.add_parser("forget", help="remove recorded outcomes")
+    forget.add_argument("db")
+    forget.add_argument("response_ids", nargs="+")
+    exp = sub.add_parser("export", help="write refreshed needs-mapping-matrix.json")
+    exp.add_argument("db")
+    exp.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    exp.add_argument("--base", default=reference_data.NEEDS_MAPPING,
+                     help="curated matrix to blend with (default: the repository's; never overwritten)")
+    exp.add_argument("--prior", type=float, default=PRIOR,
+                     help=f"weight of the curated mapping, in outcomes (default {PRIOR:g})")
+    exp.add_argument("--min-share", type=float, default=MIN_SHARE,
+                     help=f"keep skills with at least this weighted share (default {MIN_SHARE:g})")
+    show = sub.add_parser("show", help="print the counts behind one need or capability")
+    show.add_argument("db")
+    show.add_argument("name")
+    args = parser.parse_args(argv)
+    if args.command == "export":
+        if args.output != "-" and os.path.exists(args.output) and os.path.samefile(args.output, args.base):
+            parser.error(f"{args.output} is the curated base; write the learned matrix elsewhere")
+        with open(args.base, encoding="utf-8") as fh:
+            base = json.load(fh)
+        if "learned" in base:
+            parser.error(f"{args.base} is a learned export; blending it again counts every "
+                         "outcome twice -- use the curated matrix as --base")
+
+    with MappingLearner(args.db) as learner:
+        if args.command == "record":
+            start = time.perf_counter()
+            outcomes, skipped, failures = [], 0, []
+            for n, (record, recommendation) in enumerate(iter_clients(args.inputs), 1):
+                try:
+                    outcome = outcome_from(record, recommendation,
+                                           from_recommendation=args.from_recommendations)
+                except Exception as exc:  # one bad record must not sink the batch
+                    rid = record.get("response_id") if isinstance(record, dict) else None
+                    failures.append((rid or f"record-{n}", f"{type(exc).__name__}: {exc}"))
+                    continue
+                if outcome is None:
+                    skipped += 1
+                else:
+                    outcomes.append(outcome)
+            changed = learner.record_many(outcomes)
+            print(f"{changed} outcome(s) recorded, {len(outcomes) - changed} unchanged, "
+                  f"{skipped} skipped without a deployment block; {len(learner)} total "
+                  f"in {time.perf_counter() - start:.2f}s")
+            for rid, error in failures:
+                print(f"  FAILED {rid}: {error}")
+            if failures:
+                return 1
+        elif args.command == "forget":
+            gone = sum(learner.forget(rid) for rid in args.response_ids)
+            print(f"{gone} outcome(s) removed; {len(learner)} total")
+        elif args.command == "export":
+            matrix = learner.export(base, prior=args.prior, min_share=args.min_share)
+            text = json.dumps(matrix, indent=2, ensure_ascii=False) + "\n"
+            if args.output == "-":
+                sys.stdout.write(text)
+            else:
+                with open(args.output, "w", encoding="utf-8") as fh:
+                    fh.write(text)
+                changed = sum(m["weights"]["outcomes"] > 0 for m in matrix["mappings"])
+                print(f"{len(matrix['mappings'])} mapping(s), {changed} with outcomes "
+                      f"-> {args.output}")
+            for need in matrix["learned"]["unmapped_needs"]:
+                print(f"  not in the matrix, ignored: {need}", file=sys.stderr)
+        else:
+            found = False
+            for kind, total_kind in TOTAL_OF.items():
+                table = learner.counts(kind, args.name)
+                if table:
+                    found = True
+                    total = learner.counts(total_kind, args.name).get("", 0)
+                    print(f"{kind} ({total} outcome(s))")
+                    for dst, n in sorted(table.items(), key=lambda kv: (-kv[1], kv[0])):
+                        print(f"  {n:6d}  {dst}")
+            if not found:
+                print(f"no outcomes recorded for {args.name!r}")
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
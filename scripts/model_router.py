@@ -0,0 +1,221 @@
+"""
+Cheapest-model routing per selected capability.
+Instead of pinning one llm_model per need, route each ticked capability
+(of the 40 in CAPABILITIES) to the cheapest model that meets its quality
+tier, fits its context needs and runs on the client's platform, using the
+prices, context windows, quality tiers and agent compatibility in
+benchmarks/llm-model-comparison.json.
+
+A lead's response_time answer ("Instant (<2s)", "Quick (under 30 seconds)",
+...) also rules out models whose measured p95 latency (the "latency" field
+written by latency_bench.py) is over the target; unmeasured models pass.
+
+The whole lead list is solved at once as a (leads x capabilities x models)
+masked argmin. Requires numpy.
+"""
+
+import re
+
+import numpy as np
+
+import reference_data
+from generate_questionnaire import CAPABILITIES
+from shared_catalog import worker_table
+
+TIERS = {"basic": 1, "standard": 2, "premium": 3}
+
+# Per-category defaults: (quality tier, input tokens/task, output tokens/task,
+# minimum context window). Internal heuristics -- adjust as usage data arrives.
+CATEGORY_PROFILES = {
+    "Your Emails & Messages": (1, 3000, 500, 32000),
+    "Your Calendar & Schedule": (1, 1500, 300, 16000),
+    "Your Files & Documents": (2, 20000, 1500, 128000),
+    "Research & Staying Informed": (2, 12000, 1500, 64000),
+    "Social Media & Content": (2, 2000, 1200, 16000),
+    "Money & Invoices": (2, 3000, 600, 32000),
+    "Your Team & Customers": (2, 4000, 800, 32000),
+    "Your Home & Daily Life": (1, 1000, 200, 8000),
+}
+
+CAPABILITY_ITEMS = [item for _, items in CAPABILITIES for item in items]
+_PROFILE = np.array([CATEGORY_PROFILES[cat] for cat, items in CAPABILITIES for _ in items],
+                    dtype=np.float64)
+DEFAULT_TIER = _PROFILE[:, 0].astype(np.int8)
+INPUT_TOKENS = _PROFILE[:, 1]
+OUTPUT_TOKENS = _PROFILE[:, 2]
+MIN_CONTEXT = _PROFILE[:, 3]
+
+_CAP_INDEX = {item: i for i, item in enumerate(CAPABILITY_ITEMS)}
+
+_SECONDS = re.compile(r"(\d+(?:\.\d+)?)\s*(?:s\b|sec)")
+
+
+def sla_seconds(answer):
+    """Latency target in seconds from a response_time answer; None if any will do."""
+    m = _SECONDS.search(answer or "")
+    return float(m.group(1)) if m else None
+
+
+class ModelTable:
+    """Column arrays over the models in llm-model-comparison.json."""
+
+    def __init__(self, data=None):
+        shared = worker_table("llm-model-comparison") if data is None else None
+        if shared is not None:
+            self._from_table(shared)
+        else:
+            self._from_document(data or reference_data.load(reference_data.LLM_MODELS))
+        self.platforms = sorted({p for c in self._compatibility for p in c})
+        self.compat = np.array([[p in c for c in self._compatibility]
+                                for p in self.platforms])  # (platforms, models)
+        # Cost of one task of each capability on each model, in USD: (caps, models)
+        self.unit_cost = (INPUT_TOKENS[:, None] * self.input_price[None, :]
+                          + OUTPUT_TOKENS[:, None] * self.output_price[None, :]) / 1e6
+
+    def _from_document(self, data):
+        models = data["models"]
+        self.names = [m["name"] for m in models]
+        self.input_price = np.array([m["input_price_per_1m"] for m in models])
+        self.output_price = np.array([m["output_price_per_1m"] for m in models])
+        self.context = np.array([m["context_window"] for m in models])
+        self.tier = np.array([m.get("quality_tier", 2) for m in models], dtype=np.int8)
+        self.p95_ms = np.array([(m.get("latency") or {}).get("p95_ms", np.nan) for m in models],
+                               dtype=np.float64)
+        self._compatibility = [m["agent_compatibility"] for m in models]
+
+    def _from_table(self, table):
+        """Prices, context and latency as views of a pool worker's shared catalog."""
+        def column(field):
+            return table.numeric(field) if field in table else np.full(len(table), np.nan)
+        self.names = table.names
+        self.input_price = table.numeric("input_price_per_1m")
+        self.output_price = table.numeric("output_price_per_1m")
+        self.context = table.numeric("context_window")
+        self.tier = np.nan_to_num(column("quality_tier"), nan=2).astype(np.int8)
+        self.p95_ms = column("latency.p95_ms")
+        self._compatibility = table.lists("agent_compatibility")
+
+    def index(self, name):
+        return self.names.index(name)
+
+    def platform_mask(self, platform):
+        """Models usable on *platform*; "OpenClaw + NanoClaw" needs both."""
+        mask = np.ones(len(self.names), dtype=bool)
+        for part in str(platform).split("+"):
+            part = part.strip()
+            if part not in self.platforms:
+                raise ValueError(f"unknown platform {part!r}; known: {', '.join(self.platforms)}")
+            mask &= self.compat[self.platforms.index(part)]
+        return mask
+
+    def sla_mask(self, response_time):
+        """Models whose measured p95 meets the response_time answer."""
+        seconds = sla_seconds(response_time)
+        if seconds is None:
+            return np.ones(len(self.names), dtype=bool)
+        return np.isnan(self.p95_ms) | (self.p95_ms <= seconds * 1000)
+
+
+def capability_index(capability):
+    if isinstance(capability, (int, np.integer)):
+        return int(capability)
+    return _CAP_INDEX[capability]
+
+
+def tier_value(tier):
+    return TIERS[tier] if isinstance(tier, str) else int(tier)
+
+
+def route_batch(selected, tiers, platform_masks, tasks_per_day, table=None, min_context=None):
+    """Solve every lead at once.
+
+    selected        -- (leads, 40) bool: capabilities each lead ticked
+    tiers           -- (leads, 40) int: required quality tier (1-3) per capability
+    platform_masks  -- (leads, models) bool: models allowed on each lead's platform
+    tasks_per_day   -- (leads,) total tasks/day, spread evenly over the selection
+    min_context     -- optional (leads, 40) minimum context window override
+
+    Returns (assignment, monthly_cost): assignment is (leads, 40) model index,
+    -1 where unselected or where no model qualifies; monthly_cost is (leads,)
+    in USD, NaN for leads with an unroutable capability.
+    """
+    table = table or ModelTable()
+    selected = np.asarray(selected, dtype=bool)
+    tiers = np.asarray(tiers)
+    need_ctx = MIN_CONTEXT[None, :] if min_context is None else np.asarray(min_context)
+    feasible = ((table.tier[None, None, :] >= tiers[:, :, None])
+                & (table.context[None, None, :] >= need_ctx[:, :, None])
+                & np.asarray(platform_masks, dtype=bool)[:, None, :])
+    cost = np.where(feasible, table.unit_cost[None, :, :], np.inf)
+    best = cost.argmin(axis=2)
+    unit = np.take_along_axis(cost, best[:, :, None], axis=2)[:, :, 0]
+    routable = np.isfinite(unit)
+    assignment = np.where(selected & routable, best, -1)
+
+    n_selected = np.maximum(selected.sum(axis=1), 1)
+    tasks_per_cap = np.asarray(tasks_per_day, dtype=np.float64) * 30 / n_selected
+    per_cap = np.where(selected, np.where(routable, unit, np.nan), 0.0)
+    monthly = per_cap.sum(axis=1) * tasks_per_cap
+    return assignment, monthly
+
+
+def pinned_cost(selected, model, tasks_per_day, table=None):
+    """Monthly cost of running every selected capability on one model."""
+    table = table or ModelTable()
+    selected = np.asarray(selected, dtype=bool)
+    unit = table.unit_cost[:, table.index(model)]
+    n_selected = np.maximum(selected.sum(axis=1), 1)
+    return (selected * unit[None, :]).sum(axis=1) * np.asarray(tasks_per_day) * 30 / n_selected
+
+
+def encode_leads(leads, table):
+    """Turn lead dicts into the arrays route_batch() takes.
+
+    lead = {"capabilities": [text or index, ...],
+            "tiers": {capability: "basic"|"standard"|"premium"|1-3},   # optional
+            "platform": "OpenClaw", "tasks_per_day": 30,
+            "response_time": "Fast (<10s)"}                                    # optional
+    """
+    n = len(leads)
+    selected = np.zeros((n, len(CAPABILITY_ITEMS)), dtype=bool)
+    tiers = np.tile(DEFAULT_TIER, (n, 1))
+    masks = np.zeros((n, len(table.names)), dtype=bool)
+    tasks = np.zeros(n)
+    mask_cache = {}
+    for row, lead in enumerate(leads):
+        for cap in lead.get("capabilities", ()):
+            selected[row, capability_index(cap)] = True
+        for cap, tier in (lead.get("tiers") or {}).items():
+            tiers[row, capability_index(cap)] = tier_value(tier)
+        platform = lead.get("platform", "OpenClaw")
+        response_time = lead.get("response_time")
+        if (platform, response_time) not in mask_cache:
+            mask_cache[platform, response_time] = (table.platform_mask(platform)
+                                                   & table.sla_mask(response_time))
+        masks[row] = mask_cache[platform, response_time]
+        tasks[row] = lead.get("tasks_per_day", 20)
+    return selected, tiers, masks, tasks
+
+
+def optimize_leads(leads, table=None):
+    """Route a lead list; returns one plan dict per lead."""
+    table = table or ModelTable()
+    selected, tiers, masks, tasks = encode_leads(leads, table)
+    assignment, monthly = route_batch(selected, tiers, masks, tasks, table)
+    plans = []
+    for row, lead in enumerate(leads):
+        routes = {CAPABILITY_ITEMS[c]: (table.names[m] if m >= 0 else None)
+                  for c in np.flatnonzero(selected[row]) for m in [assignment[row, c]]}
+        cost = float(monthly[row])
+        plan = {"routes": routes,
+                "monthly_cost_usd": round(cost, 2) if np.isfinite(cost) else None,
+                "models": sorted({m for m in routes.values() if m}),
+                "unroutable": [c for c, m in routes.items() if m is None]}
+        if lead.get("pinned_model"):
+            baseline = float(pinned_cost(selected[row:row + 1], lead["pinned_model"],
+                                         tasks[row:row + 1], table)[0])
+            plan["pinned_cost_usd"] = round(baseline, 2)
+            if plan["monthly_cost_usd"] is not None:
+                plan["savings_usd"] = round(baseline - plan["monthly_cost_usd"], 2)
+        plans.append(plan)
+    return plans
@@ -0,0 +1,178 @@
+"""
+TF-IDF matcher from free-text answers to mapped needs and skills.
+Builds one sparse (CSR) TF-IDF matrix over the entries of
+needs-mapping-matrix.json and skills-catalog.json, caches it under
+reference_data.CACHE_DIR keyed by the content of those two files, and
+scores each answer against every entry with a single sparse
+matrix-vector product.
+
+Pure numpy; no network models.
+"""
+
+import math
+import os
+import re
+import zipfile
+from collections import Counter
+
+import numpy as np
+
+import reference_data
+from shared_catalog import worker_table
+
+CACHE_VERSION = 1
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset("""
+a an and are as at be but by for from i in into is it its me my of on or our so
+that the their them they this to up us we what when which who will with you your
+""".split())
+
+
+def _stem(token):
+    for suffix in ("ing", "ers", "er", "es", "ed", "s"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text):
+    return [_stem(t) for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def _documents():
+    """[(kind, label, text)] for every need mapping and catalog skill."""
+    needs, skills = worker_table("needs-mapping-matrix"), worker_table("skills-catalog")
+    if needs is not None and skills is not None:
+        needs = list(zip(needs.names, needs.lists("skills")))
+        skills = list(zip(skills.names, skills.text("category"), skills.text("description")))
+    else:
+        needs = [(m["need"], m["skills"])
+                 for m in reference_data.load(reference_data.NEEDS_MAPPING)["mappings"]]
+        skills = [(s["name"], s["category"], s["description"])
+                  for s in reference_data.load(reference_data.SKILLS_CATALOG)["top_skills"]]
+    described = {name: description for name, _, description in skills}
+    docs = []
+    for need, mapped in needs:
+        # A need inherits the catalog descriptions of the skills it maps to.
+        words = [need, need]
+        for skill in mapped:
+            words.append(skill.replace("-", " "))
+            words.append(described.get(skill, ""))
+        docs.append(("need", need, " ".join(words)))
+    for name, category, description in skills:
+        docs.append(("skill", name, f"{name.replace('-', ' ')} {category} {description}"))
+    return docs
+
+
+class NeedMatcher:
+    """TF-IDF matrix over needs + skills; rows are L2-normalized."""
+
+    def __init__(self, kinds, labels, vocab, idf, indptr, indices, data):
+        self.kinds = np.asarray(kinds)
+        self.labels = list(labels)
+        self.vocab = {term: i for i, term in enumerate(vocab)}
+        self.idf = idf
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self._rows = np.repeat(np.arange(len(self.labels)), np.diff(indptr))
+
+    # -- building / caching -----------------------------------------------
+    @classmethod
+    def build(cls):
+        docs = _documents()
+        counts = [Counter(tokenize(text)) for _, _, text in docs]
+        vocab = sorted(set().union(*counts))
+        term_id = {t: i for i, t in enumerate(vocab)}
+        df = np.zeros(len(vocab))
+        for c in counts:
+            df[[term_id[t] for t in c]] += 1
+        idf = np.log((1 + len(docs)) / (1 + df)) + 1
+
+        indptr, indices, data = [0], [], []
+        for c in counts:
+            ids = np.array([term_id[t] for t in c], dtype=np.int32)
+            weights = np.array([1 + math.log(n) for n in c.values()]) * idf[ids]
+            order = np.argsort(ids)
+            indices.append(ids[order])
+            data.append(weights[order] / (np.linalg.norm(weights) or 1.0))
+            indptr.append(indptr[-1] + len(ids))
+        return cls([k for k, _, _ in docs], [label for _, label, _ in docs], vocab, idf,
+                   np.array(indptr, dtype=np.int32),
+                   np.concatenate(indices).astype(np.int32),
+                   np.concatenate(data).astype(np.float32))
+
+    @classmethod
+    def load(cls, rebuild=False):
+        """Load the cached matrix, (re)building it when the reference data changed."""
+        key = reference_data.fingerprint(reference_data.NEEDS_MAPPING,
+                                         reference_data.SKILLS_CATALOG)
+        path = reference_data.cache_path(f"need-matcher-v{CACHE_VERSION}-{key}.npz")
+        if not rebuild:
+            try:
+                with np.load(path, allow_pickle=False) as z:
+                    return cls(z["kinds"], z["labels"].tolist(), z["vocab"].tolist(), z["idf"],
+                               z["indptr"], z["indices"], z["data"])
+            except FileNotFoundError:
+                pass
+            except (EOFError, zipfile.BadZipFile, KeyError, ValueError):
+                pass    # truncated or foreign file: rebuild over it
+        matcher = cls.build()
+        matcher.save(path)
+        return matcher
+
+    def save(self, path):
+        """Write the matrix to *path* atomically, so a concurrent load (pool
+        workers on a cold cache) sees either no file or a complete one."""
+        vocab = sorted(self.vocab, key=self.vocab.get)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            np.savez(fh, kinds=self.kinds, labels=np.array(self.labels), vocab=np.array(vocab),
+                     idf=self.idf, indptr=self.indptr, indices=self.indices, data=self.data)
+        os.replace(tmp, path)
+
+    # -- scoring ----------------------------------------------------------
+    def vectorize(self, text):
+        """Dense, L2-normalized TF-IDF vector of *text* over the vocabulary."""
+        q = np.zeros(len(self.vocab), dtype=np.float32)
+        for term, n in Counter(tokenize(text)).items():
+            i = self.vocab.get(term)
+            if i is not None:
+                q[i] = (1 + math.log(n)) * self.idf[i]
+        norm = np.linalg.norm(q)
+        return q / norm if norm else q
+
+    def score(self, text):
+        """Cosine similarity of *text* with every entry: one sparse mat-vec."""
+        q = self.vectorize(text)
+        return np.bincount(self._rows, weights=self.data * q[self.indices],
+                           minlength=len(self.labels))
+
+    def score_many(self, texts):
+        """(texts, entries) similarity matrix for a batch of answers."""
+        q = np.stack([self.vectorize(t) for t in texts]) if texts else \
+            np.zeros((0, len(self.vocab)), dtype=np.float32)
+        products = q[:, self.indices] * self.data
+        out = np.zeros((len(texts), len(self.labels)))
+        nonempty = np.diff(self.indptr) > 0
+        out[:, nonempty] = np.add.reduceat(products, self.indptr[:-1][nonempty], axis=1)
+        return out
+
+    def match(self, text, top=3, kind="need", min_score=0.05):
+        """Best entries of one kind ("need" or "skill") as [(score, label)]."""
+        return self._top(self.score(text), top, kind, min_score)
+
+    def _top(self, scores, top, kind, min_score):
+        if kind is not None:
+            scores = np.where(self.kinds == kind, scores, -np.inf)
+        order = np.argsort(scores)[::-1][:top]
+        return [(round(float(scores[i]), 4), self.labels[i])
+                for i in order if scores[i] >= min_score]
+
+    def match_response(self, response, top=3, kind="need", min_score=0.05):
+        """{open field id: [(score, label), ...]} for a response record."""
+        fields = {k: v for k, v in (response.get("open_fields") or {}).items() if v}
+        scores = self.score_many(list(fields.values()))
+        return {field: self._top(row, top, kind, min_score)
+                for field, row in zip(fields, scores)}
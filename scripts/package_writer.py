@@ -0,0 +1,171 @@
+"""
+Raw-copy DOCX package writer.
+Keeps the invariant parts of a template package (styles, theme, settings,
+font table, relationships, ...) as pre-compressed bytes and copies them
+straight into each output zip. Only the parts that change between runs
+(word/document.xml and docProps/core.xml by default) are compressed fresh.
+"""
+
+import copy
+import io
+import struct
+import zipfile
+import zlib
+
+# Parts that differ between documents built from the same template.
+FRESH_PARTS = ("word/document.xml", "docProps/core.xml")
+
+# Fixed DOS timestamp (1980-01-01 00:00) so identical input gives identical output.
+_DOS_TIME = 0
+_DOS_DATE = (0 << 9) | (1 << 5) | 1
+
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_CENTRAL_HEADER = struct.Struct("<4s6H3L5H2L")
+_END_RECORD = struct.Struct("<4s4H2LH")
+
+
+class _Entry:
+    """One zip member, with its local header and payload already encoded."""
+
+    __slots__ = ("name", "method", "crc", "compress_size", "file_size", "local")
+
+    def __init__(self, name, method, crc, payload, file_size):
+        self.name = name.encode("ascii")
+        self.method = method
+        self.crc = crc
+        self.compress_size = len(payload)
+        self.file_size = file_size
+        self.local = _LOCAL_HEADER.pack(
+            b"PK\x03\x04", 20, 0, method, _DOS_TIME, _DOS_DATE,
+            crc, self.compress_size, file_size, len(self.name), 0,
+        ) + self.name + payload
+
+    def central(self, offset):
+        return _CENTRAL_HEADER.pack(
+            b"PK\x01\x02", 20, 20, 0, self.method, _DOS_TIME, _DOS_DATE,
+            self.crc, self.compress_size, self.file_size,
+            len(self.name), 0, 0, 0, 0, 0, offset,
+        ) + self.name
+
+
+class PackageWriter:
+    """Write python-docx documents that share a template's invariant parts.
+
+    template       -- a Document already configured the way every output
+                      should look (styles, margins, ...); its body is ignored
+    compresslevel  -- zlib level 0-9 used for every part
+    store          -- write all parts uncompressed (ZIP_STORED), fastest
+    fresh_parts    -- zip member names re-serialized for every document
+    """
+
+    def __init__(self, template, compresslevel=6, store=False, fresh_parts=FRESH_PARTS):
+        if not 0 <= compresslevel <= 9:
+            raise ValueError(f"compresslevel must be 0-9, got {compresslevel}")
+        self.compresslevel = compresslevel
+        self.store = store
+        self.fresh_parts = tuple(fresh_parts)
+        self._rels_key = _rels_key(template)
+
+        buf = io.BytesIO()
+        template.save(buf)
+        self._layout = []   # member names in template order
+        self._cached = {}   # member name -> _Entry with pre-compressed payload
+        with zipfile.ZipFile(buf) as zf:
+            for info in zf.infolist():
+                self._layout.append(info.filename)
+                if info.filename not in self.fresh_parts:
+                    self._cached[info.filename] = self._encode(info.filename, zf.read(info))
+        missing = set(self.fresh_parts) - set(self._layout)
+        if missing:
+            raise ValueError(f"template package has no part(s): {', '.join(sorted(missing))}")
+
+    def override(self, name, data):
+        """Replace an invariant part (e.g. a branded styles.xml) with new bytes."""
+        if name in self.fresh_parts or name not in self._cached:
+            raise KeyError(f"{name} is not an invariant part of this template")
+        self._cached[name] = self._encode(name, data)
+
+    def derive(self, parts):
+        """Copy of this writer with some invariant parts replaced; the other
+        pre-compressed parts are shared, not re-encoded."""
+        clone = copy.copy(self)
+        clone._cached = dict(self._cached)
+        for name, data in parts.items():
+            clone.override(name, data)
+        return clone
+
+    def cached_blob(self, name):
+        """Return the uncompressed bytes of an invariant part."""
+        entry = self._cached[name]
+        payload = entry.local[-entry.compress_size:] if entry.compress_size else b""
+        if entry.method == zipfile.ZIP_STORED:
+            return payload
+        return zlib.decompress(payload, -15)
+
+    def _encode(self, name, data):
+        crc = zlib.crc32(data)
+        if self.store:
+            return _Entry(name, zipfile.ZIP_STORED, crc, data, len(data))
+        comp = zlib.compressobj(self.compresslevel, zlib.DEFLATED, -15)
+        payload = comp.compress(data) + comp.flush()
+        return _Entry(name, zipfile.ZIP_DEFLATED, crc, payload, len(data))
+
+    def to_bytes(self, doc):
+        out = io.BytesIO()
+        self.write(doc, out)
+        return out.getvalue()
+
+    def write(self, doc, target):
+        """Write *doc* to a path or binary file object; returns bytes written."""
+        if _rels_key(doc) != self._rels_key:
+            raise ValueError(
+                "document relationships differ from the template "
+                "(images, hyperlinks or new parts?) -- use doc.save() instead"
+            )
+        return self.write_blobs(_fresh_blobs(doc, self.fresh_parts), target)
+
+    def write_blobs(self, blobs, target):
+        """Write a package from {member name: bytes} for the fresh parts."""
+        missing = set(self.fresh_parts) - set(blobs)
+        if missing:
+            raise ValueError(f"no bytes given for: {', '.join(sorted(missing))}")
+        if hasattr(target, "write"):
+            return self._write_to(blobs, target)
+        with open(target, "wb") as fh:
+            return self._write_to(blobs, fh)
+
+    def _write_to(self, blobs, fh):
+        entries = []
+        for name in self._layout:
+            entry = self._cached.get(name)
+            if entry is None:
+                entry = self._encode(name, blobs[name])
+            entries.append(entry)
+
+        offset = 0
+        offsets = []
+        for entry in entries:
+            offsets.append(offset)
+            fh.write(entry.local)
+            offset += len(entry.local)
+
+        central = b"".join(e.central(o) for e, o in zip(entries, offsets))
+        fh.write(central)
+        fh.write(_END_RECORD.pack(
+            b"PK\x05\x06", 0, 0, len(entries), len(entries), len(central), offset, 0,
+        ))
+        return offset + len(central) + _END_RECORD.size
+
+
+def _fresh_blobs(doc, names):
+    doc.core_properties  # make sure the core-properties part exists
+    parts = {part.partname.membername: part for part in doc.part.package.iter_parts()}
+    return {name: parts[name].blob for name in names}
+
+
+def _rels_key(doc):
+    """Cheap fingerprint of the package structure outside the fresh parts."""
+    rels = doc.part.rels
+    return tuple(sorted(
+        (r.rId, r.reltype, r.target_ref) for r in rels.values()
+    ))
@@ -0,0 +1,518 @@
+"""
+End-to-end intake pipeline: parse -> validate -> recommend -> quote -> proposal.
+Stages run as asyncio workers connected by bounded queues, so a slow stage
+applies back-pressure instead of buffering every document in memory.
+CPU-heavy stages (DOCX parsing, TF-IDF matching, proposal rendering) run in
+a shared process pool; the light ones run on the event loop. A document
+that fails at any stage is recorded and dropped; the rest keep flowing.
+With --summarize, an async stage after validation condenses the open-field
+answers through summarizer.py (cached, so re-runs make no model calls).
+With --dedup, near-duplicates of a response already seen (in this run or in
+the saved dedup.py index) are skipped after validation instead of quoted twice.
+
+Inputs are returned questionnaires (.docx, generated with --content-controls),
+single response records (.json) or record lists (.jsonl, one per line).
+
+Usage:
+    python pipeline.py returned/*.docx responses.jsonl -o proposals/
+    python pipeline.py responses.jsonl -o proposals/ --workers 8 --queue 16 --report run.json
+    python pipeline.py responses.jsonl -o proposals/ --summarize fake
+    python pipeline.py responses.jsonl -o proposals/ --brand northwind
+    python pipeline.py responses.jsonl -o proposals/ --dedup .cache/dedup.npz --dedup-threshold 0.85
+    python pipeline.py responses.jsonl -o proposals/ --as-of 2026-03-01
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import reference_data
+from intake_schema import get_path, validate
+
+# Reference files the stages read (reference_data.ALL_FILES names), for watch.py.
+REFERENCE_FILES = ("client-intake-form", "needs-mapping-matrix", "skills-catalog",
+                   "llm-model-comparison", "service-packages")
+
+
+# ---------------------------------------------------------------------------
+# Stage functions (module-level so they can run in worker processes)
+# ---------------------------------------------------------------------------
+def parse(item):
+    """Turn an input item into a response record."""
+    source = item["source"]
+    if item.get("record") is not None:
+        record = item["record"]
+    elif source.lower().endswith(".docx"):
+        from extract_answers import extract
+        record = extract(source)
+    else:
+        with open(source, encoding="utf-8") as fh:
+            record = json.load(fh)
+    if isinstance(record, dict):
+        record.setdefault("response_id", os.path.splitext(os.path.basename(source))[0])
+    return {**item, "record": record}
+
+
+def check(item):
+    errors, warnings = validate(item["record"])
+    if errors:
+        raise ValueError("; ".join(errors))
+    return {**item, "warnings": warnings}
+
+
+_matcher = None
+
+
+def need_mappings():
+    """{need: mapping} from the shared catalog in a pool worker attached to
+    one, else from needs-mapping-matrix.json."""
+    from shared_catalog import worker_table
+    table = worker_table("needs-mapping-matrix")
+    if table is None:
+        return {m["need"]: m for m in reference_data.load(reference_data.NEEDS_MAPPING)["mappings"]}
+    return {m["need"]: m for m in table.records("need")}
+
+
+def recommend(item, top=3):
+    """Match the free-text answers and ticked capabilities to mapped needs."""
+    global _matcher
+    if _matcher is None:
+        from need_matcher import NeedMatcher
+        _matcher = NeedMatcher.load()
+    record = item["record"]
+    text = " ".join(
+        [v for v in (record.get("open_fields") or {}).values() if isinstance(v, str)]
+        + list(record.get("capabilities") or [])
+        + [u for items in (record.get("use_cases") or {}).values() for u in items]
+    )
+    mappings = need_mappings()
+    # Any overlap at all counts; a need that shares no term scores 0 and is
+    # no recommendation.
+    needs = [{"score": score, **mappings[label]}
+             for score, label in _matcher.match(text, top=top, min_score=0.0) if score > 0]
+    if not needs:
+        raise ValueError("nothing to recommend from: no free text or capabilities")
+    primary = needs[0]
+    return {**item, "recommendation": {
+        "needs": needs,
+        "platform": record.get("platform") or primary["platform"],
+        "llm_model": primary["llm_model"],
+        "skills": sorted({s for n in needs for s in n["skills"]}),
+    }}
+
+
+_tables = {}
+
+
+def model_table(as_of=None):
+    """Model prices now, or as recorded by history_store.py on date *as_of*."""
+    if as_of is None:
+        return None
+    if as_of not in _tables:
+        from history_store import document_as_of
+        from model_router import ModelTable
+        _tables[as_of] = ModelTable(document_as_of("llm-models", as_of))
+    return _tables[as_of]
+
+
+def quote(item, as_of=None):
+    """Price the packages, project the TCO and estimate the monthly AI provider
+    cost (at the model prices in effect on *as_of*, if given)."""
+    from model_router import optimize_leads
+    from quote_engine import lead_from_record, price_book, quote_leads
+    record, rec = item["record"], item["recommendation"]
+    book = price_book()
+    lead = lead_from_record(record, book)
+    q = quote_leads([lead], book=book)[0]
+
+    platform = rec["platform"] if rec["platform"] in ("OpenClaw", "NanoClaw", "PicoClaw") else "OpenClaw"
+    plan = optimize_leads([{"capabilities": record.get("capabilities") or [],
+                            "platform": platform, "tasks_per_day": lead["tasks_per_day"],
+                            "response_time": get_path(record, ("performance_scale", "response_time")),
+                            "pinned_model": rec["llm_model"]}], model_table(as_of))[0]
+    return {**item, "quote": {
+        "currency": q["currency"],
+        "lines": q["lines"],
+        "one_time": q["one_time"],
+        "monthly": sum(l["amount"] for l in q["lines"] if l["period"] == "month"),
+        "tco": q["tco"],
+        "minimum": q["minimum"],
+        "tasks_per_day": lead["tasks_per_day"],
+        "usage_tier": q["usage_tier"],
+        "ai_cost_usd_month": plan["monthly_cost_usd"],
+        "ai_cost_pinned_usd_month": plan.get("pinned_cost_usd"),
+        "model_routes": plan["models"],
+    }}
+
+
+def dedup_stage(index):
+    """Stage skipping responses that *index* (a dedup.DedupIndex) has seen a
+    near-duplicate of; new responses are added to it."""
+    def dedup(item):
+        matches = index.add(item["record"])
+        if matches:
+            rid, similarity = matches[0]
+            raise Skip(f"near-duplicate of {rid} (similarity {similarity:.2f})")
+        return item
+    return dedup
+
+
+def render_proposal(item, out_dir, brand=None):
+    """Write <response_id>-proposal.docx in the house (or *brand*) styles."""
+    import generate_questionnaire as gq
+    record, rec, q = item["record"], item["recommendation"], item["quote"]
+    name = (get_path(record, ("client_profile", "company"))
+            or get_path(record, ("client_profile", "name")) or record["response_id"])
+
+    doc = gq.new_document()
+    gq.heading(doc, f"Proposal for {name}", level=1)
+    gq.body(doc, f"Recommended platform: {rec['platform']}. "
+                 f"Primary model: {rec['llm_model']}.")
+    gq.heading(doc, "Recommended setup", level=2)
+    gq.add_table(doc, ["Need", "Platform", "Model", "Skills", "Match"],
+                 [[n["need"], n["platform"], n["llm_model"], ", ".join(n["skills"]),
+                   f"{n['score']:.2f}"] for n in rec["needs"]],
+                 col_widths=[2.0, 0.9, 1.3, 1.6, 0.7])
+    gq.spacer(doc)
+    if item.get("summaries"):
+        gq.heading(doc, "What you told us", level=2)
+        for field, summary in item["summaries"].items():
+            gq.body_multi(doc, [(field.split("_", 1)[-1].replace("_", " ").capitalize() + ": ",
+                                 True, False, None), (summary, False, False, None)])
+        gq.spacer(doc)
+    gq.heading(doc, "Investment", level=2)
+    gq.add_table(doc, ["Item", "Price"], [[l["item"], l["price"]] for l in q["lines"]],
+                 col_widths=[3.5, 3.0])
+    gq.spacer(doc)
+    if q.get("tco"):
+        from quote_engine import money
+        prefix = "from " if q["minimum"] else ""
+        gq.body(doc, "Total cost of ownership, including the estimated AI provider cost: "
+                     + ", ".join(f"{prefix}{money(v, q['currency'])} over {m} months"
+                                 for m, v in q["tco"].items()) + ".")
+    tier = q["usage_tier"]
+    if q["ai_cost_usd_month"] is None:
+        routing = ("No benchmarked model meets the requested response time for every "
+                   "capability; we will discuss the trade-off with you.")
+    else:
+        routing = (f"Routed across {', '.join(q['model_routes']) or rec['llm_model']}: "
+                   f"about ${q['ai_cost_usd_month']:.2f}/month.")
+    gq.highlight_box(doc, "Estimated AI provider cost",
+                     f"About {q['tasks_per_day']} tasks/day — {tier['usage']}: {tier['cost']}. "
+                     + routing)
+
+    path = os.path.join(out_dir, f"{_safe(record['response_id'])}-proposal.docx")
+    gq.theme_refs([doc.element.body])
+    _proposal_writer(brand).write(doc, path)
+    return {**item, "proposal": path}
+
+
+_writer = None
+
+
+def _proposal_writer(brand):
+    """Per-process PackageWriter with the brand's theme and styles parts."""
+    global _writer
+    import brands
+    import generate_questionnaire as gq
+    from package_writer import PackageWriter
+    if _writer is None:
+        _writer = PackageWriter(gq.new_document())
+    return brands.brand_writer(_writer, brand)
+
+
+def _safe(name):
+    return re.sub(r"[^\w.-]+", "_", str(name))
+
+
+# ---------------------------------------------------------------------------
+# Pipeline engine
+# ---------------------------------------------------------------------------
+class Skip(Exception):
+    """Raised by a stage to drop an item on purpose; reported, not a failure."""
+
+
+class Stage:
+    """One pipeline step: a function, where it runs, and how many workers."""
+
+    def __init__(self, name, func, cpu=False, workers=1):
+        self.name = name
+        self.func = func
+        self.cpu = cpu
+        self.workers = workers
+        self.processed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.busy = 0.0
+        self.max_depth = 0
+        self.first = None
+        self.last = None
+
+    def stats(self, elapsed):
+        active = (self.last - self.first) if self.first is not None else 0.0
+        return {
+            "workers": self.workers,
+            "cpu": self.cpu,
+            "processed": self.processed,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "per_s": round(self.processed / elapsed, 2) if elapsed else None,
+            "busy_s": round(self.busy, 3),
+            "active_s": round(active, 3),
+            "max_queue_depth": self.max_depth,
+        }
+
+
+_DONE = object()
+
+
+class Pipeline:
+    """Bounded-queue asyncio pipeline over a list of stages."""
+
+    def __init__(self, stages, queue_size=32, pool=None, progress=None):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.pool = pool
+        self.progress = progress    # seconds between depth reports on stderr
+        self.results = []
+        self.failures = []
+        self.skips = []
+        self._queues = []
+
+    async def run(self, items):
+        loop = asyncio.get_running_loop()
+        self._queues = [asyncio.Queue(self.queue_size) for _ in self.stages]
+        started = time.perf_counter()
+        monitor = asyncio.create_task(self._monitor())
+        runners = [asyncio.create_task(self._run_stage(i, loop)) for i in range(len(self.stages))]
+
+        for item in items:
+            await self._queues[0].put(item)
+        for _ in range(self.stages[0].workers):
+            await self._queues[0].put(_DONE)
+        await asyncio.gather(*runners)
+        monitor.cancel()
+        return self.report(time.perf_counter() - started)
+
+    async def _run_stage(self, index, loop):
+        stage = self.stages[index]
+        inbox = self._queues[index]
+        outbox = self._queues[index + 1] if index + 1 < len(self.stages) else None
+        await asyncio.gather(*(self._worker(stage, inbox, outbox, loop)
+                               for _ in range(stage.workers)))
+        if outbox is not None:
+            for _ in range(self.stages[index + 1].workers):
+                await outbox.put(_DONE)
+
+    async def _worker(self, stage, inbox, outbox, loop):
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+            t0 = time.perf_counter()
+            stage.first = stage.first if stage.first is not None else t0
+            try:
+                if asyncio.iscoroutinefunction(stage.func):
+                    result = await stage.func(item)
+                elif stage.cpu and self.pool is not None:
+                    result = await loop.run_in_executor(self.pool, stage.func, item)
+                else:
+                    result = stage.func(item)
+            except Skip as exc:
+                stage.skipped += 1
+                self.skips.append({"source": item.get("source"), "stage": stage.name,
+                                   "reason": str(exc)})
+                continue
+            except Exception as exc:  # recorded, the document is dropped
+                stage.failed += 1
+                self.failures.append({"source": item.get("source"), "stage": stage.name,
+                                      "error": f"{type(exc).__name__}: {exc}"})
+                continue
+            finally:
+                stage.last = time.perf_counter()
+                stage.busy += stage.last - t0
+            stage.processed += 1
+            if outbox is None:
+                self.results.append(result)
+            else:
+                await outbox.put(result)
+
+    async def _monitor(self):
+        interval = self.progress or 0.05
+        last_print = time.perf_counter()
+        while True:
+            for stage, q in zip(self.stages, self._queues):
+                stage.max_depth = max(stage.max_depth, q.qsize())
+            if self.progress and time.perf_counter() - last_print >= self.progress:
+                last_print = time.perf_counter()
+                print("  ".join(f"{s.name}:{q.qsize()}q/{s.processed}ok"
+                                for s, q in zip(self.stages, self._queues)), file=sys.stderr)
+            await asyncio.sleep(interval)
+
+    def report(self, elapsed):
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "completed": len(self.results),
+            "failed": len(self.failures),
+            "skipped": len(self.skips),
+            "stages": {s.name: s.stats(elapsed) for s in self.stages},
+            "failures": self.failures,
+            "skips": self.skips,
+        }
+
+
+def summarize_stage(summarizer):
+    """Async stage adding {"summaries": {field: summary}} through *summarizer*."""
+    async def summarize(item):
+        return {**item, "summaries": await summarizer.summarize_response(item["record"])}
+    return summarize
+
+
+def default_stages(out_dir, workers, summarizer=None, brand=None, dedup=None, as_of=None):
+    from functools import partial
+    stages = [
+        Stage("parse", parse, cpu=True, workers=workers),
+        Stage("validate", check),
+        Stage("recommend", recommend, cpu=True, workers=workers),
+        Stage("quote", partial(quote, as_of=as_of)),
+        Stage("proposal", partial(render_proposal, out_dir=out_dir, brand=brand), cpu=True, workers=workers),
+    ]
+    if summarizer is not None:
+        # Several documents in flight so the summarizer's concurrency limit is what binds.
+        stages.insert(2, Stage("summarize", summarize_stage(summarizer),
+                               workers=max(summarizer.concurrency * 2, 2)))
+    if dedup is not None:
+        # One worker, on the event loop: each response is checked against all before it.
+        stages.insert(2, Stage("dedup", dedup_stage(dedup)))
+    return stages
+
+
+def iter_inputs(paths):
+    """Yield pipeline items; .jsonl files give one item per line."""
+    for path in paths:
+        if path.lower().endswith(".jsonl"):
+            with open(path, encoding="utf-8") as fh:
+                for n, line in enumerate(fh, 1):
+                    if line.strip():
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            record = line  # fails validation downstream, with its source
+                        yield {"source": f"{path}:{n}", "record": record}
+        else:
+            yield {"source": path}
+
+
+def run(paths, out_dir, workers=None, queue_size=32, progress=None, summarizer=None,
+        brand=None, dedup=None, as_of=None, shared_catalog=False):
+    """Run the default pipeline over *paths*; returns (results, report).
+
+    shared_catalog -- compile the reference files once into shared memory
+                      for the pool workers (shared_catalog.py); the report
+                      then lists each worker's startup time and RSS
+    """
+    workers = workers or os.cpu_count() or 2
+    os.makedirs(out_dir, exist_ok=True)
+    catalog = stats = None
+    pool_options = {}
+    if shared_catalog:
+        import multiprocessing
+        from shared_catalog import Catalog, worker_init
+        catalog = Catalog.create()
+        stats = multiprocessing.Queue()
+        pool_options = {"initializer": worker_init, "initargs": (catalog.name, stats)}
+    try:
+        with ProcessPoolExecutor(max_workers=workers, **pool_options) as pool:
+            pipeline = Pipeline(default_stages(out_dir, workers, summarizer, brand, dedup, as_of),
+                                queue_size, pool, progress)
+            report = asyncio.run(pipeline.run(iter_inputs(paths)))
+    finally:
+        if catalog is not None:
+            catalog.unlink()
+    if catalog is not None:
+        from shared_catalog import drain
+        report["shared_catalog"] = {"bytes": catalog.nbytes, "workers": drain(stats)}
+    if summarizer is not None:
+        report["summarizer"] = {**summarizer.usage(), "batches": summarizer.batches}
+    return pipeline.results, report
+
+
+# ===================================================================
+#  MAIN
+# ===================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Returned forms -> validated, priced proposals")
+    parser.add_argument("inputs", nargs="+", help=".docx, .json or .jsonl files")
+    parser.add_argument("-o", "--output", default="proposals", help="proposal directory")
+    parser.add_argument("--workers", type=int, default=None, help="process-pool size")
+    parser.add_argument("--queue", type=int, default=32, help="max items between stages")
+    parser.add_argument("--progress", type=float, default=None, metavar="SECONDS",
+                        help="print queue depths to stderr every SECONDS")
+    parser.add_argument("--report", help="also write the run report as JSON here")
+    parser.add_argument("--summarize", choices=("fake", "ollama"),
+                        help="summarize open-field answers with this provider (cached)")
+    parser.add_argument("--summary-model", help="model for --summarize")
+    parser.add_argument("--brand", help="white-label brand for the proposals (default: house)")
+    parser.add_argument("--dedup", metavar="INDEX",
+                        help="skip near-duplicate responses, remembered in this dedup.py index")
+    parser.add_argument("--dedup-threshold", type=float, default=None, metavar="SIMILARITY",
+                        help="estimated Jaccard similarity counted as a duplicate (default: 0.8)")
+    parser.add_argument("--as-of", metavar="YYYY-MM-DD",
+                        help="re-quote at the model prices recorded for this date (history_store.py)")
+    parser.add_argument("--shared-catalog", action="store_true",
+                        help="share the parsed reference files with the workers via shared memory")
+    args = parser.parse_args(argv)
+    if args.brand:
+        from brands import check_brand
+        check_brand(parser, args.brand)
+
+    summarizer = None
+    if args.summarize:
+        from summarizer import PROVIDERS, Summarizer
+        options = {"model": args.summary_model} if args.summary_model else {}
+        summarizer = Summarizer(PROVIDERS[args.summarize](**options))
+    index = None
+    if args.dedup:
+        from dedup import open_index
+        index = open_index(args.dedup, args.dedup_threshold)
+    results, report = run(args.inputs, args.output, args.workers, args.queue, args.progress,
+                          summarizer, args.brand, index, args.as_of, args.shared_catalog)
+    if index is not None:
+        index.save(args.dedup)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as fh:
+            json.dump({**report, "results": [
+                {k: r[k] for k in ("source", "record", "proposal", "warnings",
+                                   "summaries", "recommendation", "quote") if k in r}
+                for r in results]}, fh, indent=2, ensure_ascii=False)
+
+    print(f"{report['completed']} proposal(s) in {args.output}, "
+          f"{report['failed']} failed, {report['skipped']} skipped, {report['elapsed_s']}s")
+    for name, s in report["stages"].items():
+        print(f"  {name:<10} {s['processed']:>6} ok {s['failed']:>4} failed "
+              f"{s['per_s'] or 0:>8.1f}/s  max queue {s['max_queue_depth']}")
+    if summarizer is not None:
+        u = report["summarizer"]
+        print(f"  summarizer: {u['provider_calls']} provider call(s) ({u['failed_calls']} failed), "
+              f"{u['input_tokens']} in / {u['output_tokens']} out tokens, ${u['cost_usd']:.4f}")
+    if args.shared_catalog:
+        from shared_catalog import format_stats
+        shared = report["shared_catalog"]
+        print(f"  shared catalog: {shared['bytes']} bytes, {len(shared['workers'])} worker(s)")
+        for line in format_stats(shared["workers"]):
+            print(line)
+    for f in report["failures"][:20]:
+        print(f"  FAILED {f['source']} at {f['stage']}: {f['error']}")
+    for s in report["skips"][:20]:
+        print(f"  SKIPPED {s['source']} at {s['stage']}: {s['reason']}")
+    return 0 if not report["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
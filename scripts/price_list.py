@@ -0,0 +1,141 @@
+"""
+Package prices from packages/service-packages.json as plain Python rules.
+The catalog's display prices ("€1,000 one-time", "From €5,000 one-time",
+"€300/month") are parsed into an amount, a period and a "From" flag; the
+"after the first 6 months" availability rule into a first billable month;
+and "no separate setup fee" in a package's includes into a setup waiver.
+
+quote_engine.py builds its numpy PriceBook on these rules. The DOCX
+generator reads them from here, so rendering the service sections does
+not import numpy.
+
+Usage:
+    python price_list.py                  # parsed package rules
+    python price_list.py --examples       # the worked examples of Section C
+"""
+
+import argparse
+import json
+import re
+import sys
+
+import reference_data
+
+SETUP_WAIVER = "no separate setup fee"
+
+
+def parse_price(text):
+    """"From €5,000 one-time" -> (5000.0, "one-time", True)."""
+    amount = re.search(r"\d[\d,]*(?:\.\d+)?", text)
+    if amount is None:
+        raise ValueError(f"no amount in price {text!r}")
+    period = "month" if re.search(r"/\s*month|per month|monthly", text, re.I) else "one-time"
+    return float(amount.group().replace(",", "")), period, text.strip().lower().startswith("from")
+
+
+def start_month(package):
+    """First billable month (0-based) from an "After the first N months" rule."""
+    m = re.search(r"after (?:the first )?(\d+) months?", package.get("availability", ""), re.I)
+    return int(m.group(1)) if m else 0
+
+
+def money(amount, currency="EUR"):
+    symbol = {"EUR": "€", "USD": "$", "GBP": "£"}.get(currency, currency + " ")
+    return f"{symbol}{amount:,.0f}"
+
+
+class PriceList:
+    """Per-package pricing rules of one service-packages document."""
+
+    def __init__(self, data):
+        self.currency = data.get("currency", "EUR")
+        self.packages = data["packages"]
+        self.names = [p["name"] for p in self.packages]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        parsed = [parse_price(p["price"]) for p in self.packages]
+        self.amount = [a for a, _, _ in parsed]
+        self.monthly = [period == "month" for _, period, _ in parsed]
+        self.minimum = [m for _, _, m in parsed]
+        self.start_month = [start_month(p) for p in self.packages]
+        self.waives_setup = [any(SETUP_WAIVER in i.lower() for i in p.get("includes", []))
+                             for p in self.packages]
+
+    def line(self, name):
+        i = self.index[name]
+        amount = self.amount[i]
+        return {"item": name, "price": self.packages[i]["price"],
+                "amount": int(amount) if amount.is_integer() else amount,
+                "period": "month" if self.monthly[i] else "one-time",
+                "minimum": self.minimum[i]}
+
+    def price(self, name):
+        """"€1,000", "from €5,000", "€300/month" for *name*."""
+        line = self.line(name)
+        text = money(line["amount"], self.currency)
+        if line["period"] == "month":
+            text += "/month"
+        return f"from {text}" if line["minimum"] else text
+
+    def one_time(self, packages):
+        """One-time fees of *packages*; a package that includes installation
+        waives every one-time setup fee."""
+        chosen = [self.index[name] for name in packages]
+        if any(self.waives_setup[i] for i in chosen):
+            return 0.0
+        return sum(self.amount[i] for i in chosen if not self.monthly[i])
+
+    def recurring(self, packages, month):
+        """Monthly fees of *packages* billed in 0-based *month*."""
+        return sum(self.amount[i] for i in map(self.index.get, packages)
+                   if self.monthly[i] and month >= self.start_month[i])
+
+    def example(self, packages, api_monthly, months=12):
+        """Quote figures for a flat AI provider cost, as in the DOCX examples:
+        {"one_time", "api_monthly", "first_month", "total", "average_monthly"}."""
+        one_time = self.one_time(packages)
+        total = one_time + sum(self.recurring(packages, m) + api_monthly for m in range(months))
+        return {"one_time": one_time, "api_monthly": api_monthly,
+                "first_month": one_time + self.recurring(packages, 0) + api_monthly,
+                "total": total, "average_monthly": total / months}
+
+
+_lists = {}
+
+
+def price_list(path=reference_data.SERVICE_PACKAGES):
+    """The PriceList for *path*, re-parsed only when the file changes."""
+    data = reference_data.load(path)
+    hit = _lists.get(path)
+    if hit is None or hit[0] is not data:
+        hit = _lists[path] = (data, PriceList(data))
+    return hit[1]
+
+
+def section_c_examples(prices=None):
+    """The two worked examples of the questionnaire's cost section."""
+    prices = prices or price_list()
+    return {"private": prices.example(["Private"], 25),
+            "managed": prices.example(["Enterprise", "Managed Service"], 60)}
+
+
+# ===================================================================
+#  MAIN
+# ===================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parsed package pricing rules")
+    parser.add_argument("--examples", action="store_true",
+                        help="print the Section C worked examples instead")
+    args = parser.parse_args(argv)
+    prices = price_list()
+    if args.examples:
+        out = section_c_examples(prices)
+    else:
+        out = [{**prices.line(n), "starts_month": prices.start_month[i],
+                "waives_setup": prices.waives_setup[i]} for i, n in enumerate(prices.names)]
+    print(json.dumps(out, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,298 @@
+"""
+Quotes and total cost of ownership from packages/service-packages.json.
+The per-package rules of price_list.py (display prices, the "after the
+first 6 months" rule on Ongoing Assistance, the Managed Service setup
+waiver) and the cost_estimation tiers are turned once into numeric
+arrays (PriceBook). Leads are then encoded as arrays and
+costed month by month for the whole list at once:
+
+    month m = one-time fees (m == 0) + managed + ongoing (m >= start)
+              + AI provider estimate at the lead's task volume in month m
+
+The AI estimate interpolates linearly through the tiers' (tasks, cost)
+ranges, and task volume ramps over the first 12 months by the lead's
+growth_12m answer. Figures are in the catalog currency; "From" prices are
+minimums and quoted as such.
+
+Usage:
+    python quote_engine.py responses.jsonl                 # per-lead TCO table
+    python quote_engine.py responses.jsonl --months 24 --json quotes.jsonl
+    python quote_engine.py --rules                         # show the parsed rules
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+
+import numpy as np
+
+import reference_data
+from intake_schema import get_path, normalize_option
+from price_list import PriceList, money
+
+HORIZON = 36
+TASKS_PER_DAY_DEFAULT = 20
+RAMP_MONTHS = 12
+# growth_12m form option -> task volume after RAMP_MONTHS, relative to today.
+GROWTH = {
+    "Same": 1.0,
+    "2x": 2.0,
+    "5x": 5.0,
+    "10x+": 10.0,
+}
+# The DOCX checkbox labels of the same options.
+GROWTH_LABELS = {
+    "Stay the same": "Same",
+    "Double our usage": "2x",
+    "5x growth": "5x",
+    "Planning rapid expansion": "10x+",
+}
+_GROWTH = {normalize_option(option): factor for option, factor in GROWTH.items()}
+_GROWTH.update({normalize_option(label): GROWTH[option] for label, option in GROWTH_LABELS.items()})
+
+
+def growth_factor(answer):
+    """Task volume multiplier for a growth_12m answer; 1.0 when unanswered."""
+    if not answer:
+        return 1.0
+    factor = _GROWTH.get(normalize_option(answer))
+    if factor is None:
+        raise ValueError(f"unknown growth_12m answer {answer!r}; expected one of {', '.join(GROWTH)}")
+    return factor
+
+
+def _range(text):
+    """"Moderate (20–50 tasks/day)" -> (20, 50); "100+" -> (100, None)."""
+    numbers = [float(n) for n in re.findall(r"\d+(?:\.\d+)?", text)]
+    if "+" in text:
+        return numbers[0], None
+    return numbers[0], numbers[-1]
+
+
+class PriceBook:
+    """service-packages.json as numeric pricing rules."""
+
+    def __init__(self, data):
+        self._rules = rules = PriceList(data)
+        self.currency = rules.currency
+        self.packages = rules.packages
+        self.names = rules.names
+        self.index = rules.index
+        self.amount = np.array(rules.amount)
+        self.monthly = np.array(rules.monthly)
+        self.minimum = np.array(rules.minimum)
+        self.start_month = np.array(rules.start_month)
+        self.waives_setup = np.array(rules.waives_setup)
+
+        self.tiers = data["cost_estimation"]["tiers"]
+        usage = [_range(t["usage"]) for t in self.tiers]
+        cost = [_range(t["cost"]) for t in self.tiers]
+        self.tier_upper = np.array([hi if hi is not None else np.inf for _, hi in usage])
+        knots = []
+        for (t_lo, t_hi), (c_lo, c_hi) in zip(usage, cost):
+            if t_hi is None:
+                # Open-ended tier: extend at its lower cost per task up to its top cost.
+                t_hi = t_lo * (c_hi / c_lo)
+            knots += [(t_lo, c_lo), (t_hi, c_hi)]
+        self.api_tasks, self.api_cost = (np.array(v) for v in zip(*knots))
+
+    def api_monthly(self, tasks):
+        """Estimated AI provider cost per month at *tasks* per day (array-friendly)."""
+        return np.interp(tasks, self.api_tasks, self.api_cost)
+
+    def tier(self, tasks):
+        """Index into self.tiers for each task volume (array-friendly)."""
+        return np.minimum(np.searchsorted(self.tier_upper, tasks), len(self.tiers) - 1)
+
+    def line(self, name):
+        return self._rules.line(name)
+
+    def rules(self):
+        return {
+            "currency": self.currency,
+            "packages": [{**self.line(n), "starts_month": int(self.start_month[i]),
+                          "waives_setup": bool(self.waives_setup[i])}
+                         for i, n in enumerate(self.names)],
+            "api_curve": [[float(t), float(c)] for t, c in zip(self.api_tasks, self.api_cost)],
+        }
+
+
+_books = {}
+
+
+def price_book(path=reference_data.SERVICE_PACKAGES):
+    """The PriceBook for *path*, re-parsed only when the file changes."""
+    data = reference_data.load(path)
+    book = _books.get(path)
+    if book is None or book[0] is not data:
+        book = (data, PriceBook(data))
+        _books[path] = book
+    return book[1]
+
+
+# ---------------------------------------------------------------------------
+# Leads
+# ---------------------------------------------------------------------------
+def _list(value):
+    """A form answer as a list of options: a single-choice answer is a string."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return [v for v in value if v]
+
+
+def chosen_packages(record, names):
+    """Package names ticked in Section D, else Private/Enterprise by profile."""
+    ticked = [t for t in _list(get_path(record, ("proposal", "package"))) if isinstance(t, str)]
+    chosen = [name for name in names for t in ticked if t.startswith(name)]
+    if chosen:
+        return list(dict.fromkeys(chosen))
+    personal = (get_path(record, ("client_profile", "company_size")) in (None, "Solo")
+                or get_path(record, ("client_profile", "industry")) == "Personal Use")
+    return ["Private" if personal else "Enterprise"]
+
+
+def tasks_per_day(answer):
+    """Midpoint of a "100–500"-style answer; the bound of "<10" / "1000+"."""
+    numbers = [int(n) for n in re.findall(r"\d+", answer or "")]
+    if not numbers:
+        return TASKS_PER_DAY_DEFAULT
+    return sum(numbers[:2]) // len(numbers[:2])
+
+
+def lead_from_record(record, book):
+    """Quote inputs for a response record."""
+    packages = chosen_packages(record, book.names)
+    if ("Yes" in _list(get_path(record, ("proposal", "ongoing_assistance")))
+            and "Ongoing Assistance" in book.index):
+        packages.append("Ongoing Assistance")
+    return {
+        "id": record.get("response_id"),
+        "packages": packages,
+        "tasks_per_day": tasks_per_day(get_path(record, ("performance_scale", "daily_requests"))),
+        "growth": growth_factor(get_path(record, ("performance_scale", "growth_12m"))),
+    }
+
+
+def encode(leads, book):
+    """Leads -> (package matrix [L, P], tasks [L], growth [L], api override [L] or NaN)."""
+    chosen = np.zeros((len(leads), len(book.names)), dtype=bool)
+    rows = [row for row, lead in enumerate(leads) for _ in lead["packages"]]
+    cols = [book.index[name] for lead in leads for name in lead["packages"]]
+    chosen[rows, cols] = True
+    tasks = np.array([lead.get("tasks_per_day", TASKS_PER_DAY_DEFAULT) for lead in leads], float)
+    growth = np.array([lead.get("growth", 1.0) for lead in leads], float)
+    api = np.array([np.nan if lead.get("api_monthly") is None else lead["api_monthly"]
+                    for lead in leads], float)
+    return chosen, tasks, growth, api
+
+
+def monthly_costs(leads, months=HORIZON, book=None):
+    """Cost per lead per month, [L, months], plus its parts as a dict of arrays."""
+    book = book or price_book()
+    chosen, tasks, growth, api_override = encode(leads, book)
+    month = np.arange(months)
+
+    one_time_pkg = chosen & ~book.monthly
+    # A package that includes installation waives every one-time setup fee.
+    one_time_pkg &= ~(chosen & book.waives_setup).any(axis=1, keepdims=True)
+    one_time = one_time_pkg.astype(float) @ book.amount
+
+    recurring = (chosen & book.monthly) * book.amount              # [L, P]
+    active = month[:, None] >= book.start_month[None, :]           # [M, P]
+    service = recurring @ active.T.astype(float)                   # [L, M]
+
+    ramp = np.minimum(month, RAMP_MONTHS) / RAMP_MONTHS
+    volume = tasks[:, None] * (1 + (growth[:, None] - 1) * ramp[None, :])
+    api = book.api_monthly(volume)
+    fixed = ~np.isnan(api_override)
+    api[fixed] = api_override[fixed, None]
+
+    total = service + api
+    total[:, 0] += one_time
+    return total, {"one_time": one_time, "service": service, "api": api, "volume": volume}
+
+
+def quote_leads(leads, months=HORIZON, book=None):
+    """Per-lead quote dicts: lines, TCO at 12/24/36 months (within *months*), averages."""
+    book = book or price_book()
+    total, parts = monthly_costs(leads, months, book)
+    cumulative = np.cumsum(total, axis=1)
+    tier = book.tier(parts["volume"][:, 0])
+    marks = [m for m in (12, 24, 36) if m <= months] or [months]
+    lines = {name: book.line(name) for name in book.names}
+    # Plain Python lists, so the per-lead dicts hold floats rather than numpy scalars.
+    col = lambda a: np.round(a, 2).tolist()
+    one_time, first, api_first, api_last = (col(parts["one_time"]), col(total[:, 0]),
+                                            col(parts["api"][:, 0]), col(parts["api"][:, -1]))
+    average = col(cumulative[:, -1] / months)
+    tco = list(zip(*(col(cumulative[:, m - 1]) for m in marks)))
+    quotes = []
+    for i, lead in enumerate(leads):
+        quotes.append({
+            "id": lead.get("id"),
+            "currency": book.currency,
+            "lines": [lines[name] for name in lead["packages"]],
+            "minimum": any(lines[name]["minimum"] for name in lead["packages"]),
+            "one_time": one_time[i],
+            "first_month": first[i],
+            "api_month_1": api_first[i],
+            "api_month_last": api_last[i],
+            "usage_tier": book.tiers[tier[i]],
+            "tco": dict(zip(map(str, marks), tco[i])),
+            "average_monthly": average[i],
+            "months": months,
+        })
+    return quotes
+
+
+# ===================================================================
+#  MAIN
+# ===================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch package quotes and TCO")
+    parser.add_argument("inputs", nargs="*", help="response records (.jsonl)")
+    parser.add_argument("--months", type=int, default=HORIZON, help="TCO horizon (default 36)")
+    parser.add_argument("--json", help="write one quote per line here")
+    parser.add_argument("--rules", action="store_true", help="print the parsed pricing rules")
+    parser.add_argument("--limit", type=int, default=20, help="table rows to print")
+    args = parser.parse_args(argv)
+
+    book = price_book()
+    if args.rules:
+        print(json.dumps(book.rules(), indent=2, ensure_ascii=False))
+        if not args.inputs:
+            return 0
+    if not args.inputs:
+        parser.error("give response .jsonl files or --rules")
+
+    leads = []
+    for path in args.inputs:
+        with open(path, encoding="utf-8") as fh:
+            leads += [lead_from_record(json.loads(line), book) for line in fh if line.strip()]
+    start = time.perf_counter()
+    quotes = quote_leads(leads, args.months, book)
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            for q in quotes:
+                fh.write(json.dumps(q, ensure_ascii=False) + "\n")
+    marks = list(quotes[0]["tco"]) if quotes else []
+    print(f"{'Lead':<14}{'Packages':<38}{'Setup':>9}" + "".join(f"{'TCO ' + m + 'm':>11}" for m in marks))
+    for q in quotes[:args.limit]:
+        names = " + ".join(line["item"] for line in q["lines"])
+        setup = money(q["one_time"], q["currency"]) + ("+" if q["minimum"] else "")
+        print(f"{str(q['id'])[:13]:<14}{names[:37]:<38}{setup:>9}"
+              + "".join(f"{money(q['tco'][m], q['currency']):>11}" for m in marks))
+    print(f"{len(quotes)} lead(s) quoted over {args.months} months in {elapsed * 1000:.1f} ms",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+"""
+PII redaction for responses headed into shared analytics.
+Responses whose A6/B5 data sensitivity is "High" or "Critical" (or all of
+them, with --all) have their free text scrubbed of emails, phone numbers,
+IBANs, the client's own name and company, and any custom terms, and the
+client's name, company and signature replaced by placeholders. Free text
+is every string that is not a fixed label of the form (an option,
+use case, checklist or rating item): text fields, "Other: ..." and other
+write-ins alike.
+
+The fixed patterns and the custom terms are one regex, compiled once per
+worker, with the terms factored into a prefix trie so the engine walks
+each text once and the term alternation costs a prefix walk rather than
+one try per term. The client's own names are substring-tested against the
+already scrubbed text and only matched with a (cached) trie regex when one
+occurs. Responses stream through a process pool in chunks, in order.
+
+Usage:
+    python redact.py responses.jsonl -o shared.jsonl
+    python redact.py responses.jsonl -o shared.jsonl --terms names.txt --workers 8
+    python redact.py responses.jsonl -o shared.jsonl --all --report redactions.json
+"""
+
+import argparse
+import functools
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from intake_schema import (
+    CAPABILITY_ITEMS, INTEGRATION_ITEMS, RATING_ITEMS, get_path, load_form, normalize_option,
+    option_fields,
+)
+
+SENSITIVE = {"High", "Critical"}
+IDENTITY_FIELDS = {
+    ("client_profile", "name"): "NAME",
+    ("client_profile", "company"): "ORG",
+    ("proposal", "signature"): "NAME",
+}
+PLACEHOLDER = "[{}]"
+CHUNK = 2000            # responses per worker task
+MIN_TERM = 3            # shorter name parts ("Al", "Jo") are not matched on their own
+
+PATTERNS = {
+    "EMAIL": r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+",
+    "IBAN": r"\b[A-Z]{2}\d{2}(?: ?[A-Z0-9]{4}){2,7}(?: ?[A-Z0-9]{1,3})?\b",
+    # +39 333 1234567, (555) 123-4567, 0044 20 7946 0958: 8+ digits with separators.
+    "PHONE": r"(?<![\w+])(?:\+|00)?\(?\d{1,4}\)?(?:[ .\-/]?\(?\d{2,4}\)?){2,5}(?!\w)",
+}
+
+
+def _iban_ok(text):
+    """ISO 13616 mod-97 check, so order numbers shaped like IBANs survive."""
+    s = text.replace(" ", "")
+    digits = "".join(str(int(c, 36)) for c in s[4:] + s[:4])
+    return 15 <= len(s) <= 34 and int(digits) % 97 == 1
+
+
+_DATE = re.compile(r"\d{1,4}[-./]\d{1,2}[-./]\d{1,4}")
+
+
+def _phone_ok(text):
+    return 8 <= sum(c.isdigit() for c in text) <= 15 and not _DATE.fullmatch(text)
+
+
+VALIDATORS = {"IBAN": _iban_ok, "PHONE": _phone_ok}
+
+
+def trie_pattern(terms):
+    """Regex source matching any of *terms*, factored into a prefix trie
+    (["ann", "anna", "anton"] -> "an(?:n(?:a)?|ton)")."""
+    trie = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        end = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if end:
+            return f"(?:{body})?"
+        return body
+
+    return build(trie)
+
+
+_labels = None
+
+
+def form_labels():
+    """(labels as written, normalized labels): the fixed text of the form.
+    Answers equal to one of these are the client ticking a box, not
+    writing anything, and are left alone."""
+    global _labels
+    if _labels is None:
+        labels = [o for _, options in option_fields() for o in options]
+        labels += [item for fields in load_form()["sections"].values()
+                   for items in fields.values() if isinstance(items, list) for item in items]
+        labels += CAPABILITY_ITEMS + INTEGRATION_ITEMS + RATING_ITEMS
+        _labels = (frozenset(labels), frozenset(normalize_option(label) for label in labels))
+    return _labels
+
+
+def profile_terms(record):
+    """Name, company and signature of the client, whole and by word."""
+    terms = set()
+    for path in IDENTITY_FIELDS:
+        value = get_path(record, path)
+        if isinstance(value, str) and value.strip():
+            terms.add(value.strip().lower())
+            terms.update(w for w in re.findall(r"\w+", value.lower())
+                         if len(w) >= MIN_TERM and not w.isdigit())
+    return terms
+
+
+class Redactor:
+    """Compiles the patterns and custom terms into one regex and applies it."""
+
+    def __init__(self, terms=(), redact_all=False):
+        self.terms = {t.strip().lower() for t in terms if len(t.strip()) >= MIN_TERM}
+        self.redact_all = redact_all
+        groups = [f"(?P<{kind}>{source})" for kind, source in PATTERNS.items()]
+        if self.terms:
+            groups.append(_term_group(self.terms))
+        self.regex = re.compile("|".join(groups))
+
+    def needs_redaction(self, record):
+        return self.redact_all or get_path(record, ("data_privacy", "sensitivity")) in SENSITIVE
+
+    def scrub(self, text, counts, names=()):
+        """*text* with every match replaced by its placeholder. *names* (the
+        client's own, lowercased) are substring-tested first and only
+        compiled into a regex when one actually occurs."""
+        text = _sub(self.regex, text, counts)
+        if names:
+            low = text.lower()
+            hits = tuple(sorted(n for n in names if n in low))
+            if hits:
+                text = _sub(_names_regex(hits), text, counts)
+        return text
+
+    def redact(self, record, counts):
+        """Scrubbed copy of *record*; other records are returned as-is."""
+        if not self.needs_redaction(record):
+            return record
+        names = profile_terms(record)
+        out = dict(record)
+        for (section, field), kind in IDENTITY_FIELDS.items():
+            node = out.get(section)
+            if isinstance(node, dict) and node.get(field):
+                out[section] = node = dict(node)
+                node[field] = PLACEHOLDER.format(kind)
+                counts[kind] += 1
+        raw, labels = form_labels()
+        scrub = lambda s: self.scrub(s, counts, names)   # noqa: E731
+        for key, value in out.items():
+            if key != "response_id":
+                out[key] = _scrub_strings(value, scrub, raw, labels)
+        counts["records"] += 1
+        return out
+
+    def redact_many(self, records):
+        """(scrubbed records, counts) for a batch."""
+        counts = Counter()
+        return [self.redact(r, counts) for r in records], counts
+
+
+def _term_group(terms):
+    return rf"(?P<TERM>(?i:\b{trie_pattern(terms)}\b))"
+
+
+@functools.lru_cache(maxsize=4096)
+def _names_regex(names):
+    return re.compile(_term_group(names))
+
+
+def _sub(regex, text, counts):
+    def replace(m):
+        kind = m.lastgroup
+        if kind in VALIDATORS and not VALIDATORS[kind](m.group()):
+            return m.group()
+        counts[kind] += 1
+        return PLACEHOLDER.format(kind)
+    return regex.sub(replace, text)
+
+
+def _scrub_strings(value, scrub, raw, labels):
+    """Copy of *value* with *scrub* applied to every string in it that is
+    not one of the form's fixed labels (*raw* as written, *labels*
+    normalized). Dict keys (field ids, rating items) are form text and are
+    kept."""
+    if isinstance(value, str):
+        if value in raw or normalize_option(value) in labels:
+            return value
+        return scrub(value)
+    if isinstance(value, dict):
+        return {k: _scrub_strings(v, scrub, raw, labels) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_scrub_strings(v, scrub, raw, labels) for v in value]
+    return value
+
+
+# ---------------------------------------------------------------------------
+# Streaming
+# ---------------------------------------------------------------------------
+_worker_redactor = None
+
+
+def _init_worker(terms, redact_all):
+    global _worker_redactor
+    _worker_redactor = Redactor(terms, redact_all)
+
+
+def _redact_lines(lines):
+    """Worker task: JSONL lines in, JSONL text and counts out."""
+    redactor = _worker_redactor
+    out = list(lines)
+    # A line without a sensitive value anywhere in it cannot need redaction: skip parsing it.
+    todo = [i for i, line in enumerate(lines)
+            if redactor.redact_all or any(f'"{s}"' in line for s in SENSITIVE)]
+    records = [json.loads(lines[i]) for i in todo]
+    redacted, counts = redactor.redact_many(records)
+    for i, old, new in zip(todo, records, redacted):
+        if new is not old:
+            out[i] = json.dumps(new, ensure_ascii=False) + "\n"
+    return "".join(out), counts
+
+
+def _chunks(fh, size):
+    while True:
+        lines = list(islice(fh, size))
+        if not lines:
+            return
+        lines = [line if line.endswith("\n") else line + "\n" for line in lines if line.strip()]
+        if lines:
+            yield lines
+
+
+def redact_stream(src, dst, terms=(), redact_all=False, workers=None, chunk=CHUNK):
+    """Redact JSONL *src* into *dst* (open text files); returns counts.
+    Chunks are processed in parallel and written back in input order."""
+    totals = Counter()
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(list(terms), redact_all)
+        for text, counts in map(_redact_lines, _chunks(src, chunk)):
+            dst.write(text)
+            totals.update(counts)
+        return totals
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(list(terms), redact_all)) as pool:
+        # map() submits every chunk up front; keep at most 2 per worker in flight.
+        pending = []
+        for lines in _chunks(src, chunk):
+            pending.append(pool.submit(_redact_lines, lines))
+            if len(pending) >= workers * 2:
+                text, counts = pending.pop(0).result()
+                dst.write(text)
+                totals.update(counts)
+        for future in pending:
+            text, counts = future.result()
+            dst.write(text)
+            totals.update(counts)
+    return totals
+
+
+def load_terms(path):
+    with open(path, encoding="utf-8") as fh:
+        return [line.strip() for line in fh if line.strip() and not line.startswith("#")]
+
+
+# ===================================================================
+#  MAIN
+# ===================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrub PII from sensitive responses")
+    parser.add_argument("input", help="responses .jsonl ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="redacted .jsonl ('-' for stdout)")
+    parser.add_argument("--terms", action="append", default=[],
+                        help="file of extra terms to redact, one per line (repeatable)")
+    parser.add_argument("--all", action="store_true",
+                        help="redact every response, not only High/Critical sensitivity")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk", type=int, default=CHUNK, help="responses per worker task")
+    parser.add_argument("--report", help="write redaction counts as JSON here")
+    args = parser.parse_args(argv)
+
+    terms = [t for path in args.terms for t in load_terms(path)]
+    src = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    start = time.perf_counter()
+    try:
+        counts = redact_stream(src, dst, terms, args.all, args.workers, args.chunk)
+    finally:
+        for fh in (src, dst):
+            if fh not in (sys.stdin, sys.stdout):
+                fh.close()
+    elapsed = time.perf_counter() - start
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as fh:
+            json.dump({**counts, "elapsed_s": round(elapsed, 3)}, fh, indent=2)
+    found = ", ".join(f"{n} {kind.lower()}" for kind, n in sorted(counts.items()) if kind != "records")
+    print(f"Redacted {counts['records']} response(s) in {elapsed:.2f}s"
+          + (f": {found}" if found else ""), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Paths to the repository's JSON reference data, plus a cached loader.
+"""
+
+import hashlib
+import json
+import os
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+INTAKE_FORM = os.path.join(REPO_ROOT, "questionnaire", "client-intake-form.json")
+NEEDS_MAPPING = os.path.join(REPO_ROOT, "questionnaire", "needs-mapping-matrix.json")
+PLATFORMS = os.path.join(REPO_ROOT, "benchmarks", "platform-comparison.json")
+LLM_MODELS = os.path.join(REPO_ROOT, "benchmarks", "llm-model-comparison.json")
+SKILLS_CATALOG = os.path.join(REPO_ROOT, "benchmarks", "skills-catalog.json")
+SERVICE_PACKAGES = os.path.join(REPO_ROOT, "packages", "service-packages.json")
+BRANDS_DIR = os.path.join(REPO_ROOT, "brands")   # white-label profiles, one .json each
+HISTORY_DIR = os.path.join(REPO_ROOT, "benchmarks", "history")   # history_store.py snapshots
+
+# Derived artifacts (compiled indexes, caches) live here; safe to delete.
+CACHE_DIR = os.environ.get("CLAW_CACHE_DIR", os.path.join(REPO_ROOT, ".cache"))
+
+ALL_FILES = {
+    "client-intake-form": INTAKE_FORM,
+    "needs-mapping-matrix": NEEDS_MAPPING,
+    "platform-comparison": PLATFORMS,
+    "llm-model-comparison": LLM_MODELS,
+    "skills-catalog": SKILLS_CATALOG,
+    "service-packages": SERVICE_PACKAGES,
+}
+
+_cache = {}
+_providers = {}   # path -> (mtime_ns, callable returning the parsed document)
+
+
+def cache_path(name):
+    """Path for a derived artifact inside CACHE_DIR (created on demand)."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return os.path.join(CACHE_DIR, name)
+
+
+def fingerprint(*paths):
+    """Short content hash of reference files, for keying derived caches."""
+    digest = hashlib.sha256()
+    for path in paths:
+        path = ALL_FILES.get(path, path)
+        with open(path, "rb") as fh:
+            digest.update(fh.read())
+    return digest.hexdigest()[:16]
+
+
+def provide(path, mtime, loader):
+    """Serve *path* from loader() instead of parsing the file, for as long as
+    the file's mtime is still *mtime* (see shared_catalog.py)."""
+    path = ALL_FILES.get(path, path)
+    _providers[path] = (mtime, loader)
+    _cache.pop(path, None)
+
+
+def load(path):
+    """Parse a reference JSON file once; re-read it if it changed on disk."""
+    path = ALL_FILES.get(path, path)
+    mtime = os.stat(path).st_mtime_ns
+    hit = _cache.get(path)
+    if hit is None or hit[0] != mtime:
+        provider = _providers.get(path)
+        if provider is not None and provider[0] == mtime:
+            hit = (mtime, provider[1]())
+        else:
+            with open(path, encoding="utf-8") as fh:
+                hit = (mtime, json.load(fh))
+        _cache[path] = hit
+    return hit[1]
@@ -0,0 +1,216 @@
+"""
+Bit-packed analytics over collected questionnaire responses.
+Each response's ticked capabilities (the 40 A4/B3 items) and integrations
+(the A5 items) are held as packed bit vectors, its ratings as a uint8 row.
+Co-occurrence matrices and segment counts are computed with bitwise AND +
+popcount over per-item bitsets that span the whole corpus.
+
+Requires numpy.
+"""
+
+import numpy as np
+
+from intake_schema import (
+    CAPABILITY_ITEMS, INTEGRATION_ITEMS, RATING_ITEMS, SEGMENT_FIELDS,
+    field_options, get_path, option_index,
+)
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(words):
+        return np.bitwise_count(words)
+else:
+    _POP8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(words):
+        return _POP8[words.view(np.uint8)]
+
+# Segments the store codes on; code 0 means "unanswered / not in the form".
+SEGMENTS = ("industry", "company_size")
+
+_KINDS = {
+    "capabilities": CAPABILITY_ITEMS,
+    "integrations": INTEGRATION_ITEMS,
+}
+_KIND_INDEX = {kind: {text: i for i, text in enumerate(items)} for kind, items in _KINDS.items()}
+_RATING_INDEX = {text: i for i, text in enumerate(RATING_ITEMS)}
+
+
+class ResponseAnalytics:
+    """Append-only columnar store of responses, queried with bit operations."""
+
+    def __init__(self, capacity=1024):
+        self._n = 0
+        self._bits = {
+            kind: np.zeros((capacity, (len(items) + 7) // 8), dtype=np.uint8)
+            for kind, items in _KINDS.items()
+        }
+        self._ratings = np.zeros((capacity, len(RATING_ITEMS)), dtype=np.uint8)
+        self._segments = {name: np.zeros(capacity, dtype=np.uint8) for name in SEGMENTS}
+        self._labels = {
+            name: ["(unknown)"] + list(field_options(SEGMENT_FIELDS[name]))
+            for name in SEGMENTS
+        }
+        self._codes = {name: {} for name in SEGMENTS}  # raw answer -> code memo
+        self._columns = {}  # cached per-item bitsets, dropped on every append
+
+    def __len__(self):
+        return self._n
+
+    # -- loading ----------------------------------------------------------
+    def _grow(self, need):
+        cap = self._ratings.shape[0]
+        if need <= cap:
+            return
+        new_cap = max(need, cap * 2)
+        for kind, arr in self._bits.items():
+            self._bits[kind] = np.resize(arr, (new_cap, arr.shape[1]))
+        self._ratings = np.resize(self._ratings, (new_cap, self._ratings.shape[1]))
+        for name, arr in self._segments.items():
+            self._segments[name] = np.resize(arr, new_cap)
+
+    def add(self, response):
+        self.add_many([response])
+
+    def add_many(self, responses):
+        responses = list(responses)
+        start, count = self._n, len(responses)
+        self._grow(start + count)
+        ticked = {kind: np.zeros((count, len(items)), dtype=bool) for kind, items in _KINDS.items()}
+        ratings = np.zeros((count, len(RATING_ITEMS)), dtype=np.uint8)
+        for row, response in enumerate(responses):
+            for kind, index in _KIND_INDEX.items():
+                cols = [index[t] for t in response.get(kind) or () if t in index]
+                ticked[kind][row, cols] = True
+            for text, value in (response.get("ratings") or {}).items():
+                i = _RATING_INDEX.get(text)
+                if i is not None and value:
+                    ratings[row, i] = min(int(value), 5)
+            for name in SEGMENTS:
+                self._segments[name][start + row] = self._code(
+                    name, get_path(response, SEGMENT_FIELDS[name]))
+        for kind, rows in ticked.items():
+            self._bits[kind][start:start + count] = np.packbits(rows, axis=1)
+        self._ratings[start:start + count] = ratings
+        self._n += count
+        self._columns.clear()
+
+    def _code(self, name, value):
+        memo = self._codes[name]
+        code = memo.get(value)
+        if code is None:
+            code = memo[value] = option_index(self._labels[name][1:], value) + 1
+        return code
+
+    # -- bitsets ----------------------------------------------------------
+    def _item_bitsets(self, kind):
+        """(items, words) uint64 bitsets: bit r of row i = response r ticked item i."""
+        cols = self._columns.get(kind)
+        if cols is None:
+            n_items = len(_KINDS[kind])
+            rows = np.unpackbits(self._bits[kind][:self._n], axis=1, count=n_items)
+            cols = self._pack_mask(rows.T.astype(bool))
+            self._columns[kind] = cols
+        return cols
+
+    def _pack_mask(self, mask):
+        """Pack a (..., n) bool array along its last axis into uint64 words."""
+        packed = np.packbits(mask, axis=-1)
+        pad = (-packed.shape[-1]) % 8
+        if pad:
+            packed = np.concatenate(
+                [packed, np.zeros(packed.shape[:-1] + (pad,), dtype=np.uint8)], axis=-1)
+        return np.ascontiguousarray(packed).view(np.uint64)
+
+    def segment_mask(self, **filters):
+        """Bitset of the responses matching every segment filter (by label)."""
+        mask = np.ones(self._n, dtype=bool)
+        for name, value in filters.items():
+            if value is None:
+                continue
+            if name not in self._segments:
+                raise KeyError(f"cannot segment on {name!r}; use one of {', '.join(SEGMENTS)}")
+            code = option_index(self._labels[name], value)
+            if code < 0:
+                raise ValueError(f"{value!r} is not a known {name}")
+            mask &= self._segments[name][:self._n] == code
+        return self._pack_mask(mask)
+
+    # -- queries ----------------------------------------------------------
+    def cooccurrence(self, kind="capabilities", **filters):
+        """(items, items) matrix: how many responses ticked both i and j.
+        The diagonal holds the per-item counts."""
+        cols = self._item_bitsets(kind)
+        if filters:
+            cols = cols & self.segment_mask(**filters)
+        n = cols.shape[0]
+        out = np.empty((n, n), dtype=np.int64)
+        for i in range(n):
+            out[i] = _popcount(cols & cols[i]).sum(axis=1, dtype=np.int64)
+        return out
+
+    def counts(self, kind="capabilities", **filters):
+        cols = self._item_bitsets(kind)
+        if filters:
+            cols = cols & self.segment_mask(**filters)
+        return _popcount(cols).sum(axis=1, dtype=np.int64)
+
+    def counts_by(self, segment, kind="capabilities"):
+        """(segment labels, items x segments) count matrix for one segment field."""
+        cols = self._item_bitsets(kind)
+        codes = self._segments[segment][:self._n]
+        labels = self._labels[segment]
+        masks = self._pack_mask(codes[None, :] == np.arange(len(labels))[:, None])
+        table = np.stack([
+            _popcount(cols & m).sum(axis=1, dtype=np.int64) for m in masks
+        ], axis=1)
+        return labels, table
+
+    def segment_sizes(self, segment):
+        codes = self._segments[segment][:self._n]
+        labels = self._labels[segment]
+        return dict(zip(labels, np.bincount(codes, minlength=len(labels)).tolist()))
+
+    def top_pairs(self, kind="capabilities", limit=10, **filters):
+        """Most frequent item pairs as [(count, item_a, item_b), ...]."""
+        matrix = self.cooccurrence(kind, **filters)
+        items = _KINDS[kind]
+        iu, ju = np.triu_indices(len(items), k=1)
+        pair_counts = matrix[iu, ju]
+        order = np.argsort(pair_counts)[::-1][:limit]
+        return [(int(pair_counts[k]), items[iu[k]], items[ju[k]])
+                for k in order if pair_counts[k]]
+
+    def rating_means(self, **filters):
+        """Mean rating per RATING_ITEMS entry over the responses that rated it."""
+        ratings = self._ratings[:self._n]
+        if filters:
+            keep = np.unpackbits(self.segment_mask(**filters).view(np.uint8),
+                                 count=self._n).astype(bool)
+            ratings = ratings[keep]
+        answered = (ratings > 0).sum(axis=0)
+        totals = ratings.sum(axis=0, dtype=np.int64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(answered > 0, totals / np.maximum(answered, 1), np.nan)
+
+    # -- persistence ------------------------------------------------------
+    def save(self, path):
+        n = self._n
+        np.savez_compressed(
+            path,
+            **{f"bits_{k}": v[:n] for k, v in self._bits.items()},
+            ratings=self._ratings[:n],
+            **{f"seg_{k}": v[:n] for k, v in self._segments.items()},
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            n = data["ratings"].shape[0]
+            store = cls(capacity=max(n, 1))
+            for kind in store._bits:
+                store._bits[kind][:n] = data[f"bits_{kind}"]
+            store._ratings[:n] = data["ratings"]
+            for name in store._segments:
+                store._segments[name][:n] = data[f"seg_{name}"]
+        store._n = n
+        return store
@@ -0,0 +1,379 @@
+"""
+Spreadsheet export of ingested questionnaire responses.
+One row per response, one column per field, checkbox and rating of
+client-intake-form.json plus every A4/B3 capability, A5 integration and
+A3/B2/B4 rating item. The column layout is derived from the schema once;
+rows are then streamed straight into the outputs, so memory stays flat
+however many responses there are.
+
+CSV goes through the csv module (UTF-8 with a BOM, so Excel opens it
+cleanly); text starting with =, +, -, @, a tab or a carriage return gets
+a leading ' so a spreadsheet shows it instead of running it as a
+formula. XLSX is written by a small write-only writer: the worksheet is
+streamed into the zip entry row by row with inline strings, so there is
+no shared-string table to grow and no openpyxl dependency. Ticked boxes
+are 1, ratings their 1-5 score; unanswered cells, and numbers that are
+NaN or infinite, are left empty.
+
+Inputs: .jsonl / .json records, pipeline --report files, or a
+response_store.py database (.db / .sqlite).
+
+Usage:
+    python response_export.py responses.db -o responses.xlsx
+    python response_export.py batch.jsonl -o responses.xlsx -o responses.csv
+    python response_export.py batch.jsonl -o - > responses.csv
+"""
+
+import argparse
+import csv
+import io
+import json
+import math
+import re
+import sys
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+from intake_schema import (
+    CAPABILITY_ITEMS, INTEGRATION_ITEMS, MULTI_CHOICE, RATING_ITEMS, load_form, normalize_option,
+)
+
+# Free-text answers of the questionnaire (open_field ids in generate_questionnaire.py).
+OPEN_FIELDS = ("a1_frustrations", "a5_custom_automations", "b2_other_pain_points",
+               "b4_custom_workflows", "d_anything_else")
+# Leading characters that make a spreadsheet read a CSV cell as a formula.
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+LIST_SEPARATOR = "; "
+
+
+# ---------------------------------------------------------------------------
+# Column layout
+# ---------------------------------------------------------------------------
+class RowLayout:
+    """Columns derived once from the intake form; row() maps a record onto
+    them as a sparse {column: value} dict."""
+
+    def __init__(self):
+        self.headers = []
+        # {section or None for top-level keys: [(key, column)]} and
+        # {section or None: [(key, {option: column}, other column)]}
+        self._scalars = {}
+        self._groups = {}
+        self._scalar(None, "response_id", "response_id")
+        for section, fields in load_form()["sections"].items():
+            for name, spec in fields.items():
+                label = f"{section}.{name}"
+                if isinstance(spec, dict) and "options" in spec:
+                    if (section, name) in MULTI_CHOICE:
+                        self._group(section, name, label, spec["options"])
+                    else:
+                        self._scalar(section, name, label)
+                elif isinstance(spec, list) and spec:   # use_cases: a checklist per area
+                    self._group(section, name, label, spec)
+                else:                                   # free text, 1-5 scales, languages
+                    self._scalar(section, name, label)
+        self._group(None, "capabilities", "capabilities", CAPABILITY_ITEMS)
+        self._group(None, "integrations", "integrations", INTEGRATION_ITEMS)
+        self._ratings = {}
+        for item in RATING_ITEMS:
+            self._ratings.setdefault(item, self._add(f"ratings: {item}"))
+        for name in OPEN_FIELDS:
+            self._scalar("open_fields", name, f"open_fields.{name}")
+        self._scalar(None, "platform", "platform")
+
+    def __len__(self):
+        return len(self.headers)
+
+    def _add(self, header):
+        self.headers.append(header)
+        return len(self.headers) - 1
+
+    def _scalar(self, section, key, label):
+        self._scalars.setdefault(section, []).append((key, self._add(label)))
+
+    def _group(self, section, key, label, options):
+        index = {}
+        for option in options:
+            column = index.get(option)
+            if column is None:
+                column = self._add(f"{label}: {option}")
+            index.setdefault(option, column)
+            index.setdefault(normalize_option(option), column)
+        self._groups.setdefault(section, []).append((key, index, self._add(f"{label} (other)")))
+
+    def row(self, record):
+        cells = {}
+        for section, fields in self._scalars.items():
+            node = record if section is None else record.get(section)
+            if not isinstance(node, dict):
+                continue
+            for key, column in fields:
+                value = node.get(key)
+                if value is None or value == "":
+                    continue
+                if isinstance(value, list):
+                    value = LIST_SEPARATOR.join(str(v) for v in value)
+                cells[column] = value
+        for section, groups in self._groups.items():
+            node = record if section is None else record.get(section)
+            if not isinstance(node, dict):
+                continue
+            for key, index, other in groups:
+                values = node.get(key)
+                if not values:
+                    continue
+                if not isinstance(values, list):   # a lone answer, not its characters
+                    values = [values]
+                extra = []
+                for value in values:
+                    column = index.get(value)
+                    if column is None and isinstance(value, str):
+                        column = index.get(normalize_option(value))
+                    if column is None:
+                        extra.append(str(value))
+                    else:
+                        cells[column] = 1
+                if extra:
+                    cells[other] = LIST_SEPARATOR.join(extra)
+        ratings = record.get("ratings")
+        if isinstance(ratings, dict):
+            for item, score in ratings.items():
+                column = self._ratings.get(item)
+                if column is not None:
+                    cells[column] = score
+        return cells
+
+
+# ---------------------------------------------------------------------------
+# Writers
+# ---------------------------------------------------------------------------
+class CsvWriter:
+    def __init__(self, fileobj, width):
+        self._fh = fileobj
+        self._csv = csv.writer(fileobj)
+        self._width = width
+
+    def header(self, headers):
+        self._csv.writerow(headers)
+
+    def write(self, cells):
+        row = [""] * self._width
+        for column, value in cells.items():
+            if value.__class__ is str:
+                if value.startswith(FORMULA_PREFIXES):
+                    value = "'" + value
+            elif value.__class__ is float and not math.isfinite(value):
+                continue
+            row[column] = value
+        self._csv.writerow(row)
+
+    def close(self):
+        self._fh.flush()
+
+
+def column_letter(index):
+    """0 -> "A", 25 -> "Z", 26 -> "AA"."""
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+_XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" Type="http://schemas.openxmlformats.org/'
+        'officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="{sheet}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" Type="http://schemas.openxmlformats.org/'
+        'officeDocument/2006/relationships/worksheet"/>'
+        '<Relationship Id="rId2" Target="styles.xml" Type="http://schemas.openxmlformats.org/'
+        'officeDocument/2006/relationships/styles"/>'
+        '</Relationships>'),
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+        '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+        '</styleSheet>'),
+}
+
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView workbookViewId="0">'
+    '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+    '</sheetView></sheetViews><sheetData>')
+
+
+class XlsxWriter:
+    """Write-only single-sheet XLSX: the worksheet XML is streamed into its
+    zip entry, so memory does not grow with the number of rows."""
+
+    def __init__(self, fileobj, width, sheet="Responses", compresslevel=1):
+        self._zip = zipfile.ZipFile(fileobj, "w", zipfile.ZIP_DEFLATED, compresslevel=compresslevel)
+        self._letters = [column_letter(i) for i in range(width)]
+        self._rows = 0
+        for name, xml in _XLSX_PARTS.items():
+            self._zip.writestr(name, xml.replace("{sheet}", escape(sheet)))
+        raw = self._zip.open("xl/worksheets/sheet1.xml", "w", force_zip64=True)
+        self._sheet = io.TextIOWrapper(io.BufferedWriter(raw, 1 << 16), encoding="utf-8")
+        self._sheet.write(_SHEET_HEAD)
+
+    @staticmethod
+    def _text(value):
+        return escape(_XML_ILLEGAL.sub("", str(value)))
+
+    def header(self, headers):
+        self._rows += 1
+        self._sheet.write('<row r="1">' + "".join(
+            f'<c r="{self._letters[i]}1" s="1" t="inlineStr"><is><t>{self._text(h)}</t></is></c>'
+            for i, h in enumerate(headers)) + "</row>")
+
+    def write(self, cells):
+        self._rows += 1
+        n = self._rows
+        letters = self._letters
+        parts = [f'<row r="{n}">']
+        for c in sorted(cells):
+            value = cells[c]
+            if value.__class__ is bool:
+                value = int(value)
+            if value.__class__ is float and not math.isfinite(value):
+                continue
+            if value.__class__ is int or value.__class__ is float:
+                parts.append(f'<c r="{letters[c]}{n}"><v>{value}</v></c>')
+            else:
+                parts.append(f'<c r="{letters[c]}{n}" t="inlineStr"><is>'
+                             f'<t xml:space="preserve">{self._text(value)}</t></is></c>')
+        parts.append("</row>")
+        self._sheet.write("".join(parts))
+
+    def close(self):
+        self._sheet.write(f'</sheetData><autoFilter ref="A1:{self._letters[-1]}{max(self._rows, 1)}"/>'
+                          '</worksheet>')
+        self._sheet.close()
+        self._zip.close()
+
+
+def open_writer(output, width):
+    """Pick the format from the file name; "-" is CSV on stdout. Returns
+    (writer, file handle to close or None)."""
+    if output == "-":
+        return CsvWriter(sys.stdout, width), None
+    if output.endswith(".xlsx"):
+        fh = open(output, "wb")
+        return XlsxWriter(fh, width), fh
+    if output.endswith(".csv"):
+        fh = open(output, "w", encoding="utf-8-sig", newline="")
+        return CsvWriter(fh, width), fh
+    raise ValueError(f"unknown export format for {output!r} (use .xlsx or .csv)")
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+def iter_records(paths):
+    """Yield response records one at a time from .jsonl / .json files,
+    pipeline reports and response_store.py databases."""
+    for path in paths:
+        if path.endswith((".db", ".sqlite", ".sqlite3")):
+            from response_store import ResponseStore
+            with ResponseStore(path) as store:
+                yield from store.query()
+            continue
+        with open(path, encoding="utf-8") as fh:
+            if path.endswith(".jsonl"):
+                for line in fh:
+                    if line.strip():
+                        yield json.loads(line)
+                continue
+            data = json.load(fh)
+        if isinstance(data, dict) and "results" in data:   # pipeline report
+            for r in data["results"]:
+                yield r["record"]
+        else:
+            yield from data if isinstance(data, list) else [data]
+
+
+def export(records, outputs):
+    """Stream *records* into every output; returns the number of rows."""
+    layout = RowLayout()
+    writers, handles = [], []
+    try:
+        for output in outputs:
+            writer, fh = open_writer(output, len(layout))
+            writers.append(writer)
+            if fh is not None:
+                handles.append(fh)
+        for writer in writers:
+            writer.header(layout.headers)
+        rows = 0
+        for record in records:
+            cells = layout.row(record)
+            for writer in writers:
+                writer.write(cells)
+            rows += 1
+        for writer in writers:
+            writer.close()
+    finally:
+        for fh in handles:
+            fh.close()
+    return rows
+
+
+# ===================================================================
+#  MAIN
+# ===================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export questionnaire responses to XLSX / CSV")
+    parser.add_argument("inputs", nargs="+", help=".jsonl/.json records, a pipeline report or a .db store")
+    parser.add_argument("-o", "--output", action="append", required=True,
+                        help="responses.xlsx or responses.csv (repeatable); - for CSV on stdout")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    rows = export(iter_records(args.inputs), args.output)
+    log = sys.stderr if "-" in args.output else sys.stdout
+    print(f"{rows} response(s), {len(RowLayout())} column(s) -> {', '.join(args.output)} "
+          f"in {time.perf_counter() - start:.2f}s", file=log)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
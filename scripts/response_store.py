@@ -0,0 +1,168 @@
+"""
+Embedded store for parsed questionnaire responses.
+SQLite in WAL mode: one row per response with the full record as JSON,
+plus indexed columns for the fields we filter on (industry, company size,
+budget, sensitivity, chosen platform). Inserts are batched into
+transactions; queries stream rows back as generators.
+"""
+
+import json
+import sqlite3
+
+from intake_schema import SEGMENT_FIELDS, get_path
+
+INDEXED = tuple(SEGMENT_FIELDS)  # industry, company_size, budget, sensitivity, platform
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS responses (
+    rowid INTEGER PRIMARY KEY,
+    response_id TEXT UNIQUE NOT NULL,
+    {", ".join(f"{col} TEXT" for col in INDEXED)},
+    record TEXT NOT NULL
+);
+{"".join(f"CREATE INDEX IF NOT EXISTS idx_responses_{col} ON responses({col});" for col in INDEXED)}
+"""
+
+
+class ResponseStore:
+    """SQLite-backed response store.
+
+    store = ResponseStore("responses.db")
+    store.add_many(records)
+    for record in store.query(industry="Healthcare", sensitivity="High"):
+        ...
+    """
+
+    def __init__(self, path, batch_size=5000):
+        self.path = path
+        self.batch_size = batch_size
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    # -- writes -----------------------------------------------------------
+    @staticmethod
+    def _row(record):
+        response_id = record.get("response_id")
+        if not response_id:
+            raise ValueError("response record has no response_id")
+        return (response_id,
+                *(get_path(record, SEGMENT_FIELDS[col]) for col in INDEXED),
+                json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+
+    def add(self, record):
+        self.add_many([record])
+
+    def add_many(self, records, replace=True):
+        """Insert records in transactions of batch_size; returns the count.
+
+        replace -- overwrite an existing response with the same response_id
+                   (otherwise a duplicate raises sqlite3.IntegrityError)
+        """
+        # An upsert rather than INSERT OR REPLACE: the row keeps its rowid, so a
+        # record rewritten during query() is not met again further on.
+        sql = (f"INSERT INTO responses (response_id, {', '.join(INDEXED)}, record) "
+               f"VALUES ({', '.join('?' * (len(INDEXED) + 2))})")
+        if replace:
+            sql += (" ON CONFLICT(response_id) DO UPDATE SET "
+                    + ", ".join(f"{col} = excluded.{col}" for col in (*INDEXED, "record")))
+        total = 0
+        batch = []
+        for record in records:
+            batch.append(self._row(record))
+            if len(batch) >= self.batch_size:
+                total += self._flush(sql, batch)
+                batch = []
+        if batch:
+            total += self._flush(sql, batch)
+        return total
+
+    def _flush(self, sql, rows):
+        with self._conn:
+            self._conn.executemany(sql, rows)
+        return len(rows)
+
+    def delete(self, response_id):
+        with self._conn:
+            cur = self._conn.execute("DELETE FROM responses WHERE response_id = ?", (response_id,))
+        return cur.rowcount
+
+    # -- reads ------------------------------------------------------------
+    @staticmethod
+    def _where(filters):
+        clauses, params = [], []
+        for col, value in filters.items():
+            if col not in INDEXED:
+                raise KeyError(f"cannot filter on {col!r}; indexed fields: {', '.join(INDEXED)}")
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set)):
+                value = list(value)
+                clauses.append(f"{col} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            else:
+                clauses.append(f"{col} = ?")
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def get(self, response_id):
+        row = self._conn.execute(
+            "SELECT record FROM responses WHERE response_id = ?", (response_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query(self, limit=None, chunk_size=1000, **filters):
+        """Yield records matching every filter (value or list of values)."""
+        where, params = self._where(filters)
+        # Scan only the rows present when the query starts: callers can keep
+        # writing while they iterate without meeting their own inserts.
+        last = self._conn.execute("SELECT MAX(rowid) FROM responses").fetchone()[0] or 0
+        where += f"{' AND' if where else ' WHERE'} rowid <= ?"
+        params.append(last)
+        sql = f"SELECT record FROM responses{where} ORDER BY rowid"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        cur = self._conn.cursor()
+        try:
+            cur.execute(sql, params)
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    return
+                for (record,) in rows:
+                    yield json.loads(record)
+        finally:
+            cur.close()
+
+    def ids(self, **filters):
+        where, params = self._where(filters)
+        for (response_id,) in self._conn.execute(
+                f"SELECT response_id FROM responses{where} ORDER BY rowid", params):
+            yield response_id
+
+    def count(self, **filters):
+        where, params = self._where(filters)
+        return self._conn.execute(f"SELECT COUNT(*) FROM responses{where}", params).fetchone()[0]
+
+    def count_by(self, field, **filters):
+        """{value: count} for one indexed field, optionally filtered."""
+        if field not in INDEXED:
+            raise KeyError(f"cannot group on {field!r}; indexed fields: {', '.join(INDEXED)}")
+        where, params = self._where(filters)
+        rows = self._conn.execute(
+            f"SELECT {field}, COUNT(*) FROM responses{where} GROUP BY {field}", params)
+        return dict(rows.fetchall())
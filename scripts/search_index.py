@@ -0,0 +1,409 @@
+"""
+BM25 full-text search over ingested responses.
+Indexes each response's free-text answers and every option it selected
+(capabilities, integrations, use cases, regulations, ...), tokenized like
+need_matcher. The index is a list of immutable segments on disk, each a
+handful of .npy arrays opened with mmap, so a fresh process can answer
+queries without reading the postings into memory:
+
+    terms.npy     sorted vocabulary (binary-searched, no dict to build)
+    offsets.npy   postings range per term
+    first.npy     first doc id per term
+    deltas.npy    uint16 gaps to the following doc ids; 0xFFFF escapes to
+    wide.npy      (position, gap) pairs for the rare gaps that do not fit
+    tfs.npy       term frequencies
+    doclen.npy    tokens per document
+    ids.npy       response_id per document
+
+New responses are buffered and written as a new segment on flush();
+re-adding a response_id tombstones the older copy, and small segments are
+merged once there are more than MERGE_FACTOR of them.
+
+Usage:
+    python search_index.py add .cache/search responses.jsonl [responses.db ...]
+    python search_index.py search .cache/search "shopify hipaa"
+    python search_index.py search .cache/search "slack teams" --any --top 20
+    python search_index.py merge .cache/search
+    python search_index.py stats .cache/search
+"""
+
+import argparse
+import functools
+import json
+import math
+import os
+import shutil
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+from need_matcher import tokenize
+
+K1 = 1.2
+B = 0.75
+FLUSH_DOCS = 20_000     # buffered documents per new segment
+MERGE_FACTOR = 8        # merge the smallest segments beyond this many
+MAX_TERM = 32           # longer tokens (URLs, hashes) are truncated
+
+SKIP_KEYS = {"response_id", "ratings"}
+_ARRAYS = ("terms", "offsets", "first", "deltas", "wide", "tfs", "doclen", "ids")
+ESCAPE = 0xFFFF
+
+
+def document_parts(record):
+    """All free text and selected options of a response."""
+    parts = []
+
+    def walk(node):
+        if isinstance(node, str):
+            parts.append(node)
+        elif isinstance(node, dict):
+            for key, value in node.items():
+                if key not in SKIP_KEYS:
+                    walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(record)
+    return parts
+
+
+@functools.lru_cache(maxsize=65536)
+def _tokens(text):
+    # Option labels repeat across responses; stemming them once per process
+    # is most of the indexing time saved.
+    return tuple(t[:MAX_TERM] for t in tokenize(text))
+
+
+def document_terms(record):
+    """Counter of index terms for a response."""
+    terms = Counter()
+    for part in document_parts(record):
+        terms.update(_tokens(part))
+    return terms
+
+
+# ---------------------------------------------------------------------------
+# Segments
+# ---------------------------------------------------------------------------
+class Segment:
+    """One immutable, memory-mapped slice of the index."""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        for name in _ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+        self.n_docs = len(self.ids)
+        self.total_len = int(np.asarray(self.doclen, dtype=np.int64).sum())
+        self.deleted = np.zeros(self.n_docs, dtype=bool)
+
+    def lookup(self, term):
+        i = int(np.searchsorted(self.terms, term))
+        if i < len(self.terms) and self.terms[i] == term:
+            return i
+        return None
+
+    def postings(self, i):
+        """(doc numbers, term frequencies) for term index *i*."""
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        gaps = self.deltas[start:end].astype(np.int64)
+        lo, hi = np.searchsorted(self.wide[0], (start, end))
+        if hi > lo:
+            gaps[self.wide[0, lo:hi] - start] = self.wide[1, lo:hi]
+        docs = np.cumsum(gaps)
+        docs += self.first[i]
+        return docs, self.tfs[start:end]
+
+    def df(self, i):
+        return int(self.offsets[i + 1] - self.offsets[i])
+
+    def decode_all(self):
+        """Every posting as parallel (term index, doc, tf) arrays."""
+        counts = np.diff(np.asarray(self.offsets))
+        term_idx = np.repeat(np.arange(len(self.terms)), counts)
+        deltas = np.asarray(self.deltas, dtype=np.int64)
+        deltas[self.wide[0]] = self.wide[1]
+        # Undo the per-term delta encoding with one cumsum, resetting at each term start.
+        starts = np.asarray(self.offsets[:-1])[counts > 0]
+        absolute = np.cumsum(deltas)
+        base = np.zeros_like(absolute)
+        base[starts[1:]] = absolute[starts[1:] - 1]
+        docs = absolute - np.maximum.accumulate(base) + np.asarray(self.first)[term_idx]
+        return term_idx, docs, np.asarray(self.tfs)
+
+
+def write_segment(path, ids, terms, term_idx, docs, tfs, doclen):
+    """Write a segment from parallel posting arrays (term_idx indexes *terms*,
+    which must be sorted); postings need not be ordered."""
+    order = np.lexsort((docs, term_idx))
+    term_idx, docs, tfs = term_idx[order], docs[order], tfs[order]
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(term_idx, minlength=len(terms)), out=offsets[1:])
+    heads = offsets[:-1][offsets[:-1] < offsets[1:]]
+    first = np.zeros(len(terms), dtype=np.int64)
+    first[offsets[:-1] < offsets[1:]] = docs[heads]
+    deltas = np.diff(docs, prepend=0)
+    deltas[heads] = 0
+    wide = np.flatnonzero(deltas >= ESCAPE)
+    arrays = {
+        "terms": np.asarray(terms, dtype=str),
+        "offsets": offsets,
+        "first": first.astype(np.uint32),
+        "deltas": np.minimum(deltas, ESCAPE).astype(np.uint16),
+        "wide": np.stack([wide, deltas[wide]]).astype(np.int64),
+        "tfs": np.minimum(tfs, 2 ** 16 - 1).astype(np.uint16),
+        "doclen": np.minimum(doclen, 2 ** 32 - 1).astype(np.uint32),
+        "ids": np.asarray(ids, dtype=str),
+    }
+    tmp = path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), array)
+    os.replace(tmp, path)
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+class SearchIndex:
+    """Segmented BM25 index in a directory."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        manifest = self._read_manifest()
+        self._next = manifest["next_segment"]
+        self.segments = [Segment(os.path.join(path, name)) for name in manifest["segments"]]
+        for seg in self.segments:
+            tomb = os.path.join(path, f"{seg.name}.deleted.npy")
+            if os.path.exists(tomb):
+                seg.deleted = np.unpackbits(np.load(tomb))[:seg.n_docs].astype(bool)
+        self._buffer = {}      # response_id -> Counter of terms
+        self._locations = None
+
+    # -- manifest -----------------------------------------------------------
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.path, "index.json"), encoding="utf-8") as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return {"segments": [], "next_segment": 1}
+
+    def _write_manifest(self):
+        tmp = os.path.join(self.path, "index.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"segments": [s.name for s in self.segments],
+                       "next_segment": self._next}, fh)
+        os.replace(tmp, os.path.join(self.path, "index.json"))
+
+    def _save_tombstones(self, seg):
+        np.save(os.path.join(self.path, f"{seg.name}.deleted.npy"), np.packbits(seg.deleted))
+
+    # -- writing --------------------------------------------------------------
+    def add(self, record):
+        rid = str(record["response_id"])
+        self._buffer[rid] = document_terms(record)
+        if len(self._buffer) >= FLUSH_DOCS:
+            self.flush()
+
+    def add_many(self, records):
+        for record in records:
+            self.add(record)
+        self.flush()
+
+    def _where(self):
+        """response_id -> (segment, doc) for live documents, built on first use."""
+        if self._locations is None:
+            self._locations = {}
+            for seg in self.segments:
+                for doc, rid in enumerate(seg.ids.tolist()):
+                    if not seg.deleted[doc]:
+                        self._locations[rid] = (seg, doc)
+        return self._locations
+
+    def flush(self):
+        """Write buffered documents as a new segment (and merge if needed)."""
+        if not self._buffer:
+            return
+        touched = set()
+        where = self._where()
+        for rid in self._buffer:
+            hit = where.get(rid)
+            if hit is not None:
+                hit[0].deleted[hit[1]] = True
+                touched.add(hit[0])
+        for seg in touched:
+            self._save_tombstones(seg)
+
+        ids = list(self._buffer)
+        counters = list(self._buffer.values())
+        vocab = sorted(set().union(*counters))
+        term_id = {t: i for i, t in enumerate(vocab)}
+        term_idx = np.fromiter((term_id[t] for c in counters for t in c), dtype=np.int64)
+        tfs = np.fromiter((n for c in counters for n in c.values()), dtype=np.int64)
+        docs = np.repeat(np.arange(len(ids)), [len(c) for c in counters])
+        doclen = np.array([sum(c.values()) for c in counters], dtype=np.int64)
+
+        seg = self._new_segment(ids, vocab, term_idx, docs, tfs, doclen)
+        for doc, rid in enumerate(ids):
+            where[rid] = (seg, doc)
+        self._buffer = {}
+        if len(self.segments) > MERGE_FACTOR:
+            self.merge(len(self.segments) - MERGE_FACTOR + 1)
+
+    def _new_segment(self, ids, vocab, term_idx, docs, tfs, doclen):
+        name = f"seg-{self._next:06d}"
+        self._next += 1
+        write_segment(os.path.join(self.path, name), ids, vocab, term_idx, docs, tfs, doclen)
+        seg = Segment(os.path.join(self.path, name))
+        self.segments.append(seg)
+        self._write_manifest()
+        return seg
+
+    def merge(self, count=None):
+        """Merge the *count* smallest segments (default: all) into one,
+        dropping deleted documents."""
+        if len(self.segments) < 2 and not any(s.deleted.any() for s in self.segments):
+            return
+        victims = sorted(self.segments, key=lambda s: s.n_docs)[:count or len(self.segments)]
+        vocab = np.unique(np.concatenate([np.asarray(s.terms) for s in victims]))
+        parts, ids, doclens, base = [], [], [], 0
+        for seg in victims:
+            live = ~seg.deleted
+            renumber = np.cumsum(live) - 1 + base
+            t, d, f = seg.decode_all()
+            keep = live[d]
+            parts.append((np.searchsorted(vocab, np.asarray(seg.terms))[t[keep]],
+                          renumber[d[keep]], f[keep]))
+            ids.extend(np.asarray(seg.ids)[live].tolist())
+            doclens.append(np.asarray(seg.doclen)[live])
+            base += int(live.sum())
+        term_idx, docs, tfs = (np.concatenate(x) for x in zip(*parts))
+
+        self.segments = [s for s in self.segments if s not in victims]
+        seg = self._new_segment(ids, vocab, term_idx, docs, tfs.astype(np.int64),
+                                np.concatenate(doclens))
+        for old in victims:
+            shutil.rmtree(old.path, ignore_errors=True)
+            tomb = os.path.join(self.path, f"{old.name}.deleted.npy")
+            if os.path.exists(tomb):
+                os.remove(tomb)
+        self._locations = None
+        return seg
+
+    # -- reading ------------------------------------------------------------
+    def __len__(self):
+        return sum(s.n_docs - int(s.deleted.sum()) for s in self.segments)
+
+    def search(self, query, top=10, mode="all"):
+        """[(score, response_id)] best first. mode "all" requires every query
+        term (after stopwords/stemming); "any" ranks documents with some."""
+        terms = list(dict.fromkeys(t[:MAX_TERM] for t in tokenize(query)))
+        if not terms or not self.segments:
+            return []
+        n_docs = sum(s.n_docs for s in self.segments)
+        avgdl = sum(s.total_len for s in self.segments) / max(n_docs, 1)
+        located = [[seg.lookup(t) for t in terms] for seg in self.segments]
+        df = [sum(seg.df(i) for seg, idx in zip(self.segments, located)
+                  if (i := idx[k]) is not None) for k in range(len(terms))]
+        if mode == "all" and not all(df):
+            return []
+        idf = [math.log(1 + (n_docs - d + 0.5) / (d + 0.5)) for d in df]
+
+        hits = []
+        for seg, idx in zip(self.segments, located):
+            if mode == "all" and None in idx:
+                continue
+            scores = np.zeros(seg.n_docs)
+            matched = np.zeros(seg.n_docs, dtype=np.int16)
+            norm = K1 * (1 - B + B * np.asarray(seg.doclen, dtype=np.float64) / avgdl)
+            for k, i in enumerate(idx):
+                if i is None:
+                    continue
+                docs, tf = seg.postings(i)
+                tf = tf.astype(np.float64)
+                scores[docs] += idf[k] * tf * (K1 + 1) / (tf + norm[docs])
+                matched[docs] += 1
+            need = len(terms) if mode == "all" else 1
+            candidates = np.flatnonzero((matched >= need) & ~seg.deleted)
+            if len(candidates) > top:
+                candidates = candidates[np.argpartition(-scores[candidates], top - 1)[:top]]
+            hits.extend((float(scores[d]), str(seg.ids[d])) for d in candidates)
+        hits.sort(key=lambda h: (-h[0], h[1]))
+        return [(round(score, 4), rid) for score, rid in hits[:top]]
+
+    def stats(self):
+        return {
+            "documents": len(self),
+            "segments": [{"name": s.name, "docs": s.n_docs, "deleted": int(s.deleted.sum()),
+                          "terms": len(s.terms), "postings": len(s.deltas),
+                          "wide_gaps": s.wide.shape[1]} for s in self.segments],
+            "disk_bytes": sum(os.path.getsize(os.path.join(root, f))
+                              for root, _, files in os.walk(self.path) for f in files),
+        }
+
+
+def iter_records(paths):
+    """Records from .jsonl files and response_store databases."""
+    for path in paths:
+        if path.endswith((".db", ".sqlite")):
+            from response_store import ResponseStore
+            with ResponseStore(path) as store:
+                yield from store.query()
+        else:
+            with open(path, encoding="utf-8") as fh:
+                for line in fh:
+                    if line.strip():
+                        yield json.loads(line)
+
+
+# ===================================================================
+#  MAIN
+# ===================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BM25 search over responses")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("add", help="index responses (.jsonl or response_store .db)")
+    p.add_argument("index")
+    p.add_argument("inputs", nargs="+")
+    p = sub.add_parser("search")
+    p.add_argument("index")
+    p.add_argument("query")
+    p.add_argument("--top", type=int, default=10)
+    p.add_argument("--any", action="store_true", help="match any term instead of all")
+    for name in ("merge", "stats"):
+        sub.add_parser(name).add_argument("index")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    index = SearchIndex(args.index)
+    if args.command == "add":
+        before = len(index)
+        index.add_many(iter_records(args.inputs))
+        print(f"Indexed {len(index) - before:+} document(s), {len(index)} total, "
+              f"{len(index.segments)} segment(s) in {time.perf_counter() - start:.2f}s")
+    elif args.command == "search":
+        opened = time.perf_counter() - start
+        t = time.perf_counter()
+        hits = index.search(args.query, args.top, "any" if args.any else "all")
+        took = time.perf_counter() - t
+        for score, rid in hits:
+            print(f"{score:8.3f}  {rid}")
+        print(f"{len(hits)} hit(s); open {opened * 1000:.1f} ms, query {took * 1000:.1f} ms",
+              file=sys.stderr)
+    elif args.command == "merge":
+        index.merge()
+        print(f"Merged into {len(index.segments)} segment(s) in {time.perf_counter() - start:.2f}s")
+    else:
+        print(json.dumps(index.stats(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,497 @@
+"""
+Reference catalog in shared memory, for process-pool workers.
+Without it every pool worker opens and parses the reference JSON on its
+own. Here the parent compiles platform-comparison.json,
+llm-model-comparison.json, skills-catalog.json, needs-mapping-matrix.json
+and service-packages.json once into flat numpy arrays inside one
+multiprocessing.shared_memory block; workers attach by name and get
+read-only views of the same pages.
+
+Layout of the block: "CLAWCAT1", a uint64 manifest length, the JSON
+manifest, then 64-byte aligned arrays:
+
+    str_offsets, str_blob           interned UTF-8 strings
+    <dataset>.<field>               per-record columns of each file's main
+                                    list: float64 (NaN when absent) for
+                                    numeric fields, int32 string ids
+                                    (-1 when absent) for text fields;
+                                    <dataset>. holds the record names
+    <dataset>.<field>[]             int64 offsets into the int32 string ids
+                                    of <dataset>.<field> for lists of text
+    <dataset>:json                  the file's own bytes
+
+Catalog.table() gives the record columns as zero-copy views; the hot
+lookups (model prices, context and latency in model_router.py, platform
+channels, providers and skills in deploy_configs.py and need_matcher.py)
+read them through worker_table(). Catalog.document() is the fallback for
+code that wants the whole file: it parses the stored bytes once per
+worker, a private copy, and install() hands it to reference_data.load().
+Pool workers only attach at startup, so a worker pays for that copy only
+if something actually asks for the document. A file that changed after
+the parent compiled it is read from disk.
+
+Usage:
+    python shared_catalog.py --workers 4            # per-worker startup / memory, files vs shared
+    python shared_catalog.py --table llm-model-comparison
+    python pipeline.py batch.jsonl --shared-catalog
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+import tracemalloc
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import reference_data
+
+# dataset -> (collection holding its records, field naming a record or None for dict keys)
+CATALOG = {
+    "platform-comparison": ("platforms", None),
+    "llm-model-comparison": ("models", "name"),
+    "skills-catalog": ("top_skills", "name"),
+    "needs-mapping-matrix": ("mappings", "need"),
+    "service-packages": ("packages", "name"),
+}
+
+MAGIC = b"CLAWCAT1"
+ALIGN = 64
+
+
+def _aligned(n):
+    return -(-n // ALIGN) * ALIGN
+
+
+def _leaves(value, prefix, out):
+    """{"latency.p95_ms": 6792, ...}: scalar fields of one record, dotted."""
+    for key, v in value.items():
+        name = f"{prefix}{key}"
+        if isinstance(v, dict):
+            _leaves(v, name + ".", out)
+        else:
+            out[name] = v
+    return out
+
+
+class _Builder:
+    """Interns strings and builds the record columns; only used in the parent."""
+
+    def __init__(self):
+        self.strings = {}
+
+    def intern(self, text):
+        sid = self.strings.get(text)
+        if sid is None:
+            sid = self.strings[text] = len(self.strings)
+        return sid
+
+    def table(self, dataset, document):
+        """{column name: array} for the records of one document."""
+        collection, name_key = CATALOG[dataset]
+        items = document.get(collection) or {}
+        if name_key is None:
+            names, rows = list(items), [_leaves(v, "", {}) for v in items.values()]
+        else:
+            names = [item[name_key] for item in items]
+            rows = [_leaves({k: v for k, v in item.items() if k != name_key}, "", {})
+                    for item in items]
+        columns = {"": np.array([self.intern(n) for n in names], dtype=np.int32)}
+        fields = dict.fromkeys(f for row in rows for f in row)
+        for field in fields:
+            values = [row.get(field) for row in rows]
+            present = [v for v in values if v is not None]
+            if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+                columns[field] = np.array([np.nan if v is None else v for v in values],
+                                          dtype=np.float64)
+            elif all(isinstance(v, str) for v in present):
+                columns[field] = np.array([-1 if v is None else self.intern(v) for v in values],
+                                          dtype=np.int32)
+            elif all(isinstance(v, list) and all(isinstance(x, str) for x in v) for v in present):
+                lists = [v or [] for v in values]
+                offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+                np.cumsum([len(v) for v in lists], out=offsets[1:])
+                columns[field] = np.array([self.intern(x) for v in lists for x in v], dtype=np.int32)
+                columns[field + "[]"] = offsets
+        return columns
+
+    def arrays(self):
+        blobs = [s.encode("utf-8") for s in self.strings]   # dicts keep insertion order
+        offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in blobs], out=offsets[1:])
+        return {"str_offsets": offsets, "str_blob": np.frombuffer(b"".join(blobs), dtype=np.uint8)}
+
+
+class Table:
+    """Zero-copy record columns of one dataset."""
+
+    def __init__(self, catalog, columns):
+        self._catalog = catalog
+        self._columns = columns
+        self.names = [catalog.string(i) for i in columns[""]]
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def fields(self):
+        return [f for f in self._columns if f and not f.endswith("[]")]
+
+    def __contains__(self, field):
+        return field in self._columns
+
+    def kind(self, field):
+        """"numeric", "text" or "list"."""
+        if field + "[]" in self._columns:
+            return "list"
+        return "numeric" if self._columns[field].dtype == np.float64 else "text"
+
+    def numeric(self, field):
+        """Read-only float64 view; NaN where a record lacks the field."""
+        if self.kind(field) != "numeric":
+            raise TypeError(f"{field!r} is not a numeric column")
+        return self._columns[field]
+
+    def text(self, field):
+        if self.kind(field) != "text":
+            raise TypeError(f"{field!r} is not a text column")
+        return [None if i < 0 else self._catalog.string(i) for i in self._columns[field]]
+
+    def lists(self, field):
+        """[[str, ...] per record] of a list-of-text column."""
+        if self.kind(field) != "list":
+            raise TypeError(f"{field!r} is not a list column")
+        ids, offsets = self._columns[field], self._columns[field + "[]"]
+        string = self._catalog.string
+        return [[string(i) for i in ids[offsets[r]:offsets[r + 1]]] for r in range(len(self))]
+
+    def records(self, name_key):
+        """[{name_key: name, field: value, ...}] per record, in file order;
+        fields a record lacks are left out and numbers come back as floats."""
+        readers = {"numeric": lambda f: self.numeric(f).tolist(), "text": self.text,
+                   "list": self.lists}
+        columns = {f: readers[self.kind(f)](f) for f in self.fields}
+        out = []
+        for r, name in enumerate(self.names):
+            record = {name_key: name}
+            for field, values in columns.items():
+                value = values[r]
+                if value is not None and value == value:   # NaN: absent
+                    record[field] = value
+            out.append(record)
+        return out
+
+
+class Catalog:
+    """The compiled reference files in one shared-memory block.
+
+    parent:  catalog = Catalog.create()          # ... catalog.unlink() when done
+    worker:  catalog = Catalog.attach(name); catalog.install()
+    """
+
+    def __init__(self, shm, owner):
+        self._shm = shm
+        self.owner = owner
+        buf = shm.buf.toreadonly()
+        (size,) = struct.unpack_from("<Q", buf, len(MAGIC))
+        if bytes(buf[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"shared memory {shm.name!r} is not a reference catalog")
+        start = len(MAGIC) + 8
+        self.manifest = json.loads(bytes(buf[start:start + size]))
+        self._buf = buf
+        self.arrays = {}   # views made on first use
+        self._strings = {}
+        self._documents = {}
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def nbytes(self):
+        return self._shm.size
+
+    @classmethod
+    def create(cls, datasets=tuple(CATALOG)):
+        """Compile *datasets* into a new shared-memory block."""
+        builder = _Builder()
+        files, tables, arrays = {}, {}, {}
+        for dataset in datasets:
+            path = reference_data.ALL_FILES[dataset]
+            mtime = os.stat(path).st_mtime_ns
+            with open(path, "rb") as fh:
+                raw = fh.read()
+            document = json.loads(raw)
+            files[dataset] = [path, mtime]
+            arrays[f"{dataset}:json"] = np.frombuffer(raw, dtype=np.uint8)
+            tables[dataset] = []
+            for field, column in builder.table(dataset, document).items():
+                arrays[f"{dataset}.{field}"] = column
+                tables[dataset].append(field)
+        arrays = {**builder.arrays(), **arrays}
+
+        layout, offset = {}, 0
+        for name, array in arrays.items():
+            layout[name] = [array.dtype.str, offset, int(array.size)]
+            offset = _aligned(offset + array.nbytes)
+        manifest = {"files": files, "tables": tables, "arrays": layout}
+        # Array offsets are relative until the manifest's own size is known.
+        head = json.dumps(manifest).encode("utf-8")
+        base = _aligned(len(MAGIC) + 8 + len(head) + 16 * len(layout))
+        for entry in layout.values():
+            entry[1] += base
+        head = json.dumps(manifest).encode("utf-8")
+        assert len(MAGIC) + 8 + len(head) <= base
+
+        shm = shared_memory.SharedMemory(create=True, size=max(base + offset, 1))
+        try:
+            shm.buf[:len(MAGIC)] = MAGIC
+            struct.pack_into("<Q", shm.buf, len(MAGIC), len(head))
+            shm.buf[len(MAGIC) + 8:len(MAGIC) + 8 + len(head)] = head
+            for name, array in arrays.items():
+                _, at, count = layout[name]
+                view = np.ndarray(count, dtype=array.dtype, buffer=shm.buf, offset=at)
+                view[:] = array
+                del view
+        except BaseException:
+            shm.close()
+            shm.unlink()
+            raise
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    def unlink(self):
+        """Parent only: drop the block once every worker is done with it.
+        Views still held elsewhere keep the pages mapped until released."""
+        self.arrays = {}
+        self._buf = None
+        if self.owner:
+            self._shm.unlink()
+        try:
+            self._shm.close()
+        except BufferError:
+            pass
+
+    # -- reads ------------------------------------------------------------
+    def array(self, name):
+        """Read-only view of one stored array."""
+        view = self.arrays.get(name)
+        if view is None:
+            dtype, offset, count = self.manifest["arrays"][name]
+            view = self.arrays[name] = np.frombuffer(self._buf, dtype=np.dtype(dtype),
+                                                     count=count, offset=offset)
+        return view
+
+    def string(self, sid):
+        text = self._strings.get(sid)
+        if text is None:
+            offsets = self.array("str_offsets")
+            text = self._strings[sid] = (
+                self.array("str_blob")[offsets[sid]:offsets[sid + 1]].tobytes().decode("utf-8"))
+        return text
+
+    def document(self, dataset):
+        """The dataset's JSON document, parsed once per process."""
+        doc = self._documents.get(dataset)
+        if doc is None:
+            doc = self._documents[dataset] = json.loads(self.array(f"{dataset}:json").tobytes())
+        return doc
+
+    def current(self, dataset):
+        """True while the dataset's file is unchanged since create()."""
+        path, mtime = self.manifest["files"][dataset]
+        try:
+            return os.stat(path).st_mtime_ns == mtime
+        except OSError:
+            return False
+
+    def table(self, dataset):
+        columns = {field: self.array(f"{dataset}.{field}")
+                   for field in self.manifest["tables"][dataset]}
+        return Table(self, columns)
+
+    def install(self):
+        """Make reference_data.load() serve these datasets from the catalog."""
+        for dataset, (path, mtime) in self.manifest["files"].items():
+            reference_data.provide(path, mtime, lambda dataset=dataset: self.document(dataset))
+
+
+# ---------------------------------------------------------------------------
+# Pool workers
+# ---------------------------------------------------------------------------
+_worker_catalog = None
+_worker_stats = None
+
+
+def rss():
+    """{"rss": ..., "anon": ..., "shared": ...} bytes of this process (Linux),
+    else peak RSS from getrusage."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as fh:
+            status = dict(line.split(":", 1) for line in fh if ":" in line)
+        kb = {k: int(status[k].split()[0]) * 1024
+              for k in ("VmRSS", "RssAnon", "RssShmem") if k in status}
+        return {"rss": kb.get("VmRSS", 0), "anon": kb.get("RssAnon", 0),
+                "shared": kb.get("RssShmem", 0)}
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"rss": peak * (1 if sys.platform == "darwin" else 1024), "anon": None, "shared": None}
+
+
+def worker_init(name=None, stats=None, datasets=tuple(CATALOG)):
+    """ProcessPoolExecutor initializer: attach to catalog *name*, or with
+    None read and parse every reference dataset as before. With a *stats*
+    queue, put {pid, mode, startup_s, rss...} on it (see worker_report())."""
+    global _worker_catalog, _worker_stats
+    start = time.perf_counter()
+    traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+    if name is not None:
+        # Attach only: the hot lookups read worker_table(), and install()
+        # keeps reference_data.load() working as a lazy fallback.
+        _worker_catalog = Catalog.attach(name)
+        _worker_catalog.install()
+    else:
+        for dataset in datasets:
+            reference_data.load(dataset)
+    if stats is not None:
+        _worker_stats = {"queue": stats, "mode": "shared" if name else "files",
+                         "startup_s": round(time.perf_counter() - start, 6), "traced": traced}
+        worker_report()
+
+
+def worker_report():
+    """Put this worker's current memory on the stats queue given to
+    worker_init(). When tracemalloc was tracing from the start of
+    worker_init(), heap_growth is the Python heap gained since then.
+    No-op without a queue."""
+    stats = _worker_stats
+    if stats is None:
+        return
+    out = {"pid": os.getpid(), "mode": stats["mode"], "startup_s": stats["startup_s"], **rss()}
+    if stats["traced"] is not None:
+        out["heap_growth"] = tracemalloc.get_traced_memory()[0] - stats["traced"]
+    stats["queue"].put(out)
+
+
+def worker_catalog():
+    """The catalog this worker attached to, or None."""
+    return _worker_catalog
+
+
+def worker_table(dataset):
+    """Zero-copy Table of *dataset* from the attached catalog, or None when
+    this process has none or the file changed since it was compiled;
+    callers then fall back to reference_data.load()."""
+    catalog = _worker_catalog
+    if catalog is None or dataset not in catalog.manifest["tables"] or not catalog.current(dataset):
+        return None
+    return catalog.table(dataset)
+
+
+def drain(stats):
+    """The latest stats dict of each worker put on the queue so far."""
+    import queue
+    out = {}
+    while True:
+        try:
+            s = stats.get(timeout=0.1)
+        except queue.Empty:
+            return [out[pid] for pid in sorted(out)]
+        out[s["pid"]] = s
+
+
+def format_stats(stats):
+    mib = 1 << 20
+    lines = []
+    for s in stats:
+        extra = (f" (anon {s['anon'] / mib:.1f}, shared {s['shared'] / mib:.2f})"
+                 if s.get("anon") is not None else "")
+        if s.get("heap_growth") is not None:
+            extra += f"  heap {s['heap_growth'] / 1024:+7.1f} KiB"
+        lines.append(f"  worker {s['pid']:>7} {s['mode']:<6} startup {s['startup_s'] * 1000:7.2f} ms"
+                     f"  RSS {s['rss'] / mib:6.1f} MiB{extra}")
+    return lines
+
+
+def _bench_init(name, stats):
+    """worker_init() after the pipeline's imports and with tracemalloc on,
+    so heap_growth counts what the worker holds of the reference data.
+    (The files are small enough that RSS alone cannot resolve it.)"""
+    import pipeline  # noqa: F401
+    tracemalloc.start()
+    worker_init(name, stats)
+
+
+def _touch(_):
+    """Benchmark task: the reference reads a pipeline worker does."""
+    from pipeline import need_mappings
+    need_mappings()
+    worker_report()
+    return os.getpid()
+
+
+def measure(workers, shared):
+    """Start a pool of *workers* in one mode; returns the workers' stats."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    # The importable module, not __main__: workers must attach the same
+    # module object that pipeline.py's worker_table() reads.
+    import shared_catalog
+    stats = multiprocessing.Queue()
+    catalog = Catalog.create() if shared else None
+    try:
+        with ProcessPoolExecutor(workers, initializer=shared_catalog._bench_init,
+                                 initargs=(catalog.name if catalog else None, stats)) as pool:
+            list(pool.map(shared_catalog._touch, range(workers * 4)))
+        return drain(stats)
+    finally:
+        if catalog is not None:
+            catalog.unlink()
+
+
+def print_table(catalog, dataset):
+    table = catalog.table(dataset)
+    readers = {"numeric": lambda f: table.numeric(f).tolist(), "text": table.text, "list": table.lists}
+    for field in table.fields:
+        kind = table.kind(field)
+        print(f"{field:<28} {kind:<8} {readers[kind](field)[:4]}")
+    print(f"{len(table)} record(s), {len(table.fields)} column(s); block {catalog.nbytes} bytes")
+
+
+# ===================================================================
+#  MAIN
+# ===================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shared-memory reference catalog for pool workers")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2,
+                        help="pool size for the startup / RSS comparison")
+    parser.add_argument("--table", choices=tuple(CATALOG),
+                        help="print this dataset's compiled record columns instead")
+    args = parser.parse_args(argv)
+
+    if args.table:
+        catalog = Catalog.create()
+        try:
+            print_table(catalog, args.table)
+        finally:
+            catalog.unlink()
+        return 0
+
+    for shared in (False, True):
+        stats = measure(args.workers, shared)
+        print(f"{'shared catalog' if shared else 'files'}: {len(stats)} worker(s)")
+        for line in format_stats(stats):
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,403 @@
+"""
+Free-text answer summarization behind a provider interface.
+Open-field answers are turned into prompts, looked up in a persistent
+SQLite cache (keyed by a hash of prompt + model, LRU-evicted), and only the
+misses go to the provider: in batches, with a concurrency limit and retry
+with exponential backoff. Token usage and cost are tracked per batch with
+the prices in llm-model-comparison.json. Re-running over the same answers
+makes no provider calls.
+
+Providers:
+    fake    -- offline, deterministic extractive summary (tests, dry runs)
+    ollama  -- a local Ollama server (http://localhost:11434), stdlib only
+
+Usage:
+    python summarizer.py responses.jsonl
+    python summarizer.py responses.jsonl --provider ollama --model llama3.2 --concurrency 2
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import sqlite3
+import sys
+import time
+import urllib.request
+
+import reference_data
+
+PROMPT = ("Summarize this client's answer in one short sentence a consultant can "
+          "scan, keeping names of tools and numbers.\n\nQuestion: {field}\nAnswer: {text}")
+
+DEFAULT_CACHE = "summaries.sqlite"
+
+
+class TransientError(Exception):
+    """A provider failure worth retrying (timeout, rate limit, 5xx)."""
+
+
+# ---------------------------------------------------------------------------
+# Providers
+# ---------------------------------------------------------------------------
+class Provider:
+    """Interface: summarize a batch of prompts.
+
+    complete_batch() returns one (text, input_tokens, output_tokens) per prompt,
+    in order, and raises TransientError for failures worth retrying.
+    price_model names the llm-model-comparison.json entry used for costing.
+    """
+
+    name = "provider"
+    model = None
+    price_model = None
+
+    def complete_batch(self, prompts):
+        raise NotImplementedError
+
+
+def estimate_tokens(text):
+    return max(1, math.ceil(len(text) / 4))
+
+
+class FakeProvider(Provider):
+    """Offline stand-in: first sentence of the answer, trimmed to max_words.
+
+    latency and failure_rate simulate a remote model for exercising the
+    batching, concurrency and retry paths.
+    """
+
+    name = "fake"
+
+    def __init__(self, model="fake-extractive", price_model="DeepSeek V3.2",
+                 max_words=25, latency=0.0, failure_rate=0.0, seed=0):
+        self.model = model
+        self.price_model = price_model
+        self.max_words = max_words
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    def complete_batch(self, prompts):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            raise TransientError("simulated provider failure")
+        out = []
+        for prompt in prompts:
+            answer = prompt.rsplit("Answer: ", 1)[-1].strip()
+            first = re.split(r"(?<=[.!?])\s+", answer, maxsplit=1)[0]
+            words = first.split()
+            summary = " ".join(words[:self.max_words]) + ("..." if len(words) > self.max_words else "")
+            out.append((summary, estimate_tokens(prompt), estimate_tokens(summary)))
+        return out
+
+
+class OllamaProvider(Provider):
+    """A model served by a local Ollama instance; one HTTP call per prompt."""
+
+    name = "ollama"
+
+    def __init__(self, model="llama3.2", url="http://localhost:11434", price_model=None,
+                 timeout=120):
+        self.model = model
+        self.price_model = price_model
+        self.url = url.rstrip("/") + "/api/generate"
+        self.timeout = timeout
+        self.calls = 0
+
+    def complete_batch(self, prompts):
+        self.calls += 1
+        out = []
+        for prompt in prompts:
+            body = json.dumps({"model": self.model, "prompt": prompt, "stream": False}).encode()
+            req = urllib.request.Request(self.url, body, {"Content-Type": "application/json"})
+            try:
+                with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                    data = json.load(resp)
+            except OSError as exc:  # connection refused, timeout, HTTP 5xx
+                raise TransientError(str(exc)) from exc
+            text = data.get("response", "").strip()
+            out.append((text, data.get("prompt_eval_count") or estimate_tokens(prompt),
+                        data.get("eval_count") or estimate_tokens(text)))
+        return out
+
+
+PROVIDERS = {"fake": FakeProvider, "ollama": OllamaProvider}
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+def cache_key(prompt, model):
+    return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """Persistent prompt+model -> summary cache, evicting least recently used."""
+
+    def __init__(self, path=None, max_entries=100_000):
+        self.path = path or reference_data.cache_path(DEFAULT_CACHE)
+        self.max_entries = max_entries
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS summaries (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                input_tokens INTEGER NOT NULL,
+                output_tokens INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS summaries_lru ON summaries (last_used)")
+        self._conn.commit()
+
+    def get_many(self, keys):
+        """{key: summary} for the keys present; marks them as recently used."""
+        found = {}
+        keys = list(keys)
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            found.update(self._conn.execute(
+                f"SELECT key, summary FROM summaries WHERE key IN ({marks})", chunk))
+        if found:
+            now = time.time()
+            self._conn.executemany("UPDATE summaries SET last_used = ? WHERE key = ?",
+                                   [(now, k) for k in found])
+            self._conn.commit()
+        return found
+
+    def put_many(self, rows):
+        """rows: [(key, model, summary, input_tokens, output_tokens)]"""
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?, ?)",
+            [(*row, now) for row in rows])
+        self._conn.commit()
+        self.evict()
+
+    def evict(self):
+        """Drop the least recently used entries beyond max_entries; returns count."""
+        excess = len(self) - self.max_entries
+        if excess <= 0:
+            return 0
+        self._conn.execute(
+            "DELETE FROM summaries WHERE key IN "
+            "(SELECT key FROM summaries ORDER BY last_used LIMIT ?)", (excess,))
+        self._conn.commit()
+        return excess
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Summarizer
+# ---------------------------------------------------------------------------
+def model_prices(model_name):
+    """(input, output) USD per 1M tokens, or (0, 0) for unpriced local models."""
+    for m in reference_data.load(reference_data.LLM_MODELS)["models"]:
+        if m["name"] == model_name:
+            return m["input_price_per_1m"], m["output_price_per_1m"]
+    return 0.0, 0.0
+
+
+class Summarizer:
+    """Cache-first, batched, concurrency-limited summarization.
+
+    Misses from concurrent callers are pooled: a batch goes out when it reaches
+    batch_size or max_wait seconds after its first prompt, whichever is first.
+    """
+
+    def __init__(self, provider, cache=None, batch_size=16, concurrency=4,
+                 max_retries=4, backoff=0.5, max_wait=0.02):
+        self.provider = provider
+        self.cache = cache if cache is not None else SummaryCache()
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_wait = max_wait
+        self.batches = []   # per-batch usage records
+        self.calls = 0      # provider requests, retries and failures included
+        self.failed_calls = 0
+        self._prices = model_prices(provider.price_model or provider.model)
+        self._semaphore = None
+        self._pending = []      # [(key, prompt)] waiting for the next batch
+        self._inflight = {}     # key -> Future, shared by every caller asking for it
+        self._timer = None
+        self._tasks = set()
+
+    async def summarize(self, prompts):
+        """Summaries for *prompts* (same order); cache hits never reach the provider."""
+        keys = [cache_key(p, self.provider.model) for p in prompts]
+        found = self.cache.get_many(set(keys))
+        waiting = {k: self._enqueue(k, p) for k, p in zip(keys, prompts) if k not in found}
+        if waiting:
+            found.update(zip(waiting, await asyncio.gather(*waiting.values())))
+        return [found[k] for k in keys]
+
+    def _enqueue(self, key, prompt):
+        future = self._inflight.get(key)
+        if future is not None:
+            return future
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        future = self._inflight[key] = loop.create_future()
+        self._pending.append((key, prompt))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        for i in range(0, len(pending), self.batch_size):
+            task = asyncio.ensure_future(self._dispatch(pending[i:i + self.batch_size]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch):
+        """Run one batch and settle every future in it, whatever fails."""
+        try:
+            rows = await self._run_batch(batch)
+        except Exception as exc:  # every caller waiting on this batch sees the error
+            for key, _ in batch:
+                self._inflight.pop(key).set_exception(exc)
+            return
+        except BaseException:     # cancelled: so are the callers' waits
+            for key, _ in batch:
+                self._inflight.pop(key).cancel()
+            raise
+        for key, _, text, _, _ in rows:
+            self._inflight.pop(key).set_result(text)
+        for key, _ in batch:   # a provider that returned fewer results than prompts
+            future = self._inflight.pop(key, None)
+            if future is not None:
+                future.set_exception(RuntimeError(
+                    f"provider returned {len(rows)} result(s) for {len(batch)} prompt(s)"))
+        try:
+            self.cache.put_many(rows)
+        except Exception as exc:  # the summaries are still good; only reuse is lost
+            print(f"summary cache write failed: {exc}", file=sys.stderr)
+
+    async def _run_batch(self, batch):
+        prompts = [p for _, p in batch]
+        async with self._semaphore:
+            start = time.perf_counter()
+            for attempt in range(self.max_retries + 1):
+                self.calls += 1
+                try:
+                    results = await asyncio.to_thread(self.provider.complete_batch, prompts)
+                    break
+                except Exception as exc:
+                    self.failed_calls += 1
+                    if not isinstance(exc, TransientError) or attempt == self.max_retries:
+                        raise
+                    delay = self.backoff * 2 ** attempt
+                    await asyncio.sleep(delay * (0.5 + random.random() / 2))
+        tokens_in = sum(r[1] for r in results)
+        tokens_out = sum(r[2] for r in results)
+        self.batches.append({
+            "batch": len(self.batches) + 1,
+            "prompts": len(prompts),
+            "attempts": attempt + 1,
+            "input_tokens": tokens_in,
+            "output_tokens": tokens_out,
+            "cost_usd": round((tokens_in * self._prices[0] + tokens_out * self._prices[1]) / 1e6, 6),
+            "seconds": round(time.perf_counter() - start, 3),
+        })
+        return [(key, self.provider.model, text, i, o)
+                for (key, _), (text, i, o) in zip(batch, results)]
+
+    async def summarize_response(self, record):
+        """{open field id: summary} for one response record."""
+        fields = {k: v for k, v in (record.get("open_fields") or {}).items()
+                  if isinstance(v, str) and v.strip()}
+        prompts = [PROMPT.format(field=k.replace("_", " "), text=v) for k, v in fields.items()]
+        return dict(zip(fields, await self.summarize(prompts)))
+
+    async def summarize_responses(self, records):
+        """Summaries for many records, batched across records."""
+        per_record, prompts = [], []
+        for record in records:
+            fields = [(k, v) for k, v in (record.get("open_fields") or {}).items()
+                      if isinstance(v, str) and v.strip()]
+            per_record.append([k for k, _ in fields])
+            prompts.extend(PROMPT.format(field=k.replace("_", " "), text=v) for k, v in fields)
+        summaries = iter(await self.summarize(prompts))
+        return [{k: next(summaries) for k in keys} for keys in per_record]
+
+    def usage(self):
+        return {
+            "provider_calls": self.calls,
+            "failed_calls": self.failed_calls,
+            "input_tokens": sum(b["input_tokens"] for b in self.batches),
+            "output_tokens": sum(b["output_tokens"] for b in self.batches),
+            "cost_usd": round(sum(b["cost_usd"] for b in self.batches), 6),
+        }
+
+
+# ===================================================================
+#  MAIN
+# ===================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize open-field answers")
+    parser.add_argument("inputs", nargs="+", help=".jsonl response records")
+    parser.add_argument("--provider", choices=sorted(PROVIDERS), default="fake")
+    parser.add_argument("--model", help="provider model name")
+    parser.add_argument("--price-model", help="llm-model-comparison.json entry to cost tokens at")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-entries", type=int, default=100_000, help="cache size limit")
+    parser.add_argument("--cache", help="cache database (default: .cache/summaries.sqlite)")
+    parser.add_argument("-o", "--output", help="write {response_id: {field: summary}} here")
+    args = parser.parse_args(argv)
+
+    options = {k: v for k, v in (("model", args.model), ("price_model", args.price_model)) if v}
+    provider = PROVIDERS[args.provider](**options)
+    summarizer = Summarizer(provider, SummaryCache(args.cache, args.max_entries),
+                            args.batch_size, args.concurrency)
+    records = []
+    for path in args.inputs:
+        with open(path, encoding="utf-8") as fh:
+            records.extend(json.loads(line) for line in fh if line.strip())
+
+    start = time.perf_counter()
+    summaries = asyncio.run(summarizer.summarize_responses(records))
+    elapsed = time.perf_counter() - start
+    for b in summarizer.batches:
+        print(f"  batch {b['batch']:>4}: {b['prompts']:>3} prompts  {b['input_tokens']:>7} in "
+              f"{b['output_tokens']:>6} out  ${b['cost_usd']:.6f}  {b['seconds']}s"
+              + (f"  ({b['attempts']} attempts)" if b["attempts"] > 1 else ""))
+    u = summarizer.usage()
+    print(f"{len(records)} response(s), {sum(map(len, summaries))} answer(s) in {elapsed:.2f}s; "
+          f"{u['provider_calls']} provider call(s) ({u['failed_calls']} failed), "
+          f"{u['input_tokens']} in / "
+          f"{u['output_tokens']} out tokens, ${u['cost_usd']:.4f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump({r.get("response_id", str(i)): s for i, (r, s) in
+                       enumerate(zip(records, summaries))}, fh, indent=2, ensure_ascii=False)
+    summarizer.cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,361 @@
+"""
+Normalizes free-text tool and channel mentions to canonical integrations.
+Answers such as "G-suite", "gmail", "MS Teams" or "Other: whatsapp biz" in
+the A2 tool lists, the A5/B4 integrations and messaging_platforms are
+resolved to canonical ids ("google-workspace", "gmail", "teams", "whatsapp")
+with a similarity score.
+
+The vocabulary is seeded from the platform `channels` lists in
+platform-comparison.json, the product names in the A5/B4 items, the A2
+option lists and the intake form's messaging_platforms options, plus ALIASES for spellings no similarity measure would find and
+LOOKALIKES, names that must never resolve to the entry they resemble
+("WeChat" is not WeCom) and so become entries of their own.
+Every spelling is indexed once by its character trigrams (pg_trgm style:
+per word, padded "  w" ... "d "); a mention is split into spans on commas,
+slashes, "and" and the like, and each span scores every spelling by the
+Dice coefficient of their trigram sets. Batches score all unique spans at
+once with one bincount; single lookups are memoized.
+
+strict=True is for answers that switch something on (deploy_configs.py
+enables channels from them): a fuzzy hit then also needs one word of the
+span within WORD_MIN_SCORE of a distinctive word of the entry's label, so
+"Google Meet" is not Gmail and "our website" is not WebChat.
+
+Usage:
+    python tool_normalizer.py "G-suite" "MS Teams" "Other: whatsapp biz, slack"
+    python tool_normalizer.py --jsonl responses.jsonl        # write-in counts per id
+    python tool_normalizer.py --vocab
+    python tool_normalizer.py --bench 100000
+"""
+
+import argparse
+import functools
+import json
+import re
+import sys
+import time
+import unicodedata
+from collections import Counter
+
+import numpy as np
+
+import reference_data
+from intake_schema import field_options, get_path
+
+MIN_SCORE = 0.5
+WORD_MIN_SCORE = 0.8
+
+# Canonical label -> extra spellings. Labels not seeded elsewhere become
+# entries of their own.
+ALIASES = {
+    "Google Workspace": ("G Suite", "GSuite", "Google Apps"),
+    "Gmail": ("Google Mail",),
+    "Teams": ("MS Teams", "Microsoft Teams"),
+    "Outlook": ("Office 365", "Microsoft 365", "Exchange"),
+    "WhatsApp": ("WhatsApp Business", "WA Business"),
+    "iMessage": ("Apple Messages",),
+    "WeCom": ("WeChat Work",),
+    "WebChat": ("Website chat", "Web chat", "Web widget"),
+    "Google Calendar": ("GCal",),
+    "SMS": ("Text messages",),
+    "Email": ("E-mail",),
+}
+
+# Canonical label -> look-alike names that are different products.
+LOOKALIKES = {
+    "WeCom": ("WeChat",),
+    "Gmail": ("Google Meet",),
+    "WebChat": ("Website",),
+}
+
+# Capitalised words in A5/B4 items that are not product names.
+_NOT_NAMES = {"I", "PDFs"}
+_GENERIC = {"None", "None of these", "Work email", "Social media management tools",
+            "Smart home devices", "Accounting software"}
+_SPLIT = re.compile(r"\s*(?:[,;/+&|\n]|\band\b|\bor\b|\bplus\b)\s*", re.I)
+_WRITE_IN = re.compile(r"^\s*other\s*:\s*", re.I)
+
+MENTION_FIELDS = (
+    ("communication_preferences", "messaging_platforms"),
+    ("private", "email_providers"),
+    ("private", "calendar"),
+    ("private", "tools"),
+    ("integrations",),
+)
+
+
+def slug(label):
+    return re.sub(r"[^a-z0-9]+", "-", fold(label)).strip("-")
+
+
+def fold(text):
+    """Lowercase, accents stripped, punctuation to spaces."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def trigrams(text):
+    grams = set()
+    for word in fold(text).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def option_names(label):
+    """Product names in an A2 option label: "Google Drive / Docs" ->
+    ["Google Drive", "Google Docs"], "Smart home devices (Alexa, ...)" -> ["Alexa", ...]."""
+    inner = re.search(r"\((.*)\)", label)
+    if inner:
+        pieces = [p.strip() for p in inner.group(1).split(",")]
+        return [p for p in pieces if p and p != "etc."]
+    if label in _GENERIC:
+        return []
+    names = []
+    for piece in (p.strip() for p in label.split("/")):
+        if names and " " in names[-1] and " " not in piece:
+            piece = f"{names[-1].split()[0]} {piece}"   # "Google Drive / Docs"
+        names.append(piece)
+    return names
+
+
+def item_names(text):
+    """Product names in an A5/B4 item sentence: capitalised runs after the first word."""
+    words = text.split(" ", 1)
+    rest = words[1] if len(words) > 1 else ""
+    runs = re.findall(r"\b[A-Z][\w]*(?: [A-Z][\w]*)*", rest)
+    return [r for r in runs if r not in _NOT_NAMES]
+
+
+def vocabulary():
+    """{id: {"label", "spellings", "sources"}} from the reference data and questionnaire."""
+    import generate_questionnaire as gq
+    seeds = []
+    platforms = reference_data.load(reference_data.PLATFORMS)["platforms"]
+    for key, platform in platforms.items():
+        seeds += [(c, f"channels.{key}") for c in platform["channels"]]
+    for source, groups in (("a5", gq.A5_INTEGRATIONS), ("b4", gq.B4_WORKFLOWS)):
+        seeds += [(name, source) for _, items in groups for item in items
+                  for name in item_names(item)]
+    for source, options in (("a2.messaging", gq.A2_MESSAGING_APPS),
+                            ("a2.email", gq.A2_EMAIL_PROVIDERS),
+                            ("a2.calendar", gq.A2_CALENDARS), ("a2.tools", gq.A2_TOOLS)):
+        seeds += [(name, source) for label in options for name in option_names(label)]
+    seeds += [(name, "intake.messaging_platforms")
+              for name in field_options(("communication_preferences", "messaging_platforms"))]
+    seeds += [(label, "aliases") for label in ALIASES]
+    seeds += [(name, "lookalikes") for names in LOOKALIKES.values() for name in names]
+
+    vocab = {}
+    for label, source in seeds:
+        entry = vocab.setdefault(slug(label), {"label": label, "spellings": [label], "sources": []})
+        if source not in entry["sources"]:
+            entry["sources"].append(source)
+    for label, spellings in ALIASES.items():
+        vocab[slug(label)]["spellings"] += [s for s in spellings
+                                            if s not in vocab[slug(label)]["spellings"]]
+    return vocab
+
+
+class Normalizer:
+    """Trigram index over the spellings of a canonical vocabulary."""
+
+    def __init__(self, vocab=None):
+        self.vocab = vocabulary() if vocab is None else vocab
+        self.ids = list(self.vocab)
+        owners, grams = [], []
+        for i, entry_id in enumerate(self.ids):
+            for spelling in self.vocab[entry_id]["spellings"]:
+                owners.append(i)
+                grams.append(trigrams(spelling))
+        self._owner = np.array(owners)                         # spelling -> entry
+        self._size = np.array([len(g) for g in grams], dtype=np.float64)
+        self._gram_ids = {}
+        postings = {}
+        for s, gs in enumerate(grams):
+            for g in gs:
+                postings.setdefault(self._gram_ids.setdefault(g, len(self._gram_ids)), []).append(s)
+        self._lists = [postings[i] for i in range(len(self._gram_ids))]
+        self._postings = [np.array(p) for p in self._lists]
+        self._exact = {fold(s): self._owner[k]
+                       for k, s in enumerate(sp for e in self.ids for sp in self.vocab[e]["spellings"])}
+        self._cache = functools.lru_cache(maxsize=65536)(self._lookup)
+        # Label words no other label uses ("google" is not one); all of them if none.
+        words = [fold(self.vocab[e]["label"]).split() for e in self.ids]
+        seen = Counter(w for ws in words for w in set(ws))
+        self._distinctive = [[trigrams(w) for w in ([w for w in ws if seen[w] == 1] or ws)]
+                             for ws in words]
+
+    @staticmethod
+    def spans(mention):
+        """The tool names a mention may list: "Other: Slack, MS Teams and gmail" -> 3 spans."""
+        mention = _WRITE_IN.sub("", mention)
+        return [s for s in (fold(p) for p in _SPLIT.split(mention)) if s]
+
+    def _score(self, spans):
+        """(entry index, score) per folded span, all spans in one pass."""
+        rows, cols, sizes = [], [], np.empty(len(spans))
+        for r, span in enumerate(spans):
+            grams = trigrams(span)
+            sizes[r] = len(grams)
+            for g in grams:
+                k = self._gram_ids.get(g)
+                if k is not None:
+                    cols.append(self._postings[k])
+                    rows.append(np.full(len(self._postings[k]), r))
+        n = len(self._size)
+        shared = np.zeros((len(spans), n))
+        if cols:
+            flat = np.concatenate(rows) * n + np.concatenate(cols)
+            shared = np.bincount(flat, minlength=len(spans) * n).reshape(len(spans), n)
+        dice = 2.0 * shared / (sizes[:, None] + self._size[None, :])
+        best = dice.argmax(axis=1)
+        return [(int(self._owner[b]), float(dice[r, b])) for r, b in enumerate(best)]
+
+    def _lookup(self, span):
+        """_score() for one span; plain dict counting beats numpy at this size."""
+        hit = self._exact.get(span)
+        if hit is not None:
+            return int(hit), 1.0
+        grams = trigrams(span)
+        shared = {}
+        for g in grams:
+            k = self._gram_ids.get(g)
+            if k is not None:
+                for s in self._lists[k]:
+                    shared[s] = shared.get(s, 0) + 1
+        best, score = 0, 0.0
+        for s, n in shared.items():
+            dice = 2.0 * n / (len(grams) + self._size[s])
+            if dice > score:
+                best, score = s, dice
+        return int(self._owner[best]), float(score)
+
+    def _accept(self, entry, score, span, min_score, strict):
+        if score < min_score:
+            return False
+        if not strict or span in self._exact:
+            return True
+        for word in span.split():
+            grams = trigrams(word)
+            for label_grams in self._distinctive[entry]:
+                if 2.0 * len(grams & label_grams) / (len(grams) + len(label_grams)) >= WORD_MIN_SCORE:
+                    return True
+        return False
+
+    def resolve(self, mention, min_score=MIN_SCORE, strict=False):
+        """[(id, score, span)] for the tool names in *mention* scoring at least *min_score*."""
+        out = []
+        for span in self.spans(mention):
+            entry, score = self._cache(span)
+            if self._accept(entry, score, span, min_score, strict):
+                out.append((self.ids[entry], round(score, 3), span))
+        return out
+
+    def resolve_many(self, mentions, min_score=MIN_SCORE, strict=False):
+        """resolve() for a batch: every distinct span is scored once, together."""
+        per_mention = [self.spans(m) for m in mentions]
+        unique = list(dict.fromkeys(s for spans in per_mention for s in spans))
+        todo = [s for s in unique if s not in self._exact]
+        scored = dict(zip(todo, self._score(todo))) if todo else {}
+        for s in unique:
+            if s in self._exact:
+                scored[s] = (int(self._exact[s]), 1.0)
+        return [[(self.ids[scored[s][0]], round(scored[s][1], 3), s)
+                 for s in spans if self._accept(*scored[s], s, min_score, strict)]
+                for spans in per_mention]
+
+    def label(self, entry_id):
+        return self.vocab[entry_id]["label"]
+
+    def normalize_record(self, record, min_score=MIN_SCORE):
+        """{field: [ids]} for the tool lists of a response, write-ins included."""
+        out = {}
+        for path in MENTION_FIELDS:
+            values = get_path(record, path)
+            if isinstance(values, str):
+                values = [values]
+            if not values:
+                continue
+            ids = [hit[0] for hits in self.resolve_many(values, min_score) for hit in hits]
+            out[".".join(path)] = list(dict.fromkeys(ids))
+        return out
+
+
+_normalizer = None
+
+
+def normalizer():
+    """Process-wide Normalizer, built on first use."""
+    global _normalizer
+    if _normalizer is None:
+        _normalizer = Normalizer()
+    return _normalizer
+
+
+# ===================================================================
+#  MAIN
+# ===================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Normalize tool mentions to canonical integrations")
+    parser.add_argument("mentions", nargs="*", help="free-text mentions to resolve")
+    parser.add_argument("--jsonl", help="count resolved write-ins over a responses .jsonl")
+    parser.add_argument("--min-score", type=float, default=MIN_SCORE)
+    parser.add_argument("--strict", action="store_true",
+                        help="also require a distinctive word match, as channel enabling does")
+    parser.add_argument("--vocab", action="store_true", help="print the canonical vocabulary")
+    parser.add_argument("--bench", type=int, metavar="N", help="time N lookups, cached and batched")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    norm = Normalizer()
+    built = time.perf_counter() - start
+    if args.vocab:
+        for entry_id, entry in norm.vocab.items():
+            print(f"{entry_id:<20} {', '.join(entry['spellings'])}  [{', '.join(entry['sources'])}]")
+    for mention in args.mentions:
+        hits = norm.resolve(mention, args.min_score, args.strict)
+        print(f"{mention!r}: " + (", ".join(f"{i} ({s:.2f})" for i, s, _ in hits) or "-"))
+    if args.jsonl:
+        counts, unresolved = Counter(), Counter()
+        with open(args.jsonl, encoding="utf-8") as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                for path in MENTION_FIELDS:
+                    for value in get_path(record, path) or []:
+                        if isinstance(value, str) and _WRITE_IN.match(value):
+                            hits = norm.resolve(value, args.min_score)
+                            counts.update(h[0] for h in hits)
+                            if not hits:
+                                unresolved[value] += 1
+        for entry_id, n in counts.most_common():
+            print(f"{n:>8}  {entry_id}")
+        for value, n in unresolved.most_common(20):
+            print(f"{n:>8}  unresolved: {value}")
+    if args.bench:
+        pool = ["G-suite", "gmail", "MS Teams", "whatsapp biz", "slak", "google drive",
+                "Microsoft Outlook", "notion app", "Dropbox business", "telegramm"]
+        mentions = [f"{pool[i % len(pool)]} {i % 97}" for i in range(args.bench)]
+        t = time.perf_counter()
+        for m in mentions:
+            for span in norm.spans(m):
+                norm._lookup(span)
+        single = (time.perf_counter() - t) / args.bench
+        t = time.perf_counter()
+        norm.resolve_many(mentions)
+        batch = (time.perf_counter() - t) / args.bench
+        t = time.perf_counter()
+        for m in mentions:
+            norm.resolve(m)
+        cached = (time.perf_counter() - t) / args.bench
+        print(f"index built in {built * 1000:.1f} ms ({len(norm.ids)} ids, {len(norm._size)} spellings); "
+              f"per lookup: uncached {single * 1e6:.1f} us, batched {batch * 1e6:.1f} us, "
+              f"memoized {cached * 1e6:.1f} us")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,401 @@
+"""
+Watch mode: rebuild only the outputs a reference-data edit affects.
+Keeps a dependency graph from the JSON reference files (and brand
+profiles, and the response inputs) through questionnaire sections to the
+artifacts built from them:
+
+    service-packages.json -> section c, section d -> every questionnaire variant
+                          -> proposals
+    llm-model-comparison  -> proposals, deploy bundles
+    brands/<brand>.json   -> questionnaire variants, proposals
+
+The sections' data dependencies come from generate_questionnaire.SECTION_DATA,
+the proposals' and bundles' from pipeline/deploy_configs.REFERENCE_FILES.
+Changes are picked up with inotify (through ctypes, no extra dependency) or,
+where that is unavailable, by polling mtimes. A burst of edits is debounced
+into one rebuild; files whose content did not actually change are ignored.
+Affected fragments are dropped from the warm fragment cache, so only those
+sections are rebuilt before the affected documents are re-spliced.
+
+Usage:
+    python watch.py -o build/                                   # questionnaire variants
+    python watch.py -o build/ --proposals responses.jsonl --deploy build/bundles.tar.gz
+    python watch.py -o build/ --brand northwind --poll --debounce 1
+    python watch.py -o build/ --proposals responses.jsonl --explain service-packages
+"""
+
+import argparse
+import collections
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import select
+import struct
+import sys
+import time
+
+import reference_data
+
+DEBOUNCE = 0.3       # seconds of quiet that end a burst of edits
+POLL_INTERVAL = 0.5  # polling fallback period
+
+
+# ---------------------------------------------------------------------------
+# Change sources
+# ---------------------------------------------------------------------------
+class InotifyWatcher:
+    """inotify on the parent directories of *paths* (so editors that save by
+    rename are seen), reporting only the paths asked for."""
+
+    IN_MODIFY = 0x002
+    IN_ATTRIB = 0x004
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ATTRIB
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, paths):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths = {os.path.abspath(p) for p in paths}
+        self._dirs = {}
+        for directory in {os.path.dirname(p) for p in self.paths}:
+            wd = libc.inotify_add_watch(self.fd, directory.encode(), self.MASK)
+            if wd < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+            self._dirs[wd] = directory
+
+    def poll(self, timeout):
+        """Watched paths that changed within *timeout* seconds (may be empty)."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, _, _, length = self._EVENT.unpack_from(data, offset)
+            offset += self._EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0").decode()
+            offset += length
+            path = os.path.join(self._dirs.get(wd, ""), name)
+            if path in self.paths:
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """mtime/size polling, for systems without inotify."""
+
+    def __init__(self, paths, interval=POLL_INTERVAL):
+        self.paths = {os.path.abspath(p) for p in paths}
+        self.interval = interval
+        self._seen = {p: self._stat(p) for p in self.paths}
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+            return st.st_mtime_ns, st.st_size
+        except FileNotFoundError:
+            return None
+
+    def poll(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            changed = set()
+            for path in self.paths:
+                stat = self._stat(path)
+                if stat != self._seen[path]:
+                    self._seen[path] = stat
+                    changed.add(path)
+            remaining = deadline - time.monotonic()
+            if changed or remaining <= 0:
+                return changed
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+def open_watcher(paths, polling=False):
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(paths)
+        except OSError:
+            pass
+    return PollingWatcher(paths)
+
+
+# ---------------------------------------------------------------------------
+# Dependency graph
+# ---------------------------------------------------------------------------
+class DependencyGraph:
+    """Edges from inputs (file paths) through intermediate nodes to artifacts."""
+
+    def __init__(self):
+        self.users = collections.defaultdict(set)   # node -> nodes that depend on it
+
+    def add(self, node, depends_on):
+        for dep in depends_on:
+            self.users[dep].add(node)
+
+    def inputs(self):
+        return {n for n in self.users if os.path.isabs(n)}
+
+    def affected(self, changed):
+        """Every node downstream of the *changed* inputs."""
+        seen, stack = set(), list(changed)
+        while stack:
+            for user in self.users.get(stack.pop(), ()):
+                if user not in seen:
+                    seen.add(user)
+                    stack.append(user)
+        return seen
+
+
+def _data_path(name):
+    return os.path.abspath(reference_data.ALL_FILES[name])
+
+
+def _brand_path(brand):
+    if brand in (None, "", "house"):
+        return None
+    path = brand if os.path.exists(brand) else os.path.join(reference_data.BRANDS_DIR, f"{brand}.json")
+    return os.path.abspath(path)
+
+
+# ---------------------------------------------------------------------------
+# Artifacts
+# ---------------------------------------------------------------------------
+class Questionnaire:
+    """One questionnaire variant written to <out_dir>/questionnaire-<variant>.docx."""
+
+    def __init__(self, variant, out_dir, brand, writer):
+        import generate_questionnaire as gq
+        self.name = f"questionnaire:{variant}"
+        self.sections = gq.resolve_sections(gq.VARIANTS[variant])
+        self.path = os.path.join(out_dir, f"questionnaire-{variant}.docx")
+        self.brand = brand
+        self._writer = writer
+
+    def depends_on(self):
+        deps = [f"section:{key}" for key in self.sections]
+        brand = _brand_path(self.brand)
+        return deps + ([brand] if brand else [])
+
+    def build(self):
+        import generate_questionnaire as gq
+        from brands import brand_writer
+        doc = gq.new_document()
+        gq.build_document(doc, self.sections)
+        brand_writer(self._writer, self.brand).write(doc, self.path)
+        return self.path
+
+
+class Proposals:
+    """pipeline.py over the response inputs."""
+
+    name = "proposals"
+
+    def __init__(self, inputs, out_dir, brand, workers):
+        self.inputs = inputs
+        self.out_dir = os.path.join(out_dir, "proposals")
+        self.brand = brand
+        self.workers = workers
+
+    def depends_on(self):
+        import pipeline
+        deps = [_data_path(n) for n in pipeline.REFERENCE_FILES]
+        deps += [os.path.abspath(p) for p in self.inputs]
+        brand = _brand_path(self.brand)
+        return deps + ([brand] if brand else [])
+
+    def build(self):
+        import pipeline
+        os.makedirs(self.out_dir, exist_ok=True)
+        _, report = pipeline.run(self.inputs, self.out_dir, self.workers, brand=self.brand)
+        return f"{report['completed']} proposal(s), {report['failed']} failed"
+
+
+class DeployBundles:
+    """deploy_configs.py over the response inputs."""
+
+    name = "deploy"
+
+    def __init__(self, inputs, output):
+        self.inputs = inputs
+        self.output = output
+
+    def depends_on(self):
+        import deploy_configs
+        return ([_data_path(n) for n in deploy_configs.REFERENCE_FILES]
+                + [os.path.abspath(p) for p in self.inputs])
+
+    def build(self):
+        import deploy_configs
+        tmp = f"{self.output}.tmp{os.path.splitext(self.output)[1]}"
+        sink, fh = deploy_configs.open_sink(tmp)
+        try:
+            done, files, failures = deploy_configs.write_bundles(
+                deploy_configs.iter_clients(self.inputs), sink)
+        finally:
+            sink.close()
+            fh.close()
+        os.replace(tmp, self.output)
+        return f"{done} bundle(s), {files} file(s), {len(failures)} failed"
+
+
+class Watch:
+    """Artifacts, their graph, and the rebuild loop."""
+
+    def __init__(self, artifacts):
+        import generate_questionnaire as gq
+        self.artifacts = {a.name: a for a in artifacts}
+        self.graph = DependencyGraph()
+        for key in gq.SECTIONS:
+            self.graph.add(f"section:{key}", [_data_path(n) for n in gq.SECTION_DATA.get(key, ())])
+        for artifact in artifacts:
+            self.graph.add(artifact.name, artifact.depends_on())
+        self._digests = {p: _digest(p) for p in self.graph.inputs()}
+
+    def explain(self, changed):
+        """(sections to rebuild, artifacts to rebuild) for *changed* inputs."""
+        nodes = self.graph.affected(changed)
+        return (sorted(n.split(":", 1)[1] for n in nodes if n.startswith("section:")),
+                [name for name in self.artifacts if name in nodes])
+
+    def content_changed(self, paths):
+        """The subset of *paths* whose bytes differ from the last build."""
+        changed = set()
+        for path in paths:
+            digest = _digest(path)
+            if digest != self._digests.get(path):
+                self._digests[path] = digest
+                changed.add(path)
+        return changed
+
+    def rebuild(self, names, sections=(), log=print):
+        import generate_questionnaire as gq
+        gq.invalidate_fragments(sections)
+        timings = []
+        for name in names:
+            start = time.perf_counter()
+            try:
+                result = self.artifacts[name].build()
+            except Exception as exc:  # keep watching; the next edit may fix it
+                result = f"FAILED {type(exc).__name__}: {exc}"
+            timings.append((name, time.perf_counter() - start, result))
+            log(f"  {name:<26} {timings[-1][1]:7.2f}s  {result}")
+        return timings
+
+    def run(self, watcher, debounce=DEBOUNCE, log=print):
+        log(f"Watching {len(self.graph.inputs())} file(s) with {type(watcher).__name__}; Ctrl-C to stop")
+        while True:
+            changed = watcher.poll(3600)
+            if not changed:
+                continue
+            while True:  # debounce: wait for a quiet period, collecting everything
+                more = watcher.poll(debounce)
+                if not more:
+                    break
+                changed |= more
+            changed = self.content_changed(changed)
+            if not changed:
+                continue
+            sections, names = self.explain(changed)
+            start = time.perf_counter()
+            log(f"[{time.strftime('%H:%M:%S')}] changed: "
+                + ", ".join(os.path.relpath(p, reference_data.REPO_ROOT) for p in sorted(changed)))
+            log(f"  sections: {', '.join(sections) or '-'}; rebuilding {len(names)} of "
+                f"{len(self.artifacts)} artifact(s)")
+            self.rebuild(names, sections, log)
+            log(f"  done in {time.perf_counter() - start:.2f}s")
+
+
+def _digest(path):
+    try:
+        with open(path, "rb") as fh:
+            return hashlib.sha256(fh.read()).digest()
+    except FileNotFoundError:
+        return None
+
+
+# ===================================================================
+#  MAIN
+# ===================================================================
+
+def main(argv=None):
+    import generate_questionnaire as gq
+    parser = argparse.ArgumentParser(description="Rebuild outputs when reference data changes")
+    parser.add_argument("-o", "--output", default="build", help="output directory")
+    parser.add_argument("--variant", action="append", choices=sorted(gq.VARIANTS),
+                        help="questionnaire variant(s) to keep built (default: all)")
+    parser.add_argument("--proposals", nargs="+", metavar="INPUT",
+                        help="also keep proposals for these response files built")
+    parser.add_argument("--deploy", metavar="ARCHIVE",
+                        help="also keep deploy bundles for the --proposals inputs in ARCHIVE")
+    parser.add_argument("--brand", help="white-label brand (default: house)")
+    parser.add_argument("--workers", type=int, default=None, help="pipeline process-pool size")
+    parser.add_argument("--poll", action="store_true", help="poll mtimes instead of inotify")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE, metavar="SECONDS")
+    parser.add_argument("--no-initial", action="store_true", help="skip the initial full build")
+    parser.add_argument("--explain", nargs="+", metavar="FILE",
+                        help="print what a change to FILE(s) would rebuild, then exit")
+    args = parser.parse_args(argv)
+    if args.deploy and not args.proposals:
+        parser.error("--deploy needs --proposals inputs")
+    if args.brand:
+        from brands import check_brand
+        check_brand(parser, args.brand)
+
+    from package_writer import PackageWriter
+    os.makedirs(args.output, exist_ok=True)
+    writer = PackageWriter(gq.new_document())
+    artifacts = [Questionnaire(v, args.output, args.brand, writer)
+                 for v in (args.variant or gq.VARIANTS)]
+    if args.proposals:
+        artifacts.append(Proposals(args.proposals, args.output, args.brand, args.workers))
+    if args.deploy:
+        artifacts.append(DeployBundles(args.proposals, args.deploy))
+    watch = Watch(artifacts)
+
+    if args.explain:
+        changed = {_data_path(f) if f in reference_data.ALL_FILES else os.path.abspath(f)
+                   for f in args.explain}
+        sections, names = watch.explain(changed)
+        print(f"sections: {', '.join(sections) or '-'}")
+        print(f"artifacts: {', '.join(names) or '-'}")
+        return 0
+
+    if not args.no_initial:
+        start = time.perf_counter()
+        print("Initial build:")
+        watch.rebuild(list(watch.artifacts))
+        print(f"  done in {time.perf_counter() - start:.2f}s")
+    watcher = open_watcher(watch.graph.inputs(), args.poll)
+    try:
+        watch.run(watcher, args.debounce)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())